@@ -1,9 +1,11 @@
+import asyncio
 import logging
 import json
 import os
 from typing import Dict, Any, Optional, List 
 
 from dotenv import load_dotenv
+from pydantic import BaseModel, Field
 from livekit.agents import (
     Agent,
     AgentSession,
@@ -21,45 +23,41 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
-logger = logging.getLogger("agent")
-
-LEAD_FILE_PATH = "captured_lead_data.json"
-
-# --------------------------
-# SAVE CHAT FUNCTION
-# --------------------------
-def save_chat(role: str, message: str):
-    file_path = LEAD_FILE_PATH
-
-    # Ensure file exists and is valid JSON array
-    if not os.path.exists(file_path):
-        with open(file_path, "w") as f:
-            json.dump([], f)
+from faq_index import MIN_COVERAGE, BM25Index
+from lead_extractor import ExtractedField, LeadExtractor
+from lead_fields import LEAD_FIELDS, apply_lead_updates
+from lead_store import LeadRepository
+from transcript_writer import TranscriptPersister, TranscriptWriter
 
-    with open(file_path, "r") as f:
-        try:
-            data = json.load(f)
-        except json.JSONDecodeError:
-            data = []
-
-    data.append({"role": role, "message": message})
+logger = logging.getLogger("agent")
 
-    with open(file_path, "w") as f:
-        json.dump(data, f, indent=4)
-# --------------------------
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Deduplicated leads, one row per visitor; kept apart from transcripts
+LEADS_DB_PATH = os.getenv("SALES_LEADS_DB", os.path.join(SCRIPT_DIR, "leads.db"))
+# Old mixed leads/chat array, imported into the lead store once
+LEAD_FILE_PATH = os.path.join(SCRIPT_DIR, "captured_lead_data.json")
+# One append-only JSONL transcript per session
+TRANSCRIPTS_DIR = os.path.join(SCRIPT_DIR, "transcripts")
+# Messages waiting for the background writer; beyond this the oldest queued message is dropped
+TRANSCRIPT_QUEUE_SIZE = 1000
 
 load_dotenv(".env.local")
 
 COMPANY_NAME = "Tata Neu"
-FAQ_CONTENT = {
-    "what_it_does": "Tata Neu is a super-app that brings together the Tata Group's brand ecosystem—including shopping (e.g., BigBasket, Croma), travel (e.g., Air India), financial services, and payments—into a single platform.",
-    "target_audience": "Our platform is primarily for consumers in India who want a unified loyalty and shopping experience across various retail, travel, and financial services under the trusted Tata brand.",
-    "pricing_basics": "The Tata Neu app itself is free to download and use. Its value comes from earning and spending 'NeuCoins,' which are rewarded on purchases across all partner brands. Financial products offered through the app, like loans or credit cards, have their own specific pricing and fees.",
-    "key_benefits": "The main benefit is the unified loyalty program (NeuPass) and seamless integration across all Tata brands, offering better rewards and a smoother checkout experience for users.",
-    "free_tier": "There is no separate 'tier' since the app is free. The value is derived from user activity and rewards. We do offer promotional benefits that are effectively free perks."
-}
+# Bundled FAQ (key, sample questions, answer); point SALES_FAQ_FILE at a larger JSON or JSONL file to replace it
+FAQ_FILE = os.getenv("SALES_FAQ_FILE", os.path.join(SCRIPT_DIR, "faq.json"))
+# Below this share of the question's terms the best entry is not an answer; re-check with
+# `python faq_index.py` when replacing the FAQ
+FAQ_MIN_COVERAGE = float(os.getenv("SALES_FAQ_MIN_COVERAGE", MIN_COVERAGE))
+# Topics listed in the instructions; the index itself can hold thousands of entries
+MAX_TOPICS_IN_INSTRUCTIONS = 10
+
+
+class LeadFieldValue(BaseModel):
+    # A list of these stands in for a field -> value mapping; Gemini tool schemas cannot express free-form object keys
+    field: str = Field(description="Lead field, e.g. Name, Company, Email, Role, Use case, Team size, Timeline")
+    value: str = Field(description="What the user said for that field")
 
-LEAD_FIELDS = ["Name", "Company", "Email", "Role", "Use case", "Team size", "Timeline"]
 
 class SDRSessionState:
     def __init__(self):
@@ -67,14 +65,28 @@ class SDRSessionState:
         self.current_question: Optional[str] = None
         self.conversation_transcript: List[str] = []
         self.faq_hits: List[str] = []
+        self.transcript: Optional[TranscriptPersister] = None
+        self.room_name: Optional[str] = None
+        # Qualification cost, logged at shutdown
+        self.capture_calls = 0
+        self.fields_captured = 0
+        self.fields_extracted = 0
+
+    def save_chat(self, role: str, message: str):
+        # Only enqueues; the file is written by the persister's background task
+        if self.transcript is not None:
+            self.transcript.enqueue(role, message)
 
     def get_missing_lead_fields(self) -> List[str]:
         return [field for field, value in self.lead_data.items() if value is None]
 
 
 class SDRScriptAgent(Agent):
-    def __init__(self, userdata: SDRSessionState) -> None:
+    def __init__(self, userdata: SDRSessionState, faq_index: BM25Index, lead_repo: LeadRepository) -> None:
         self.state = userdata
+        self.faq_index = faq_index
+        self.lead_repo = lead_repo
+        topics = [entry.key for entry in faq_index.entries[:MAX_TOPICS_IN_INSTRUCTIONS]]
         
         # Instructions modified to ensure agent always asks for lead fields
         instructions = f"""You are the Sales Development Representative (SDR) for {COMPANY_NAME}.
@@ -82,46 +94,68 @@ Your primary goal is to qualify the visitor, answer their questions based *ONLY*
 
 **SDR Persona Rules:**
 1. Greet the user warmly when the conversation starts.
-2. Use FAQ: If the user asks a product, pricing, or company question, use the `answer_faq` tool. DO NOT invent details.
+2. Use FAQ: If the user asks a product, pricing, or company question, call the `answer_faq` tool with their question in their own words. DO NOT invent details.
 3. ALWAYS collect lead data: After greeting the user, immediately call the `capture_lead_data` tool to ask for the first missing field.
-4. During every turn, after responding to the user, call `capture_lead_data` again until all lead fields are completed.
+4. Whenever the user shares lead details, call `capture_lead_data` ONCE with every field they mentioned in that turn (e.g. "I'm Priya from Acme, I'm the CTO" is one call with Name, Company and Role), then ask the question it returns. Continue until all lead fields are completed. Email, team size and timeline are often filled automatically from what the user says, so always ask the question `capture_lead_data` returns rather than one you planned earlier.
 5. Once all LEAD_FIELDS are filled and the user says "that's all", "bye", "thanks", or similar, call the `end_call_summary` tool.
 
-**Available FAQ Keys:** {', '.join(FAQ_CONTENT.keys())}
+**Example FAQ Topics:** {', '.join(topics)}
 """
         super().__init__(instructions=instructions)
 
     @function_tool
-    async def answer_faq(self, context: RunContext, topic: str) -> str:
-        topic = topic.lower().replace(' ', '_').replace('-', '_')
-        
-        for key, answer in FAQ_CONTENT.items():
-            if topic in key or key in topic:
-                context.userdata.faq_hits.append(key)
-                return f"Regarding {COMPANY_NAME}, {answer}"
+    async def answer_faq(self, context: RunContext, question: str) -> str:
+        """
+        Looks up the best pre-approved FAQ answer for the visitor's question.
+
+        Args:
+            question: The visitor's question, or the topic it is about (e.g. "how much does it cost").
+
+        Returns:
+            A JSON string with the matched topic, the answer passage and its relevance score, or an error message.
+        """
+        # BM25 over FAQ keys, sample questions and answers, built once at prewarm; off-topic
+        # questions fall through to the no-answer reply instead of the nearest entry
+        match = self.faq_index.best(question, min_coverage=FAQ_MIN_COVERAGE)
+        if match:
+            entry, score = match
+            context.userdata.faq_hits.append(entry.key)
+            logger.info(f"FAQ match for '{question}': {entry.key} (score {score:.2f})")
+            return json.dumps({
+                "topic": entry.key,
+                "answer": f"Regarding {COMPANY_NAME}, {entry.answer}",
+                "score": round(score, 2),
+            })
 
         return "I'm sorry, I don't have a pre-approved answer for that specific topic in my FAQ. Can I try to answer another question, or can I get your contact details?"
 
     @function_tool
-    async def capture_lead_data(self, context: RunContext, field_name: Optional[str] = None, value: Optional[str] = None) -> str:
+    async def capture_lead_data(self, context: RunContext, fields: Optional[List[LeadFieldValue]] = None) -> str:
         """
-        Use this tool to naturally ask for missing lead information or store a piece of information provided by the user.
-        If called with a field_name and value, store it. Otherwise, ask for the next missing field.
+        Use this tool to store every lead detail the user just gave and get the next question to ask.
+        Pass all fields mentioned in the user's turn in a single call; call with no fields to get the first question.
+
+        Args:
+            fields: The lead fields the user provided in this turn, each with its value.
         """
-        # If the LLM provides a field and a value, store it
-        if field_name and value:
-            field_name = field_name.title()
-            if field_name in LEAD_FIELDS:
-                context.userdata.lead_data[field_name] = value
-                logger.info(f"Captured lead data: {field_name}={value}")
-                # Also save to transcript file as structured lead update
-                save_chat("lead_update", f"{field_name}={value}")
-        
+        state = context.userdata
+        state.capture_calls += 1
+        stored, rejected = apply_lead_updates(state.lead_data, ((f.field, f.value) for f in fields or []))
+        for field_name in stored:
+            value = state.lead_data[field_name]
+            logger.info(f"Captured lead data: {field_name}={value}")
+            # Also save to transcript file as structured lead update
+            state.save_chat("lead_update", f"{field_name}={value}")
+        state.fields_captured += len(stored)
+        notes = ""
+        if rejected:
+            notes = f"Not saved ({'; '.join(rejected)}). "
+
         # Determine remaining fields
         missing = context.userdata.get_missing_lead_fields()
         
         if not missing:
-            return "Thank you! I believe I have all the key information I need to pass along to my team. How else can I help you today?"
+            return notes + "Thank you! I believe I have all the key information I need to pass along to my team. How else can I help you today?"
 
         next_field = missing[0]
         context.userdata.current_question = next_field
@@ -136,13 +170,13 @@ Your primary goal is to qualify the visitor, answer their questions based *ONLY*
             "Timeline": "And finally, what's your timeline for implementing a new solution: immediately, within the next three months, or later this year?"
         }
 
-        return prompts.get(next_field, "I've updated the lead data. What is your next question?")
+        return notes + prompts.get(next_field, "I've updated the lead data. What is your next question?")
 
     @function_tool
     async def end_call_summary(self, context: RunContext) -> str:
         """
         Use this tool when the user signals the end of the conversation.
-        It summarizes the lead data and saves it to a JSON file.
+        It summarizes the lead data and saves it to the lead store.
         """
         lead_data = context.userdata.lead_data
         
@@ -157,29 +191,20 @@ Your primary goal is to qualify the visitor, answer their questions based *ONLY*
             f"You are currently with {company}, and your timeline is {timeline}. I will ensure a specialist follows up with you shortly."
         )
 
-        # Save lead data persistently
+        # Save lead data persistently; a repeat visitor updates their existing lead
         try:
-            if os.path.exists(LEAD_FILE_PATH):
-                with open(LEAD_FILE_PATH, 'r') as f:
-                    try:
-                        leads = json.load(f)
-                    except json.JSONDecodeError:
-                        leads = []
+            # The write may wait on another worker's transaction; keep it off the event loop
+            lead_id = await asyncio.to_thread(self.lead_repo.upsert, lead_data, room=context.userdata.room_name)
+            if lead_id is None:
+                logger.info("No lead fields captured; nothing saved")
             else:
-                leads = []
-            
-            leads.append(lead_data)
-            
-            with open(LEAD_FILE_PATH, 'w') as f:
-                json.dump(leads, f, indent=4)
-            
-            logger.info(f"Successfully saved lead data to {LEAD_FILE_PATH}")
+                logger.info(f"Saved lead {lead_id} to {self.lead_repo.path}")
         except Exception as e:
             logger.error(f"Failed to save lead data: {e}")
             summary_text += " (Note: There was an issue recording the data internally, but I have the information.)"
 
         # Also save summary to transcript file
-        save_chat("agent_summary", summary_text)
+        context.userdata.save_chat("agent_summary", summary_text)
 
         return f"{summary_text} Thank you again and have a productive day!"
 
@@ -187,11 +212,23 @@ Your primary goal is to qualify the visitor, answer their questions based *ONLY*
 def prewarm(proc: JobProcess):
     """Prewarm models."""
     proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["faq_index"] = BM25Index.load(FAQ_FILE)
+    lead_repo = LeadRepository(LEADS_DB_PATH)
+    lead_repo.import_legacy_file(LEAD_FILE_PATH)
+    proc.userdata["lead_repo"] = lead_repo
+    logger.info(f"Loaded {len(proc.userdata['faq_index'])} FAQ entries from {FAQ_FILE}")
 
 
 async def entrypoint(ctx: JobContext):
     # Set up session state
     session_state = SDRSessionState()
+    session_state.room_name = ctx.room.name
+    session_state.transcript = TranscriptPersister(
+        TranscriptWriter.for_session(TRANSCRIPTS_DIR, ctx.room.name),
+        max_queue=TRANSCRIPT_QUEUE_SIZE,
+        overflow="drop_oldest",
+    )
+    session_state.transcript.start()
     
     # Logging setup
     ctx.log_context_fields = {
@@ -219,18 +256,38 @@ async def entrypoint(ctx: JobContext):
     def on_user_transcript(ev):
         try:
             if getattr(ev, "user_speaking", False) and getattr(ev, "text", None):
-                save_chat("user", ev.text)
+                session_state.save_chat("user", ev.text)
                 # Also append to session_state transcript for in-memory history
                 session_state.conversation_transcript.append(f"user: {ev.text}")
         except Exception as e:
             logger.error(f"Error saving user transcript: {e}")
 
+    # Fill email, team size and timeline locally from final user transcripts,
+    # so the LLM only spends tool calls on fields that need interpretation
+    lead_extractor = LeadExtractor()
+
+    def on_lead_field_extracted(extracted: ExtractedField):
+        session_state.fields_extracted += 1
+        logger.info(f"Extracted lead data: {extracted.field}={extracted.value} from {extracted.source!r}")
+        session_state.save_chat("lead_update", f"{extracted.field}={extracted.value}")
+
+    lead_extractor.on_field_filled(on_lead_field_extracted)
+
+    @session.on("user_input_transcribed")
+    def on_user_input_transcribed(ev):
+        if not ev.is_final:
+            return
+        try:
+            lead_extractor.process(session_state.lead_data, ev.transcript, session_state.current_question)
+        except Exception as e:
+            logger.error(f"Error extracting lead data: {e}")
+
     # Save agent responses
     @session.on("agent_response")
     def on_agent_response(ev):
         try:
             if getattr(ev, "text", None):
-                save_chat("agent", ev.text)
+                session_state.save_chat("agent", ev.text)
                 session_state.conversation_transcript.append(f"agent: {ev.text}")
                 # After agent responds, we expect the LLM to call capture_lead_data per instruction.
                 # (The instruction ensures the LLM uses the capture_lead_data tool repeatedly until done.)
@@ -247,12 +304,29 @@ async def entrypoint(ctx: JobContext):
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        # Cost of qualifying this lead: compare across versions of the capture flow
+        qualified = not session_state.get_missing_lead_fields()
+        logger.info(
+            f"Lead qualification: qualified={qualified}, capture_lead_data calls={session_state.capture_calls}, "
+            f"fields captured={session_state.fields_captured}, fields extracted locally={session_state.fields_extracted}, "
+            f"LLM tokens={summary.llm_prompt_tokens} prompt + {summary.llm_completion_tokens} completion"
+        )
 
     ctx.add_shutdown_callback(log_usage)
 
+    async def close_transcript():
+        await session_state.transcript.close()
+        logger.info(f"Transcript {session_state.transcript.writer.path}: {session_state.transcript.stats()}")
+
+    ctx.add_shutdown_callback(close_transcript)
+
     # Start the session
     await session.start(
-        agent=SDRScriptAgent(userdata=session_state),
+        agent=SDRScriptAgent(
+            userdata=session_state,
+            faq_index=ctx.proc.userdata["faq_index"],
+            lead_repo=ctx.proc.userdata["lead_repo"],
+        ),
         room=ctx.room,
         room_input_options=RoomInputOptions(
             noise_cancellation=noise_cancellation.BVC(),
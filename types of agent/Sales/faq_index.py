@@ -0,0 +1,257 @@
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Keys and questions describe what an entry is about, so their terms count extra
+KEY_WEIGHT = 3
+QUESTION_WEIGHT = 2
+# Share of the query (by IDF) the best entry must cover to count as an answer. Calibrated on
+# the bundled FAQ: paraphrased questions cover >= 0.39, off-topic ones that only share
+# "Tata Neu" cover <= 0.33 (see `_OFF_TOPIC_QUESTIONS`).
+MIN_COVERAGE = 0.35
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can could do does for from had has have how i if in into is it its "
+    "me my of on or our so that the their them there these they this to us was we what when where which "
+    "who why will with would you your about tell much many any s t d ll m re ve don "
+    "exactly really actually just please".split()
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    # Light suffix stripping so "price"/"prices"/"pricing"/"priced" all meet at "pric"
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            break
+    if word.endswith("e") and len(word) >= 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+
+
+class FAQEntry:
+    __slots__ = ("key", "questions", "answer")
+
+    def __init__(self, key: str, answer: str, questions: Optional[List[str]] = None):
+        self.key = key
+        self.answer = answer
+        self.questions = questions or []
+
+    def terms(self) -> Counter:
+        counts = Counter()
+        for term in tokenize(self.key.replace("_", " ")):
+            counts[term] += KEY_WEIGHT
+        for question in self.questions:
+            for term in tokenize(question):
+                counts[term] += QUESTION_WEIGHT
+        counts.update(tokenize(self.answer))
+        return counts
+
+
+class BM25Index:
+    """BM25 over FAQ keys, sample questions and answer text.
+
+    Postings are term -> [(entry position, weighted term frequency)] with the
+    per-entry BM25 length normalization folded in at build time, so a query
+    is one dict lookup per query term plus a sum over the matching postings.
+
+    Raw BM25 scores are not comparable across queries, so `best()` also
+    checks coverage: the IDF-weighted share of the query's terms that the
+    winning entry contains. Terms no entry has weigh as much as the rarest
+    indexed term, which is what sinks "does tata neu sell cars".
+    """
+
+    def __init__(self, entries: Iterable[FAQEntry]):
+        self.entries: List[FAQEntry] = list(entries)
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._terms: List[frozenset] = []
+        self._max_idf = 0.0
+        self._build()
+
+    def _build(self) -> None:
+        doc_terms = [entry.terms() for entry in self.entries]
+        lengths = [sum(terms.values()) for terms in doc_terms]
+        avg_length = (sum(lengths) / len(lengths)) if lengths else 1.0
+        n = len(self.entries)
+
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for pos, (terms, length) in enumerate(zip(doc_terms, lengths)):
+            norm = K1 * (1 - B + B * length / avg_length)
+            for term, tf in terms.items():
+                postings[term].append((pos, tf * (K1 + 1) / (tf + norm)))
+        self._postings = dict(postings)
+        self._idf = {
+            term: math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for term, plist in self._postings.items()
+        }
+        self._terms = [frozenset(terms) for terms in doc_terms]
+        self._max_idf = max(self._idf.values(), default=0.0)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def search(self, query: str, limit: int = 3) -> List[Tuple[FAQEntry, float]]:
+        return [(self.entries[pos], score) for pos, score in self._search(query, limit)]
+
+    def _search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for pos, weight in self._postings[term]:
+                scores[pos] += idf * weight
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def coverage(self, query: str, entry_pos: int) -> float:
+        """IDF-weighted fraction of the query's terms found in the entry, 0..1."""
+        terms = set(tokenize(query))
+        total = sum(self._idf.get(t, self._max_idf) for t in terms)
+        if not total:
+            return 0.0
+        entry_terms = self._terms[entry_pos]
+        return sum(self._idf[t] for t in terms if t in entry_terms) / total
+
+    def best(
+        self, query: str, min_score: float = 0.0, min_coverage: float = 0.0
+    ) -> Optional[Tuple[FAQEntry, float]]:
+        results = self._search(query, limit=1)
+        if not results or results[0][1] <= min_score:
+            return None
+        pos, score = results[0]
+        if min_coverage and self.coverage(query, pos) < min_coverage:
+            return None
+        return self.entries[pos], score
+
+    # --- building from data ---
+
+    @staticmethod
+    def load_entries(path: str) -> List[FAQEntry]:
+        """Reads a JSON array or JSON Lines file of {"key", "answer", "questions"?} objects."""
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                records = [json.loads(line) for line in f if line.strip()]
+            else:
+                records = json.load(f)
+        return [FAQEntry(r["key"], r["answer"], r.get("questions")) for r in records]
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        return cls(cls.load_entries(path))
+
+
+# --- Benchmark: `python faq_index.py [num_entries]` ---
+
+# Paraphrased visitor questions for the bundled FAQ, with the entry that should win
+_EVAL_QUESTIONS = [
+    ("What exactly is Tata Neu?", "what_it_does"),
+    ("Which brands are included in the app?", "what_it_does"),
+    ("Can I book flights and buy groceries in one place?", "what_it_does"),
+    ("Who is this platform built for?", "target_audience"),
+    ("Is it only for customers in India?", "target_audience"),
+    ("How much does it cost?", "pricing_basics"),
+    ("What is the price?", "pricing_basics"),
+    ("Do I have to pay to download the app?", "pricing_basics"),
+    ("How do NeuCoins work?", "pricing_basics"),
+    ("Are there fees on loans or credit cards?", "pricing_basics"),
+    ("Why should I use it instead of separate brand apps?", "key_benefits"),
+    ("What are the main benefits of NeuPass?", "key_benefits"),
+    ("Is the checkout faster?", "key_benefits"),
+    ("Is there a free plan?", "free_tier"),
+    ("Do you have a free tier or trial?", "free_tier"),
+    ("Are there any free perks or promotions?", "free_tier"),
+]
+
+# Questions the FAQ does not answer; `best(..., min_coverage=MIN_COVERAGE)` should return None
+_OFF_TOPIC_QUESTIONS = [
+    "Does Tata Neu sell cars?",
+    "Is Tata Neu available in the US?",
+    "What is the price of a Croma TV?",
+    "What's the weather today?",
+    "Who won the cricket match?",
+    "Can I pay with bitcoin?",
+]
+
+
+def _synthetic_entries(count: int) -> List[FAQEntry]:
+    import random
+
+    rng = random.Random(42)
+    nouns = ["delivery", "refund", "warranty", "voucher", "subscription", "insurance", "booking", "wallet",
+             "cashback", "membership", "invoice", "installation", "exchange", "upgrade", "support", "account",
+             "password", "address", "order", "return", "coupon", "gift", "bill", "recharge", "ticket"]
+    brands = ["BigBasket", "Croma", "Westside", "Tata CLiQ", "Tata 1mg", "Taj Hotels", "IHCL", "Qmin", "Titan"]
+    verbs = ["change", "cancel", "track", "update", "activate", "extend", "transfer", "verify", "renew", "claim"]
+    entries = []
+    for i in range(count):
+        noun, brand, verb = rng.choice(nouns), rng.choice(brands), rng.choice(verbs)
+        entries.append(FAQEntry(
+            f"{verb}_{noun}_{i}",
+            f"To {verb} your {noun} on {brand}, open the {brand} section, choose {noun} settings and follow "
+            f"the steps to {verb} it. Changes usually apply within {rng.randint(1, 7)} days.",
+            [f"How do I {verb} my {brand} {noun}?", f"Can I {verb} a {noun}?"],
+        ))
+    return entries
+
+
+def _benchmark(count: int) -> None:
+    import time
+
+    bundled = BM25Index.load_entries(os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json"))
+
+    started = time.perf_counter()
+    index = BM25Index(bundled + _synthetic_entries(count))
+    print(f"Built BM25 index over {len(index):,} entries in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    queries = [q for q, _ in _EVAL_QUESTIONS] * 20
+    started = time.perf_counter()
+    for query in queries:
+        index.best(query)
+    per_query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+    print(f"Query latency: {per_query_ms:.3f} ms per query")
+
+    correct = 0
+    for question, expected in _EVAL_QUESTIONS:
+        result = index.best(question)
+        if result and result[0].key == expected:
+            correct += 1
+        else:
+            print(f"  miss: {question!r} -> {result[0].key if result else None}")
+    print(f"Top-1 accuracy: {correct}/{len(_EVAL_QUESTIONS)} ({correct / len(_EVAL_QUESTIONS):.0%})")
+
+    # MIN_COVERAGE is calibrated on the bundled FAQ the agent serves; synthetic entries would shift the IDFs
+    faq = BM25Index(bundled)
+    answered = sum(faq.best(q, min_coverage=MIN_COVERAGE) is not None for q, _ in _EVAL_QUESTIONS)
+    rejected = sum(faq.best(q, min_coverage=MIN_COVERAGE) is None for q in _OFF_TOPIC_QUESTIONS)
+    print(f"At MIN_COVERAGE {MIN_COVERAGE}: answered {answered}/{len(_EVAL_QUESTIONS)} FAQ questions, "
+          f"declined {rejected}/{len(_OFF_TOPIC_QUESTIONS)} off-topic ones")
+
+    def substring_match(topic: str) -> Optional[str]:
+        topic = topic.lower().replace(' ', '_').replace('-', '_')
+        for key in (entry.key for entry in bundled):
+            if topic in key or key in topic:
+                return key
+        return None
+
+    old_correct = sum(substring_match(q) == expected for q, expected in _EVAL_QUESTIONS)
+    print(f"Previous substring match on the same questions: {old_correct}/{len(_EVAL_QUESTIONS)}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,242 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from lead_store import LEAD_COLUMNS, LeadRepository
+
+logger = logging.getLogger("agent")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# The *_norm lookup keys stay internal to the store
+EXPORT_LEAD_COLUMNS = ["lead_id", *LEAD_COLUMNS.values(), "visits", "first_seen", "last_seen", "last_room"]
+TRANSCRIPT_COLUMNS = ["session", "ts", "role", "message"]
+FORMATS = ("csv", "parquet")
+
+
+class ExportCheckpoint:
+    """What has already been exported: the last lead key and a byte offset per transcript file.
+
+    Saved after every finished chunk (write to a temp file, then rename), so
+    an interrupted export resumes after the last complete chunk instead of
+    starting over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.leads_after: Optional[Tuple[float, int]] = None
+        self.transcript_offsets: Dict[str, int] = {}
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            self.leads_after = tuple(data["leads_after"]) if data.get("leads_after") else None
+            self.transcript_offsets = data.get("transcript_offsets", {})
+
+    def save(self) -> None:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"leads_after": self.leads_after, "transcript_offsets": self.transcript_offsets}, f)
+        os.replace(tmp_path, self.path)
+
+
+class ChunkWriter:
+    """Writes rows to numbered `<prefix>-<run timestamp>-00001.<fmt>` files of at most `chunk_rows` rows.
+
+    At most one chunk is held in memory. A chunk becomes visible under its
+    final name only once it is completely written.
+    """
+
+    def __init__(self, directory: str, prefix: str, fmt: str, columns: List[str], chunk_rows: int):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = f"{prefix}-{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+        self.fmt = fmt
+        self.columns = columns
+        self.chunk_rows = chunk_rows
+        self.rows: List[tuple] = []
+        self.files: List[str] = []
+        self.rows_written = 0
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.chunk_rows
+
+    def add(self, row: tuple) -> None:
+        self.rows.append(row)
+
+    def flush(self) -> Optional[str]:
+        """Writes the buffered rows as the next chunk file."""
+        if not self.rows:
+            return None
+        rows, self.rows = self.rows, []
+        return self.write_chunk(rows)
+
+    def write_chunk(self, rows: List[tuple]) -> str:
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.files) + 1:05d}.{self.fmt}")
+        tmp_path = path + ".tmp"
+        if self.fmt == "csv":
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(self.columns)
+                writer.writerows(rows)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            arrays = [pa.array(list(values)) for values in zip(*rows)]
+            pq.write_table(pa.Table.from_arrays(arrays, names=self.columns), tmp_path)
+        os.replace(tmp_path, path)
+        self.files.append(path)
+        self.rows_written += len(rows)
+        return path
+
+
+def export_leads(repo: LeadRepository, checkpoint: ExportCheckpoint, out_dir: str,
+                 fmt: str = "csv", chunk_rows: int = 100_000) -> List[str]:
+    """Exports leads created or updated since the checkpoint; returns the chunk files written."""
+    writer: Optional[ChunkWriter] = None
+    # Each fetched batch is exactly one chunk, so rows go from the cursor to the file without a per-row loop
+    for columns, rows in repo.iter_batches(checkpoint.leads_after, chunk_rows, EXPORT_LEAD_COLUMNS):
+        if writer is None:
+            writer = ChunkWriter(out_dir, "leads", fmt, columns, chunk_rows)
+            seen_pos, id_pos = columns.index("last_seen"), columns.index("lead_id")
+        writer.write_chunk(rows)
+        checkpoint.leads_after = (rows[-1][seen_pos], rows[-1][id_pos])
+        checkpoint.save()
+    return writer.files if writer else []
+
+
+def _transcript_rows(path: str, offset: int) -> Iterator[Tuple[tuple, int]]:
+    """Yields (row, end offset) for each complete line after `offset`; a line still being written is left for next time."""
+    session = os.path.splitext(os.path.basename(path))[0]
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping unreadable transcript line in {path} at byte {offset - len(line)}")
+                continue
+            yield (session, record.get("ts"), record.get("role"), record.get("message")), offset
+
+
+def export_transcripts(transcripts_dir: str, checkpoint: ExportCheckpoint, out_dir: str,
+                       fmt: str = "csv", chunk_rows: int = 100_000) -> List[str]:
+    """Exports transcript lines appended since the checkpoint, across all session files."""
+    writer = ChunkWriter(out_dir, "transcripts", fmt, TRANSCRIPT_COLUMNS, chunk_rows)
+    # Offsets of rows in the current chunk, committed to the checkpoint when it is written
+    pending: Dict[str, int] = {}
+    for path in sorted(glob.glob(os.path.join(transcripts_dir, "*.jsonl"))):
+        name = os.path.basename(path)
+        offset = checkpoint.transcript_offsets.get(name, 0)
+        if offset > os.path.getsize(path):
+            logger.warning(f"{path} is shorter than its checkpoint; exporting it again from the start")
+            offset = 0
+        for row, end in _transcript_rows(path, offset):
+            writer.add(row)
+            pending[name] = end
+            if writer.full:
+                writer.flush()
+                checkpoint.transcript_offsets.update(pending)
+                pending.clear()
+                checkpoint.save()
+    writer.flush()
+    checkpoint.transcript_offsets.update(pending)
+    checkpoint.save()
+    return writer.files
+
+
+# --- Benchmark: `python lead_export.py --benchmark 1000000` ---
+
+def _benchmark(count: int, fmt: str, chunk_rows: int) -> None:
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = LeadRepository(os.path.join(tmp, "leads.db"))
+        started = time.perf_counter()
+        now = time.time()
+        # Bulk insert straight into the table; upsert() is per-visitor and not what is being measured
+        rows = ((f"Visitor {i}", f"Company {i % 5000}", f"visitor{i}@example.com", "Engineer", "Rewards",
+                 str(i % 500 + 1), "next quarter", f"visitor{i}@example.com", f"company {i % 5000}",
+                 f"visitor {i}", now - count + i, now - count + i) for i in range(count))
+        repo._conn.execute("BEGIN")
+        repo._conn.executemany(
+            "INSERT INTO leads (name, company, email, role, use_case, team_size, timeline, email_norm, "
+            "company_norm, name_norm, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        repo._conn.execute("COMMIT")
+        print(f"Created {count:,} leads in {time.perf_counter() - started:.1f} s")
+
+        import resource
+
+        checkpoint = ExportCheckpoint(os.path.join(tmp, "checkpoint.json"))
+        started = time.perf_counter()
+        files = export_leads(repo, checkpoint, os.path.join(tmp, "out"), fmt, chunk_rows)
+        elapsed = time.perf_counter() - started
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        size_mb = sum(os.path.getsize(p) for p in files) / 1e6
+        print(
+            f"Full export: {count:,} leads to {len(files)} {fmt} files ({size_mb:.0f} MB) in {elapsed:.2f} s "
+            f"({count / elapsed:,.0f} leads/s), peak process RSS {peak_mb:.0f} MB"
+        )
+
+        repo._conn.execute("UPDATE leads SET visits = visits + 1, last_seen = ? WHERE lead_id % 1000 = 0",
+                           (time.time() + 1,))
+        started = time.perf_counter()
+        files = export_leads(repo, checkpoint, os.path.join(tmp, "out"), fmt, chunk_rows)
+        print(f"Incremental export: {count // 1000:,} updated leads in {(time.perf_counter() - started) * 1000:.0f} ms")
+        repo.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Sales leads and session transcripts for CRM import.")
+    parser.add_argument("--db", default=os.getenv("SALES_LEADS_DB", os.path.join(SCRIPT_DIR, "leads.db")))
+    parser.add_argument("--transcripts", default=os.path.join(SCRIPT_DIR, "transcripts"))
+    parser.add_argument("--out", default=os.path.join(SCRIPT_DIR, "exports"))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Rows per output file")
+    parser.add_argument("--full", action="store_true", help="Ignore the checkpoint and export everything")
+    parser.add_argument("--leads-only", action="store_true")
+    parser.add_argument("--benchmark", type=int, help="Export this many synthetic leads from a temporary database")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.benchmark:
+        _benchmark(args.benchmark, args.format, args.chunk_rows)
+        return
+
+    checkpoint_path = os.path.join(args.out, "export_checkpoint.json")
+    os.makedirs(args.out, exist_ok=True)
+    if args.full and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = ExportCheckpoint(checkpoint_path)
+
+    repo = LeadRepository(args.db)
+    try:
+        files = export_leads(repo, checkpoint, args.out, args.format, args.chunk_rows)
+    finally:
+        repo.close()
+    logger.info(f"Exported leads to {len(files)} files: {files}")
+    if not args.leads_only:
+        files = export_transcripts(args.transcripts, checkpoint, args.out, args.format, args.chunk_rows)
+        logger.info(f"Exported transcripts to {len(files)} files: {files}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Words STT may emit instead of digits for a team size
+_UNITS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16,
+    "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {"twenty": 20, "thirty": 30, "forty": 40, "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90}
+_SCALES = {"hundred": 100, "thousand": 1000}
+
+_NUMBER_WORD = "|".join(sorted(list(_UNITS) + list(_TENS) + list(_SCALES) + ["a"], key=len, reverse=True))
+# "25", "1,200", "2k", "twenty five", "a hundred", "two thousand"
+_NUMBER = rf"(?:\d[\d,]*(?:\.\d+)?\s*k?|(?:(?:{_NUMBER_WORD})[\s-]*)+)"
+_PEOPLE = (r"(?:people|persons|employees|engineers|developers|devs|members|users|staff|seats|folks|"
+           r"agents|reps|analysts|designers|associates|colleagues|of us)")
+
+# All patterns run on the lower-cased utterance
+_EMAIL_RE = re.compile(r"\b[a-z0-9][a-z0-9._%+-]*@[a-z0-9-]+(?:\.[a-z0-9-]+)*\.[a-z]{2,}\b")
+# Words directly before "at" that belong to the sentence, not a mailbox: "send it to me at acme dot com",
+# including contraction fragments STT may split off ("i m at acme dot com")
+_NOT_LOCAL_PARTS = (
+    "me it us you him her them this that here there home work one someone everyone anyone "
+    "reach contact email mail send write m s re ve ll d".split()
+)
+# "john dot doe at acme dot com"; only trusted when the utterance talks about an email.
+# The local part never starts right after an apostrophe, so "i'm at ..." cannot yield "m@..."
+_SPOKEN_EMAIL_RE = re.compile(
+    rf"(?<![a-z0-9'\u2019])(?!(?:{'|'.join(_NOT_LOCAL_PARTS)})\s+at\b)"
+    r"([a-z0-9]+(?:\s+(?:dot|underscore|dash)\s+[a-z0-9]+)*)\s+at\s+([a-z0-9-]+(?:\s+dot\s+[a-z0-9-]+)*\s+dot\s+[a-z]{2,})\b"
+)
+_EMAIL_CUE_RE = re.compile(r"\b(?:e-?mail|mail|address)\b")
+
+# (substring the utterance must contain, pattern); the cheap `in` test skips most utterances
+_TEAM_SIZE_RES = [
+    (" of ", re.compile(rf"\b(?:team|company|department|org|organi[sz]ation)\s+of\s+(?:about\s+|around\s+|roughly\s+|some\s+)?({_NUMBER})")),
+    ("team", re.compile(rf"\b(?:team\s+size|team)\s+(?:is|of|=|would\s+be|will\s+be)\s+(?:about\s+|around\s+|roughly\s+)?({_NUMBER})")),
+    ("headcount", re.compile(rf"\bheadcount\s+(?:is|of|=|would\s+be|will\s+be)\s+(?:about\s+|around\s+|roughly\s+)?({_NUMBER})")),
+]
+# "<number> people": found by the noun first, then the number is matched just before it,
+# which is several times cheaper than trying the number pattern at every position
+_PEOPLE_RE = re.compile(rf"\b{_PEOPLE}\b")
+_NUMBER_BEFORE_PEOPLE_RE = re.compile(rf"(?:^|\W)({_NUMBER})\s*(?:\+\s*)?(?:full[\s-]time\s+)?$")
+# How far before the noun the number may start
+_NUMBER_WINDOW = 40
+# A bare number only counts as a team size when the agent just asked for it
+_BARE_NUMBER_RE = re.compile(rf"^\W*(?:about\s+|around\s+|roughly\s+|maybe\s+|we\s+are\s+|we're\s+)?({_NUMBER})\W*$")
+
+# "may" followed by a verb is the modal, not the month: "the date in may change"
+_MONTHS = (r"(?:january|february|march|april|may(?!\s+(?:be|not|have|need|want|change|slip|move|take|happen|go|start|launch)\b)|"
+           r"june|july|august|september|october|november|december|"
+           r"jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)")
+_TIMELINE_RE = re.compile(
+    r"\b(?:"
+    r"immediately|right\s+away|right\s+now|asap|as\s+soon\s+as\s+possible|"
+    r"(?:this|next|the\s+next|coming)\s+(?:few\s+)?(?:week|weeks|month|months|quarter|quarters|year)|"
+    r"(?:within|in)\s+(?:the\s+next\s+)?(?:a|one|two|three|four|five|six|nine|twelve|a\s+few|few|couple\s+of|\d+)\s+(?:days|day|weeks|week|months|month|quarters|quarter|years|year)|"
+    r"later\s+this\s+(?:year|quarter|month)|"
+    r"(?:by\s+)?(?:the\s+)?end\s+of\s+(?:the\s+|this\s+|next\s+)?(?:year|quarter|month|" + _MONTHS + r")|"
+    r"(?:by|before|in)\s+(?:q[1-4]|" + _MONTHS + r")(?:\s+(?:next\s+year|20\d\d))?|"
+    r"(?:early|mid|late)[\s-](?:next\s+year|this\s+year|20\d\d|" + _MONTHS + r")|"
+    r"no\s+(?:fixed\s+)?timeline|just\s+exploring|not\s+sure\s+yet"
+    r")\b"
+)
+_TIMELINE_CUE_RE = re.compile(
+    r"\b(?:timeline|plan|planning|start|starting|implement|implementing|launch|roll\s*out|go\s+live|"
+    r"looking\s+to|hoping\s+to|want\s+to|need\s+it|deploy|adopt|switch|onboard)\b"
+)
+
+
+def _words_to_int(words: str) -> Optional[int]:
+    total, current = 0, 0
+    for word in re.split(r"[\s-]+", words.strip().lower()):
+        if not word:
+            continue
+        if word == "a":
+            current = current or 1
+        elif word in _UNITS:
+            current += _UNITS[word]
+        elif word in _TENS:
+            current += _TENS[word]
+        elif word in _SCALES:
+            current = (current or 1) * _SCALES[word]
+            if _SCALES[word] >= 1000:
+                total, current = total + current, 0
+        else:
+            return None
+    value = total + current
+    return value or None
+
+
+def parse_team_size(text: str) -> Optional[int]:
+    """"25" -> 25, "1,200" -> 1200, "2k" -> 2000, "twenty five" -> 25."""
+    text = text.strip().lower()
+    if text[:1].isdigit():
+        multiplier = 1000 if text.endswith("k") else 1
+        try:
+            value = float(text.rstrip("k").strip().replace(",", ""))
+        except ValueError:
+            return None
+        return int(value * multiplier) or None
+    return _words_to_int(text)
+
+
+class ExtractedField(NamedTuple):
+    field: str
+    value: str
+    source: str
+
+
+class LeadExtractor:
+    """Fills the pattern-shaped lead fields (Email, Team size, Timeline) from final user transcripts.
+
+    All patterns are compiled once at import. `process()` only fills fields
+    that are still empty, so values confirmed through `capture_lead_data`
+    are never overwritten, and calls every listener once per filled field.
+    Context-dependent matches (a bare "about fifty", "next month") are only
+    accepted when the agent has just asked for that field or the utterance
+    says what the phrase is about.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: List[Callable[[ExtractedField], None]] = []
+
+    def on_field_filled(self, callback: Callable[[ExtractedField], None]) -> None:
+        self._listeners.append(callback)
+
+    def extract(self, text: str, current_question: Optional[str] = None) -> List[ExtractedField]:
+        """Returns every field found in one utterance, without touching any state."""
+        found: List[ExtractedField] = []
+        if not text:
+            return found
+        text = text.lower()
+
+        match = _EMAIL_RE.search(text)
+        if match:
+            found.append(ExtractedField("Email", match.group(0), match.group(0)))
+        elif " at " in text and (current_question == "Email" or _EMAIL_CUE_RE.search(text)):
+            match = _SPOKEN_EMAIL_RE.search(text)
+            if match:
+                found.append(ExtractedField("Email", _spoken_to_email(match.group(1), match.group(2)), match.group(0)))
+
+        team_size = self._team_size(text, current_question)
+        if team_size:
+            found.append(team_size)
+
+        if current_question == "Timeline" or _TIMELINE_CUE_RE.search(text):
+            match = _TIMELINE_RE.search(text)
+            if match:
+                found.append(ExtractedField("Timeline", " ".join(match.group(0).split()), match.group(0)))
+        return found
+
+    @staticmethod
+    def _team_size(text: str, current_question: Optional[str]) -> Optional[ExtractedField]:
+        candidates = []
+        for needle, pattern in _TEAM_SIZE_RES:
+            if needle in text:
+                candidates.extend(pattern.finditer(text))
+        for people in _PEOPLE_RE.finditer(text):
+            start = max(0, people.start() - _NUMBER_WINDOW)
+            match = _NUMBER_BEFORE_PEOPLE_RE.search(text, start, people.start())
+            if match:
+                candidates.append(match)
+        if current_question == "Team size":
+            candidates.extend(_BARE_NUMBER_RE.finditer(text))
+        for match in candidates:
+            value = parse_team_size(match.group(1))
+            if value:
+                return ExtractedField("Team size", str(value), match.group(0).strip(" ,.;:!?"))
+        return None
+
+    def process(self, lead_data: Dict[str, Optional[str]], text: str,
+                current_question: Optional[str] = None) -> List[ExtractedField]:
+        """Extracts from one utterance, stores fields that were still empty and notifies listeners."""
+        filled = []
+        for extracted in self.extract(text, current_question):
+            if lead_data.get(extracted.field) is None:
+                lead_data[extracted.field] = extracted.value
+                filled.append(extracted)
+        for extracted in filled:
+            for callback in self._listeners:
+                callback(extracted)
+        return filled
+
+
+def _spoken_to_email(local: str, domain: str) -> str:
+    def join(part: str) -> str:
+        part = re.sub(r"\s+dot\s+", ".", part)
+        part = re.sub(r"\s+underscore\s+", "_", part)
+        part = re.sub(r"\s+dash\s+", "-", part)
+        return part.replace(" ", "")
+
+    return f"{join(local)}@{join(domain)}"
+
+
+# --- Benchmark: `python lead_extractor.py [utterances]` ---
+
+# (utterance, field the agent just asked for, expected fields)
+_LABELLED = [
+    ("Sure, it's priya.sharma@acme.io", "Email", {"Email": "priya.sharma@acme.io"}),
+    ("my email is john dot doe at gmail dot com", "Email", {"Email": "john.doe@gmail.com"}),
+    ("You can reach me at RAVI@Startup.co.in anytime", None, {"Email": "ravi@startup.co.in"}),
+    ("I work at acme dot com", None, {}),
+    ("send it to me at acme dot com email", None, {}),
+    ("email me at john dot doe at acme dot com", None, {"Email": "john.doe@acme.com"}),
+    ("my email is it dot support at acme dot com", None, {"Email": "it.support@acme.com"}),
+    ("I'm at acme dot com, email is raj at acme dot com", None, {"Email": "raj@acme.com"}),
+    ("We're a team of 25 engineers", "Team size", {"Team size": "25"}),
+    ("about fifty", "Team size", {"Team size": "50"}),
+    ("around twenty five people in my department", None, {"Team size": "25"}),
+    ("the company has 1,200 employees", None, {"Team size": "1200"}),
+    ("team size is 2k", None, {"Team size": "2000"}),
+    ("I have 3 kids", None, {}),
+    ("We are planning to roll out next quarter", None, {"Timeline": "next quarter"}),
+    ("within the next three months", "Timeline", {"Timeline": "within the next three months"}),
+    ("Immediately, honestly", "Timeline", {"Timeline": "immediately"}),
+    ("I was on vacation this week", None, {}),
+    ("we want to go live by Q3", None, {"Timeline": "by q3"}),
+    ("we may launch in may", None, {"Timeline": "in may"}),
+    ("we plan to launch but the date in may change", None, {}),
+    ("We'd start later this year with about 40 users, email me at a.b@c.com",
+     None, {"Email": "a.b@c.com", "Team size": "40", "Timeline": "later this year"}),
+    ("What does NeuPass cost?", None, {}),
+]
+
+
+def _corpus(count: int) -> List[str]:
+    import random
+
+    rng = random.Random(7)
+    filler = [
+        "I'd like to know more about pricing for NeuCoins.",
+        "Can you tell me how BigBasket and Croma work together in the app?",
+        "My name is Arjun and I lead the platform team at Finserve.",
+        "We mostly need it for employee rewards and travel bookings.",
+        "Honestly I'm just browsing today, thanks for asking.",
+        "That sounds great, what else is included in the membership?",
+    ]
+    labelled = [text for text, _, _ in _LABELLED]
+    return [rng.choice(labelled) if rng.random() < 0.3 else rng.choice(filler) for _ in range(count)]
+
+
+def _benchmark(count: int) -> None:
+    import time
+
+    extractor = LeadExtractor()
+    correct = 0
+    for text, question, expected in _LABELLED:
+        got = {f.field: f.value for f in extractor.extract(text, question)}
+        if got == expected:
+            correct += 1
+        else:
+            print(f"  mismatch: {text!r} -> {got}, expected {expected}")
+    print(f"Labelled utterances: {correct}/{len(_LABELLED)} extracted exactly")
+
+    corpus = _corpus(count)
+    size_mb = sum(len(t) for t in corpus) / 1e6
+    started = time.perf_counter()
+    hits = 0
+    for i, text in enumerate(corpus):
+        hits += len(extractor.extract(text, ("Email", "Team size", "Timeline", None)[i % 4]))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Extracted {hits:,} fields from {count:,} utterances ({size_mb:.1f} MB) in {elapsed * 1000:.0f} ms: "
+        f"{count / elapsed:,.0f} utterances/s, {elapsed / count * 1e6:.1f} us per utterance"
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
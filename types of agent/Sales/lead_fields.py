@@ -0,0 +1,62 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+LEAD_FIELDS = ["Name", "Company", "Email", "Role", "Use case", "Team size", "Timeline"]
+
+# Lower-cased, space-separated spellings the LLM (or a caller) may use for each field
+LEAD_FIELD_ALIASES = {
+    "Name": ("name", "full name", "first name", "contact name", "visitor name"),
+    "Company": ("company", "company name", "organization", "organisation", "org", "employer", "business"),
+    "Email": ("email", "e mail", "email address", "mail", "work email"),
+    "Role": ("role", "title", "job title", "position", "designation", "job"),
+    "Use case": ("use case", "usecase", "problem", "need", "interest", "goal", "requirement"),
+    "Team size": ("team size", "team", "headcount", "size", "users", "number of users", "employees", "seats"),
+    "Timeline": ("timeline", "timeframe", "time frame", "when", "deadline", "start date", "implementation timeline"),
+}
+
+_FIELD_BY_ALIAS = {alias: field for field, aliases in LEAD_FIELD_ALIASES.items() for alias in aliases}
+_SEPARATORS_RE = re.compile(r"[\s_\-]+")
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[a-z]{2,}$", re.IGNORECASE)
+
+
+def resolve_field(name: str) -> Optional[str]:
+    """Maps "team_size", "Team Size", "headcount" ... to the canonical LEAD_FIELDS name."""
+    key = _SEPARATORS_RE.sub(" ", (name or "").strip().lower())
+    return _FIELD_BY_ALIAS.get(key)
+
+
+def _validate(field: str, value: str) -> Optional[str]:
+    """Returns a reason the value is unusable, or None if it can be stored."""
+    if field == "Email" and not _EMAIL_RE.match(value):
+        return "not a complete email address"
+    return None
+
+
+def apply_lead_updates(
+    lead_data: Dict[str, Any], updates: Iterable[Tuple[str, Optional[str]]]
+) -> Tuple[List[str], List[str]]:
+    """Validates (field name, value) pairs in one pass and stores the usable ones in `lead_data`.
+
+    Returns (stored field names, human-readable rejections). Later pairs for
+    the same field win, so a correction in the same call replaces the first
+    value.
+    """
+    accepted: Dict[str, str] = {}
+    rejected: List[str] = []
+    for raw_name, raw_value in updates:
+        field = resolve_field(raw_name)
+        value = (raw_value or "").strip()
+        if field is None:
+            rejected.append(f"'{raw_name}' is not a lead field")
+            continue
+        if not value:
+            continue
+        if field == "Email":
+            value = value.lower()
+        reason = _validate(field, value)
+        if reason:
+            rejected.append(f"{field}: {reason}")
+            continue
+        accepted[field] = value
+    lead_data.update(accepted)
+    return list(accepted), rejected
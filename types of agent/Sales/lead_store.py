@@ -0,0 +1,237 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker process there
+    fcntl = None
+
+logger = logging.getLogger("agent")
+
+
+@contextmanager
+def _exclusive_lock(path: str):
+    """flock on `path`, shared by every worker process prewarming against the same database."""
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+# Lead field (as used in SDRSessionState.lead_data) -> column
+LEAD_COLUMNS = {
+    "Name": "name",
+    "Company": "company",
+    "Email": "email",
+    "Role": "role",
+    "Use case": "use_case",
+    "Team size": "team_size",
+    "Timeline": "timeline",
+}
+
+
+def _norm(value: Optional[str]) -> Optional[str]:
+    value = (value or "").strip().lower()
+    return " ".join(value.split()) or None
+
+
+class LeadRepository:
+    """SQLite store of qualified leads, one row per visitor.
+
+    Visitors are identified by normalized email, or by name and company when
+    no email was given. A repeat visit updates the existing row: new non-empty
+    values replace old ones, and the visit counter and last_seen advance.
+    Email and company are indexed, so lookups and exports never touch the
+    chat transcripts.
+
+    Writes block for up to `busy_timeout_ms` while another process writes, so
+    the agent runs them through `asyncio.to_thread`; the connection is shared
+    by those threads behind a lock.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        field_columns = ",\n".join(f"                {column} TEXT" for column in LEAD_COLUMNS.values())
+        self._conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS leads (
+                lead_id INTEGER PRIMARY KEY,
+{field_columns},
+                email_norm TEXT UNIQUE,
+                company_norm TEXT,
+                name_norm TEXT,
+                visits INTEGER NOT NULL DEFAULT 1,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                last_room TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_leads_company ON leads (company_norm);
+            CREATE INDEX IF NOT EXISTS idx_leads_name_company ON leads (name_norm, company_norm);
+            CREATE INDEX IF NOT EXISTS idx_leads_last_seen ON leads (last_seen, lead_id);
+            """
+        )
+
+    def close(self):
+        self._conn.close()
+
+    def upsert(self, lead_data: Dict[str, Any], room: Optional[str] = None) -> Optional[int]:
+        """Inserts or merges one visitor's lead; returns the lead id, or None if no field was captured."""
+        values = {column: (str(lead_data[field]).strip() if lead_data.get(field) else None)
+                  for field, column in LEAD_COLUMNS.items()}
+        if not any(values.values()):
+            return None
+        if values["email"]:
+            values["email"] = values["email"].lower()
+        keys = {
+            "email_norm": _norm(values["email"]),
+            "company_norm": _norm(values["company"]),
+            "name_norm": _norm(values["name"]),
+        }
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                existing = self._find_existing(keys)
+                if existing is None:
+                    row = {**values, **keys, "first_seen": now, "last_seen": now, "last_room": room}
+                    columns = ", ".join(row)
+                    placeholders = ", ".join(f":{c}" for c in row)
+                    lead_id = self._conn.execute(f"INSERT INTO leads ({columns}) VALUES ({placeholders})", row).lastrowid
+                else:
+                    lead_id = existing["lead_id"]
+                    # Keep what we knew unless this visit captured a new value
+                    assignments = ", ".join(f"{c} = COALESCE(:{c}, {c})" for c in list(values) + list(keys))
+                    self._conn.execute(
+                        f"UPDATE leads SET {assignments}, visits = visits + 1, last_seen = :now, last_room = :room "
+                        f"WHERE lead_id = :lead_id",
+                        {**values, **keys, "now": now, "room": room, "lead_id": lead_id},
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return lead_id
+
+    def _find_existing(self, keys: Dict[str, Optional[str]]) -> Optional[sqlite3.Row]:
+        if keys["email_norm"]:
+            row = self._conn.execute("SELECT * FROM leads WHERE email_norm = ?", (keys["email_norm"],)).fetchone()
+            if row:
+                return row
+        if keys["name_norm"] and keys["company_norm"]:
+            # A visitor who gave no email last time (or this time) is matched by name and company
+            return self._conn.execute(
+                "SELECT * FROM leads WHERE name_norm = ? AND company_norm = ? "
+                "AND (email_norm IS NULL OR ? IS NULL) ORDER BY last_seen DESC LIMIT 1",
+                (keys["name_norm"], keys["company_norm"], keys["email_norm"]),
+            ).fetchone()
+        return None
+
+    def get(self, lead_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM leads WHERE lead_id = ?", (lead_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_email(self, email: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM leads WHERE email_norm = ?", (_norm(email),)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_company(self, company: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM leads WHERE company_norm = ? ORDER BY last_seen DESC", (_norm(company),)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def iter_leads(self, since: Optional[float] = None) -> Iterator[dict]:
+        """Streams leads in id order, optionally only those seen since a timestamp."""
+        sql, params = "SELECT * FROM leads", ()
+        if since is not None:
+            sql, params = sql + " WHERE last_seen >= ?", (since,)
+        for row in self._conn.execute(sql + " ORDER BY lead_id", params):
+            yield dict(row)
+
+    def iter_batches(
+        self,
+        after: Optional[Tuple[float, int]] = None,
+        batch_size: int = 10_000,
+        columns: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """Streams (column names, rows) batches in (last_seen, lead_id) order.
+
+        `after` is the (last_seen, lead_id) of the last row already exported;
+        only rows changed since then are returned. Rows are plain tuples, so
+        a batch costs no per-row dict. `columns` defaults to every column.
+        """
+        sql, params = f"SELECT {', '.join(columns) if columns else '*'} FROM leads", ()
+        if after is not None:
+            sql, params = sql + " WHERE (last_seen, lead_id) > (?, ?)", tuple(after)
+        cursor = self._conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(sql + " ORDER BY last_seen, lead_id", params)
+        columns = [d[0] for d in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield columns, rows
+
+    def import_legacy_file(self, path: str) -> int:
+        """One-time import of lead dicts from the old mixed `captured_lead_data.json` (chat lines are skipped).
+
+        Every worker process calls this from prewarm, so the import runs under an
+        exclusive lock and a file another process already moved counts as migrated.
+        """
+        with _exclusive_lock(self.path + ".migrate.lock"):
+            try:
+                return self._import_legacy_file(path)
+            except FileNotFoundError:
+                return 0
+
+    def _import_legacy_file(self, path: str) -> int:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        try:
+            with open(path, "r") as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            # Moved by another process between the checks; the caller counts it as migrated
+            raise
+        except (IOError, json.JSONDecodeError):
+            logger.warning(f"Could not parse legacy lead file {path}; skipping import.")
+            return 0
+        if not isinstance(records, list):
+            return 0
+
+        imported = 0
+        for record in records:
+            if isinstance(record, dict) and any(field in record for field in LEAD_COLUMNS):
+                if self.upsert(record, room="legacy-import") is not None:
+                    imported += 1
+        os.replace(path, path + ".migrated")
+        logger.info(f"Imported {imported} leads from {path}; skipped {len(records) - imported} chat lines.")
+        return imported
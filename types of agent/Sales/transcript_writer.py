@@ -0,0 +1,311 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Deque, List, Literal, Optional, Tuple
+
+logger = logging.getLogger("agent")
+
+
+class TranscriptWriter:
+    """Append-only JSON Lines transcript for one SDR session.
+
+    Each message is one line written through a buffered file handle. The
+    buffer is flushed every `flush_every` messages or `flush_interval`
+    seconds, whichever comes first, and on `close()`. `write()` can only
+    check the interval when a message arrives, so the owner of the writer
+    polls `flush_due` on a timer (TranscriptPersister does) to flush lines
+    left behind by a quiet session. Writing a message never reads or
+    rewrites earlier ones, so a conversation costs O(n) I/O in total.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_every: int = 16,
+        flush_interval: float = 2.0,
+        buffer_size: int = 64 * 1024,
+    ):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", buffering=buffer_size, encoding="utf-8")
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self.messages_written = 0
+
+    @classmethod
+    def for_session(cls, directory: str, session_id: str, **kwargs) -> "TranscriptWriter":
+        """One file per session: `<directory>/<YYYYmmdd-HHMMSS>-<session_id>.jsonl`."""
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id) or "session"
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{safe_id}.jsonl"
+        return cls(os.path.join(directory, name), **kwargs)
+
+    @property
+    def closed(self) -> bool:
+        return self._file is None
+
+    def write(self, role: str, message: str, timestamp: Optional[float] = None) -> None:
+        if self._file is None:
+            logger.warning(f"Dropping transcript message for closed {self.path}")
+            return
+        record = {"ts": round(timestamp or time.time(), 3), "role": role, "message": message}
+        self._file.write(json.dumps(record) + "\n")
+        self.messages_written += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    @property
+    def flush_due(self) -> bool:
+        """True when unflushed lines have waited at least `flush_interval`."""
+        return bool(self._unflushed) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self) -> None:
+        if self._file is not None and self._unflushed:
+            self._file.flush()
+            self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+OverflowPolicy = Literal["drop_oldest", "drop_newest"]
+
+
+class TranscriptPersister:
+    """Feeds a TranscriptWriter from a bounded queue drained by one background task.
+
+    Event handlers call `enqueue()`, which never blocks or touches the disk.
+    The task waits `batch_delay` after the first message, then takes
+    everything queued and writes it in a worker thread,
+    so buffer flushes never stall the loop that streams STT/TTS audio. When
+    the queue is full the overflow policy decides which message is lost:
+    `drop_oldest` evicts the oldest queued message, `drop_newest` rejects the
+    incoming one. Either way it is counted in `stats()["dropped"]`, as are
+    messages in a batch that failed to write and messages enqueued after
+    `close()`.
+    """
+
+    def __init__(
+        self,
+        writer: TranscriptWriter,
+        *,
+        max_queue: int = 1000,
+        overflow: OverflowPolicy = "drop_oldest",
+        batch_delay: float = 0.05,
+    ):
+        if overflow not in ("drop_oldest", "drop_newest"):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.writer = writer
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.batch_delay = batch_delay
+        # (enqueued_at, role, message, wall-clock timestamp)
+        self._queue: Deque[Tuple[float, str, str, float]] = collections.deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._max_depth = 0
+        self._lag_ms_total = 0.0
+        self._lag_ms_max = 0.0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="sdr-transcript-writer")
+
+    def enqueue(self, role: str, message: str) -> bool:
+        """Queues one message; returns False if it was dropped by the overflow policy or after close."""
+        self._enqueued += 1
+        if self._stopping:
+            self._dropped += 1
+            return False
+        if len(self._queue) >= self.max_queue:
+            self._dropped += 1
+            if self.overflow == "drop_newest":
+                return False
+            self._queue.popleft()
+        self._queue.append((time.perf_counter(), role, message, time.time()))
+        self._max_depth = max(self._max_depth, len(self._queue))
+        self._ready.set()
+        return True
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.writer.flush_interval)
+            except asyncio.TimeoutError:
+                # Quiet session: push buffered lines to disk instead of holding them until close
+                if self.writer.flush_due:
+                    await asyncio.to_thread(self.writer.flush)
+                continue
+            if not self._stopping:
+                # Let a few messages accumulate so one thread hop writes a batch
+                await asyncio.sleep(self.batch_delay)
+            self._ready.clear()
+            await self._drain()
+        # Stopping: whatever arrived before close() is written before the task ends
+        await self._drain()
+
+    async def _drain(self) -> None:
+        while self._queue:
+            batch = list(self._queue)
+            self._queue.clear()
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} transcript messages to {self.writer.path}: {e}")
+                self._dropped += len(batch)
+                continue
+            written_at = time.perf_counter()
+            for enqueued_at, *_ in batch:
+                lag_ms = (written_at - enqueued_at) * 1000
+                self._lag_ms_total += lag_ms
+                self._lag_ms_max = max(self._lag_ms_max, lag_ms)
+            self._written += len(batch)
+
+    def _write_batch(self, batch: List[Tuple[float, str, str, float]]) -> None:
+        for _, role, message, timestamp in batch:
+            self.writer.write(role, message, timestamp)
+
+    async def close(self) -> None:
+        """Stops accepting messages, waits for the task to write the queue, then closes the file.
+
+        The task is never cancelled: a batch already running in a worker
+        thread finishes before the writer is closed underneath it.
+        """
+        self._stopping = True
+        self._ready.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        else:
+            await self._drain()
+        await asyncio.to_thread(self.writer.close)
+
+    def stats(self) -> dict:
+        written = self._written or 1
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self._max_depth,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "dropped": self._dropped,
+            "avg_writer_lag_ms": round(self._lag_ms_total / written, 3),
+            "max_writer_lag_ms": round(self._lag_ms_max, 3),
+        }
+
+
+# --- Benchmark: `python transcript_writer.py [turns]` ---
+
+def _rewrite_whole_file(path: str, role: str, message: str) -> None:
+    """The previous save_chat: parse the whole array, append, rewrite with indent=4."""
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump([], f)
+    with open(path, "r") as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError:
+            data = []
+    data.append({"role": role, "message": message})
+    with open(path, "w") as f:
+        json.dump(data, f, indent=4)
+
+
+def _benchmark(turns: int) -> None:
+    import tempfile
+
+    messages = []
+    for i in range(turns):
+        messages.append(("user", f"User utterance number {i} about pricing, NeuCoins and team size of {i % 50} people."))
+        messages.append(("agent", f"Agent reply number {i}: Tata Neu brings BigBasket, Croma and Air India into one app. " * 2))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "captured_lead_data.json")
+        started = time.perf_counter()
+        worst = 0.0
+        for role, message in messages:
+            t = time.perf_counter()
+            _rewrite_whole_file(old_path, role, message)
+            worst = max(worst, time.perf_counter() - t)
+        old_total = time.perf_counter() - started
+        print(
+            f"Rewrite whole file: {turns} turns ({len(messages)} messages) in {old_total * 1000:.0f} ms, "
+            f"worst message {worst * 1000:.2f} ms, {os.path.getsize(old_path) // 1024} KiB"
+        )
+
+        writer = TranscriptWriter.for_session(tmp, "bench-room")
+        started = time.perf_counter()
+        worst = 0.0
+        for role, message in messages:
+            t = time.perf_counter()
+            writer.write(role, message)
+            worst = max(worst, time.perf_counter() - t)
+        writer.close()
+        new_total = time.perf_counter() - started
+        print(
+            f"JSONL writer:       {turns} turns ({len(messages)} messages) in {new_total * 1000:.1f} ms, "
+            f"worst message {worst * 1000:.3f} ms, {os.path.getsize(writer.path) // 1024} KiB"
+        )
+        print(f"Speedup: {old_total / new_total:.0f}x")
+
+        asyncio.run(_benchmark_loop_lag(tmp, messages))
+
+
+async def _measure_lag(stop: asyncio.Event, samples: List[float], interval: float = 0.001) -> None:
+    """Samples how late a 1 ms sleep wakes up: the event loop lag seen by audio tasks."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def _benchmark_loop_lag(tmp: str, messages: List[Tuple[str, str]]) -> None:
+    def report(label: str, samples: List[float]) -> None:
+        samples = sorted(samples)
+        p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        print(f"{label:34} loop lag p99 {p99:.2f} ms, max {samples[-1]:.2f} ms")
+
+    async def conversation(save) -> List[float]:
+        stop, samples = asyncio.Event(), []
+        monitor = asyncio.create_task(_measure_lag(stop, samples))
+        for role, message in messages:
+            save(role, message)
+            # Utterances arrive spread out; yield to the loop between them
+            await asyncio.sleep(0.002)
+        stop.set()
+        await monitor
+        return samples
+
+    # Baseline: same pacing with no persistence, to separate scheduler jitter from write cost
+    report("No persistence (idle baseline):", await conversation(lambda r, m: None))
+
+    old_path = os.path.join(tmp, "lag_captured_lead_data.json")
+    report("Rewrite whole file on the loop:", await conversation(lambda r, m: _rewrite_whole_file(old_path, r, m)))
+
+    persister = TranscriptPersister(TranscriptWriter.for_session(tmp, "lag-room"))
+    persister.start()
+    samples = await conversation(persister.enqueue)
+    await persister.close()
+    report("Queue + background writer:", samples)
+    print(f"Persister stats: {persister.stats()}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -1,6 +1,7 @@
 import logging
 import json 
 import os 
+from typing import Optional
 
 from dotenv import load_dotenv
 from livekit.agents import (
@@ -20,71 +21,91 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from menu import Menu
+from order_queue import OrderLog, OrderQueue
+from order_state import CoffeeSessionState, slot_prompt
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+# Every placed order, one JSON line each, shared by all sessions and worker processes
+_default_orders_dir = os.path.join(os.getcwd(), "backend")
+if not os.path.exists(_default_orders_dir):
+    _default_orders_dir = os.getcwd()
+ORDERS_FILE = os.getenv("COFFEE_ORDERS_FILE", os.path.join(_default_orders_dir, "orders.jsonl"))
+# Drinks, sizes, milks and extras with their spoken aliases and prices
+MENU_FILE = os.getenv("COFFEE_MENU_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json"))
+
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(self, order_queue: OrderQueue, menu: Menu) -> None:
+        self.order_queue = order_queue
+        self.menu = menu
         super().__init__(
-            instructions="""You are 'Shadow Brews Barista', a friendly and welcoming barista for a premium coffee shop. Your goal is to take a customer's coffee order and fill out all fields of the available tool's order state.
-
-            Your responses must be friendly, encouraging, and focused only on gathering the following order details: drinkType (e.g., Latte, Cappuccino, Espresso, Tea), size (e.g., Small, Large), milk (e.g., Oat, Whole), any extras (e.g., Whipped Cream, Extra Shot), and the customer's name.
+            instructions=f"""You are 'Shadow Brews Barista', a friendly and welcoming barista for a premium coffee shop. Your goal is to take the customer's coffee order.
 
-            If a user provides an incomplete order, you must ask a polite, clarifying question to get the next missing piece of information.
+            Whenever the customer mentions anything about their order (drink, size, milk, extras or their name), call 'update_coffee_order' with just those details, in the customer's own words (e.g. "large cap", "oat flat white"). Then say the question or confirmation the tool returns, in a friendly way. Do not track missing details yourself; the tool tells you what to ask next and places the order once everything is known.
 
-            Once you have all the information required by the 'place_coffee_order' tool, call the tool immediately to finalize the order. Do not ask for confirmation before calling the tool if all information is present.
+            Menu drinks: {', '.join(menu.names("drink"))}.
             """,
         )
 
-    @function_tool 
-    async def place_coffee_order(
+    @function_tool
+    async def update_coffee_order(
         self,
-        context: RunContext,
-        drinkType: str,
-        size: str,
-        milk: str,
-        extras: list[str],
-        name: str,
+        context: RunContext[CoffeeSessionState],
+        drinkType: Optional[str] = None,
+        size: Optional[str] = None,
+        milk: Optional[str] = None,
+        extras: Optional[list[str]] = None,
+        name: Optional[str] = None,
     ):
-        """Use this tool to finalize a customer's coffee order and save the details once all fields are known.
-        
+        """Use this tool every time the customer gives any order detail. Pass only what they just said; omit the rest.
+        The order is placed automatically once every detail is known.
+
         Args:
-            drinkType: The main type of coffee or beverage (e.g., Latte, Cappuccino, Espresso, Tea).
-            size: The desired size of the drink (e.g., Small, Medium, Large).
-            milk: The type of milk to be used (e.g., Whole, Skim, Oat, Almond).
-            extras: A list of any additional ingredients (e.g., Whipped Cream, Extra Shot, Vanilla Syrup, Caramel). Use an empty list if none.
+            drinkType: The drink in the customer's words (e.g., "oat flat white", "large cap", "latte").
+            size: The size (e.g., Small, Medium, Large, "venti").
+            milk: The milk (e.g., Oat, Whole, "no milk").
+            extras: Extras the customer asked for (e.g., ["extra shot", "vanilla"]). Use ["none"] if they want no extras.
             name: The customer's name for the order.
         """
+        state = context.userdata
+        state.tool_calls += 1
+        order = state.order
+        corrections = order.apply(self.menu, drinkType, size, milk, extras, name)
+        if corrections:
+            logger.info(f"Order needs correction: {corrections}")
+            return f"{' '.join(corrections)} Ask the customer only about this."
+
+        missing = order.missing()
+        if missing:
+            return f"So far: {order.summary()}. Ask next: {slot_prompt(missing[0], self.menu)}"
+
+        # Every slot is filled: price it, append it to the shared log and send a ticket to the barista display
+        placed = {**order.as_order(), "price": self.menu.order_price(order.as_order())}
+        ticket = await self.order_queue.place(placed)
+        logger.info(f"Placed order {ticket.order_id} as ticket #{ticket.number}")
+        assumed = list(order.assumed)
+        state.order_completed()
 
-        order = {
-            "drinkType": drinkType,
-            "size": size,
-            "milk": milk,
-            "extras": extras,
-            "name": name,
-        }
-
-        # REQUIRED STEP: Save the order to a JSON file
-        file_path = "day2_order_summary.json"
-        
-        # Get the path to the backend directory, or current directory as a fallback
-        output_dir = os.path.join(os.getcwd(), "backend") 
-        if not os.path.exists(output_dir):
-            output_dir = os.getcwd() 
-
-        final_path = os.path.join(output_dir, file_path)
-
-        with open(final_path, 'w') as f:
-            json.dump(order, f, indent=4)
-        
         # Return a friendly confirmation message to the LLM for it to speak back to the user
-        return f"Order for {name} has been placed. Details saved to {final_path}. The customer ordered a {size} {drinkType} with {milk} and the following extras: {', '.join(extras) if extras else 'None'}."
+        extras_text = ", ".join(placed["extras"]) or "None"
+        message = (
+            f"Order for {placed['name']} has been placed as ticket number {ticket.number}. The customer ordered a {placed['size']} "
+            f"{placed['drinkType']} with {placed['milk']} milk and the following extras: {extras_text}. "
+            f"Total: {placed['price']:.2f} {self.menu.currency}."
+        )
+        if assumed:
+            message += f" Mention how these were understood: {'; '.join(assumed)}."
+        return message
 
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["order_queue"] = OrderQueue(OrderLog(ORDERS_FILE))
+    proc.userdata["menu"] = Menu.load(MENU_FILE)
 
 
 async def entrypoint(ctx: JobContext):
@@ -95,7 +116,9 @@ async def entrypoint(ctx: JobContext):
     }
 
     # Set up a voice AI pipeline using Murf Falcon, Gemini, Deepgram, and LiveKit
+    session_state = CoffeeSessionState()
     session = AgentSession(
+        userdata=session_state,
         # Speech-to-text (STT) is your agent's ears, turning the user's speech into text that the LLM can understand
         # See all available models at https://docs.livekit.io/agents/models/stt/
         stt=deepgram.STT(model="nova-3"),
@@ -140,12 +163,36 @@ async def entrypoint(ctx: JobContext):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
 
+    @session.on("conversation_item_added")
+    def _on_conversation_item_added(ev):
+        if ev.item.role == "user":
+            session_state.user_turns += 1
+
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        # Cost of taking an order, to compare against the free-form flow
+        completed = session_state.orders_completed
+        if completed:
+            llm_tokens = summary.llm_prompt_tokens + summary.llm_completion_tokens
+            logger.info(
+                f"Orders completed: {completed}, user turns per order: {session_state.turns_per_order}, "
+                f"tool calls: {session_state.tool_calls}, LLM tokens per order: {llm_tokens / completed:.0f}"
+            )
+        else:
+            logger.info(f"No order completed; user turns: {session_state.user_turns}, tool calls: {session_state.tool_calls}")
 
     ctx.add_shutdown_callback(log_usage)
 
+    # The barista display consumer runs once per worker process, across its sessions
+    order_queue = ctx.proc.userdata["order_queue"]
+    order_queue.start()
+
+    async def log_orders():
+        logger.info(f"Order queue: {order_queue.stats()}")
+
+    ctx.add_shutdown_callback(log_orders)
+
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/models/avatar/
     # avatar = hedra.AvatarSession(
@@ -156,7 +203,7 @@ async def entrypoint(ctx: JobContext):
 
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=Assistant(order_queue, ctx.proc.userdata["menu"]),
         room=ctx.room,
         room_input_options=RoomInputOptions(
             # For telephony applications, use `BVCTelephony` for best results
@@ -0,0 +1,380 @@
+import json
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+KINDS = ("drink", "size", "milk", "extra")
+# Fuzzy matches below this trigram similarity are treated as unknown
+MIN_SIMILARITY = 0.5
+
+# Words that carry no order information in "can I get a large oat latte please"
+FILLER_WORDS = frozenset(
+    "a an the and with of in on to for please i id i'd want would like can could get me have some one "
+    "make it that be just also plus add extra more milk coffee drink cup order thanks thank you".split()
+)
+# First word of an extras entry meaning "no extras": "none", "no thanks", "nothing else", "nope, that's all"
+NO_EXTRAS = frozenset(["none", "no", "nothing", "nope", "nah", "na", "n"])
+
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD_RE.sub(" ", (text or "").lower()).strip()
+
+
+def content_words(text: str) -> List[str]:
+    """The words of a phrase that can name something: "with some milk" has none."""
+    return [w for w in normalize(text).split() if w not in FILLER_WORDS]
+
+
+def _no_extras(text: str) -> bool:
+    words = content_words(text)
+    return not normalize(text) or bool(words) and words[0] in NO_EXTRAS
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MenuItem(NamedTuple):
+    kind: str
+    name: str
+    aliases: Tuple[str, ...]
+    # Drinks are priced per size; milks and extras add a flat surcharge
+    prices: Dict[str, float]
+    price: float
+
+
+class Match(NamedTuple):
+    item: MenuItem
+    score: float
+    text: str
+
+
+class MenuResolution(NamedTuple):
+    order: Dict[str, object]
+    price: Optional[float]
+    corrections: List[str]
+    # Fuzzy matches worth confirming with the customer, e.g. "'frappuccino' taken as Cappuccino"
+    assumed: List[str]
+
+    @property
+    def ok(self) -> bool:
+        return not self.corrections
+
+
+class Menu:
+    """The coffee menu with an alias index and a trigram index over every alias.
+
+    Exact aliases ("cap", "oat milk", "venti") resolve with one dict lookup;
+    anything else is compared by trigram similarity against the aliases that
+    share a trigram with it, so misheard words ("capuccino", "almund") still
+    resolve. A spoken phrase can name several things at once: "large oat
+    flat white" yields a size, a milk and a drink.
+    """
+
+    def __init__(self, items: Iterable[MenuItem], currency: str = "USD"):
+        self.currency = currency
+        self.items: Dict[str, List[MenuItem]] = {kind: [] for kind in KINDS}
+        self._by_alias: Dict[str, MenuItem] = {}
+        self._alias_grams: Dict[str, Set[str]] = {}
+        self._gram_index: Dict[str, Set[str]] = defaultdict(set)
+        self._by_name: Dict[str, Dict[str, MenuItem]] = {kind: {} for kind in KINDS}
+        self._max_alias_words = 1
+        for item in items:
+            self.items[item.kind].append(item)
+            self._by_name[item.kind][item.name] = item
+            for alias in {normalize(item.name), *(normalize(a) for a in item.aliases)}:
+                self._by_alias.setdefault(alias, item)
+                grams = trigrams(alias)
+                self._alias_grams[alias] = grams
+                for gram in grams:
+                    self._gram_index[gram].add(alias)
+                self._max_alias_words = max(self._max_alias_words, len(alias.split()))
+
+    @classmethod
+    def load(cls, path: str) -> "Menu":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        items = []
+        for kind, key in (("drink", "drinks"), ("size", "sizes"), ("milk", "milks"), ("extra", "extras")):
+            for entry in data.get(key, []):
+                items.append(MenuItem(kind, entry["name"], tuple(entry.get("aliases", [])),
+                                      entry.get("prices", {}), entry.get("price", 0.0)))
+        return cls(items, data.get("currency", "USD"))
+
+    def names(self, kind: str) -> List[str]:
+        return [item.name for item in self.items[kind]]
+
+    # --- lookup ---
+
+    def _fuzzy(self, text: str, kind: Optional[str] = None, limit: int = 1) -> List[Match]:
+        grams = trigrams(text)
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for alias in self._gram_index.get(gram, ()):
+                shared[alias] += 1
+        best: Dict[str, Match] = {}
+        for alias, count in shared.items():
+            item = self._by_alias[alias]
+            if kind is not None and item.kind != kind:
+                continue
+            # Dice coefficient over trigram sets
+            score = 2 * count / (len(grams) + len(self._alias_grams[alias]))
+            if item.name not in best or score > best[item.name].score:
+                best[item.name] = Match(item, score, text)
+        return sorted(best.values(), key=lambda m: m.score, reverse=True)[:limit]
+
+    def lookup(self, text: str, kind: Optional[str] = None) -> Optional[Match]:
+        """Resolves a whole phrase to one item: an exact alias, else the closest alias above MIN_SIMILARITY."""
+        text = normalize(text)
+        if not text:
+            return None
+        item = self._by_alias.get(text)
+        if item is not None and (kind is None or item.kind == kind):
+            return Match(item, 1.0, text)
+        matches = self._fuzzy(text, kind)
+        if matches and matches[0].score >= MIN_SIMILARITY:
+            return matches[0]
+        return None
+
+    def _misheard_part(self, word: str, item: MenuItem) -> bool:
+        """True when a leftover word is a garbled word of the item's own name, like "wite" in "flat wite"."""
+        grams = trigrams(word)
+        for alias in {normalize(item.name), *(normalize(a) for a in item.aliases)}:
+            for part in alias.split():
+                part_grams = trigrams(part)
+                if 2 * len(grams & part_grams) / (len(grams) + len(part_grams)) >= MIN_SIMILARITY:
+                    return True
+        return False
+
+    def suggest(self, text: str, kind: str, limit: int = 3) -> List[str]:
+        return [m.item.name for m in self._fuzzy(normalize(text), kind, limit)] or self.names(kind)[:limit]
+
+    def parse(self, text: str) -> Tuple[List[Match], List[str]]:
+        """Finds every menu item named in a phrase; returns (matches, words that matched nothing).
+
+        Longest exact aliases are taken first, so "hot chocolate" beats "hot"
+        and "caramel macchiato" beats "caramel"; the remaining words are then
+        matched fuzzily one or two at a time.
+        """
+        words = normalize(text).split()
+        taken = [False] * len(words)
+        matches: List[Match] = []
+        for size in range(min(self._max_alias_words, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                if any(taken[start:start + size]):
+                    continue
+                phrase = " ".join(words[start:start + size])
+                item = self._by_alias.get(phrase)
+                if item is not None:
+                    matches.append(Match(item, 1.0, phrase))
+                    taken[start:start + size] = [True] * size
+
+        unknown = []
+        start = 0
+        while start < len(words):
+            if taken[start] or words[start] in FILLER_WORDS:
+                start += 1
+                continue
+            match = None
+            if start + 1 < len(words) and not taken[start + 1] and words[start + 1] not in FILLER_WORDS:
+                match = self.lookup(f"{words[start]} {words[start + 1]}")
+                span = 2
+            if match is None:
+                match = self.lookup(words[start]) if len(words[start]) >= 3 else None
+                span = 1
+            if match is None:
+                unknown.append(words[start])
+            else:
+                matches.append(match)
+            start += span if match else 1
+        return matches, unknown
+
+    # --- orders ---
+
+    def _collect(self, text: str, kind: str) -> Tuple[List[Match], List[str]]:
+        matches, unknown = self.parse(text)
+        if any(m.item.kind == kind for m in matches):
+            return matches, unknown
+        # Nothing of the slot's own kind was named word by word: fall back to the whole phrase as that kind,
+        # without filler that would pull it toward the wrong alias ("milk" toward "no milk", "some" toward "soy")
+        match = self.lookup(" ".join(content_words(text)), kind)
+        if match is not None:
+            return [match], []
+        return matches, unknown
+
+    def resolve_fields(
+        self,
+        drink_type: Optional[str] = None,
+        size: Optional[str] = None,
+        milk: Optional[str] = None,
+        extras: Optional[Iterable[str]] = None,
+    ) -> MenuResolution:
+        """Maps whichever order fields were given to menu items, without requiring the rest.
+
+        Items named in the "wrong" field still count ("large cap" as the
+        drink fills size and drink), but a field's own value wins. `order`
+        holds only resolved fields ("extras" only when extras were given or
+        named elsewhere); corrections cover given fields that could not be
+        resolved, and fuzzy matches are listed in `assumed` so the agent can
+        confirm them. A field whose own item matched but which still has
+        words that are neither filler nor part of that item's name ("matcha
+        latte", "pumpkin spice latte") is a correction too, rather than a
+        plain Latte. A field made only of filler ("milk", "with milk") says
+        nothing and is left unresolved, so the slot is asked for again.
+        """
+        found: Dict[str, List[Match]] = {kind: [] for kind in KINDS}
+        unknown: Dict[str, List[str]] = {}
+        unheard: Dict[str, List[str]] = {}
+        fields = {"drink": ("drinkType", drink_type), "size": ("size", size), "milk": ("milk", milk)}
+        for kind, (_, text) in fields.items():
+            # No menu alias is all filler, so such a field cannot name anything
+            if not text or not content_words(text):
+                continue
+            matches, leftover = self._collect(text, kind)
+            # Own-slot matches go first so they win over mentions in other fields
+            for match in matches:
+                if match.item.kind == kind:
+                    found[kind].insert(0, match)
+                else:
+                    found[match.item.kind].append(match)
+            unknown[kind] = leftover
+            if found[kind] and found[kind][0] in matches:
+                unheard[kind] = [w for w in leftover if not self._misheard_part(w, found[kind][0].item)]
+
+        corrections: List[str] = []
+        used: List[Match] = list(found["extra"])
+        chosen_extras: List[str] = [m.item.name for m in found["extra"]]
+        for raw in extras or []:
+            if _no_extras(raw):
+                continue
+            matches, _ = self._collect(raw, "extra")
+            extra_matches = [m for m in matches if m.item.kind == "extra"]
+            if not extra_matches:
+                corrections.append(f"'{raw}' is not an extra we offer; options include {', '.join(self.suggest(raw, 'extra'))}.")
+            for match in extra_matches:
+                if match.item.name not in chosen_extras:
+                    chosen_extras.append(match.item.name)
+                    used.append(match)
+
+        order: Dict[str, object] = {}
+        for kind, (field, raw) in fields.items():
+            if unheard.get(kind):
+                corrections.append(
+                    f"{field} '{raw}' is not on the menu as said ('{' '.join(unheard[kind])}' is not something we make); "
+                    f"closest options: {', '.join(self.suggest(raw, kind))}."
+                )
+            elif found[kind]:
+                used.append(found[kind][0])
+                order[field] = found[kind][0].item.name
+            elif kind in unknown:
+                heard = " ".join(unknown[kind]) or raw
+                corrections.append(
+                    f"Could not match {field} '{heard}'; closest options: {', '.join(self.suggest(heard, kind))}."
+                )
+        if extras is not None or chosen_extras:
+            order["extras"] = chosen_extras
+        assumed = [f"'{m.text}' taken as {m.item.name}" for m in used if m.score < 1.0]
+        return MenuResolution(order, None, corrections, assumed)
+
+    def resolve_order(self, drink_type: str, size: str, milk: str, extras: Iterable[str]) -> MenuResolution:
+        """Resolves a complete order and prices it; missing fields are reported as corrections."""
+        resolution = self.resolve_fields(drink_type, size, milk, list(extras or []))
+        order, corrections = resolution.order, list(resolution.corrections)
+        for kind, field, raw in (("drink", "drinkType", drink_type), ("size", "size", size), ("milk", "milk", milk)):
+            if field not in order:
+                if not raw or not content_words(raw):
+                    corrections.append(f"{field} is missing; options: {', '.join(self.names(kind))}.")
+                order[field] = raw
+        if corrections:
+            return MenuResolution(order, None, corrections, resolution.assumed)
+        return MenuResolution(order, self.order_price(order), [], resolution.assumed)
+
+    def order_price(self, order: Dict[str, object]) -> float:
+        """Prices an order whose drinkType, size, milk and extras are menu names."""
+        drink = self._by_name["drink"][order["drinkType"]]
+        total = drink.prices.get(order["size"], 0.0) + self._by_name["milk"][order["milk"]].price
+        total += sum(self._by_name["extra"][name].price for name in order.get("extras") or [])
+        return round(total, 2)
+
+
+# --- Benchmark: `python menu.py` ---
+
+# (drinkType, size, milk, extras) as the LLM passes them through from speech, with the expected order;
+# None marks a field that must come back as the only correction
+_SPOKEN_ORDERS = [
+    (("oat flat white", "", "", []), ("Flat White", None, "Oat", [])),
+    (("large cap", "", "whole", []), ("Cappuccino", "Large", "Whole", [])),
+    (("latte", "grande", "almond milk", ["vanilla"]), ("Latte", "Medium", "Almond", ["Vanilla Syrup"])),
+    (("capuccino", "small", "skimmed", []), ("Cappuccino", "Small", "Skim", [])),
+    (("expresso", "small", "no milk", ["double shot"]), ("Espresso", "Small", "None", ["Extra Shot"])),
+    (("mocca", "big", "oatly", ["whip"]), ("Mocha", "Large", "Oat", ["Whipped Cream"])),
+    (("iced coffee", "medium", "soya", []), ("Cold Brew", "Medium", "Soy", [])),
+    (("chai", "tall", "coconut milk", ["cinnamon"]), ("Chai Latte", "Small", "Coconut", ["Cinnamon"])),
+    (("hot chocolate with whipped cream", "large", "whole", []), ("Hot Chocolate", "Large", "Whole", ["Whipped Cream"])),
+    (("caramel macchiato", "venti", "almund", ["extra caramel"]), ("Macchiato", "Large", "Almond", ["Caramel Syrup"])),
+    (("americano", "medium", "black", ["none"]), ("Americano", "Medium", "None", [])),
+    (("green tea", "regular", "none", []), ("Tea", "Medium", "None", [])),
+    (("large oat latte with an extra shot", "", "", []), ("Latte", "Large", "Oat", ["Extra Shot"])),
+    (("flat wite", "small", "whole milk", ["hazelnut"]), ("Flat White", "Small", "Whole", ["Hazelnut Syrup"])),
+    (("cold brew", "medium", "none", ["sugar free vanilla"]), ("Cold Brew", "Medium", "None", ["Sugar-Free Syrup", "Vanilla Syrup"])),
+    (("latte", "small", "oat", ["no thanks"]), ("Latte", "Small", "Oat", [])),
+    (("mocha", "large", "whole", ["nothing else"]), ("Mocha", "Large", "Whole", [])),
+    # A milk slot with no actual milk named must be asked again, not read as "no milk" or "soy"
+    (("latte", "medium", "milk", []), ("Latte", "Medium", None, [])),
+    (("cappuccino", "small", "with milk", []), ("Cappuccino", "Small", None, [])),
+    (("flat white", "large", "some milk", []), ("Flat White", "Large", None, [])),
+]
+# Drinks that are not on the menu but contain one that is: must come back as corrections, not a plain Latte
+_OFF_MENU_DRINKS = ["matcha latte", "pumpkin spice latte", "large matcha latte"]
+
+
+def _benchmark() -> None:
+    import os
+    import time
+
+    menu = Menu.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu.json"))
+
+    resolved = 0
+    for (drink, size, milk, extras), (e_drink, e_size, e_milk, e_extras) in _SPOKEN_ORDERS:
+        result = menu.resolve_order(drink, size, milk, extras)
+        got = (result.order["drinkType"], result.order["size"], result.order["milk"], result.order["extras"])
+        missing = [field for field, expected in (("size", e_size), ("milk", e_milk)) if expected is None]
+        if missing:
+            # Nothing usable was said for this field: the order must come back asking only for it
+            ok = (all(g == e for g, e in zip(got, (e_drink, e_size, e_milk)) if e is not None)
+                  and len(result.corrections) == 1 and missing[0] in result.corrections[0])
+        else:
+            ok = result.ok and got == (e_drink, e_size, e_milk, e_extras)
+        resolved += ok
+        if not ok:
+            print(f"  miss: {(drink, size, milk, extras)} -> {got} {result.corrections}")
+    print(f"Spoken orders resolved in one call: {resolved}/{len(_SPOKEN_ORDERS)}")
+    flagged = 0
+    for drink in _OFF_MENU_DRINKS:
+        result = menu.resolve_fields(drink)
+        flagged += "drinkType" not in result.order and any("drinkType" in c for c in result.corrections)
+        if "drinkType" in result.order:
+            print(f"  taken as {result.order['drinkType']}: {drink!r}")
+    print(f"Off-menu drinks flagged for correction: {flagged}/{len(_OFF_MENU_DRINKS)}")
+
+    canonical = {normalize(n) for kind in KINDS for n in menu.names(kind)}
+    exact = sum(
+        all(normalize(v) in canonical for v in (d, s, m) if v) and all(normalize(x) in canonical for x in ex)
+        for (d, s, m, ex), _ in _SPOKEN_ORDERS
+    )
+    print(f"Accepted by exact menu-name matching: {exact}/{len(_SPOKEN_ORDERS)}")
+
+    rounds = 2000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for args, _ in _SPOKEN_ORDERS:
+            menu.resolve_order(*args)
+    per_order_us = (time.perf_counter() - started) / (rounds * len(_SPOKEN_ORDERS)) * 1e6
+    print(f"Resolution latency: {per_order_us:.1f} us per order")
+
+
+if __name__ == "__main__":
+    _benchmark()
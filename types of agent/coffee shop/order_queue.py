@@ -0,0 +1,212 @@
+import asyncio
+import collections
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+logger = logging.getLogger("agent")
+
+
+def new_order_id() -> str:
+    """Sortable and unique across sessions and worker processes, e.g. `20250101-093000-1f2e3d4c`."""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class OrderLog:
+    """Append-only JSON Lines file of placed orders, one line per order.
+
+    Each order is written with a single `os.write` on a file opened with
+    O_APPEND, so lines from concurrent sessions and worker processes never
+    interleave or overwrite each other, and every past order is kept.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._terminate_torn_line()
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._lock = threading.Lock()
+
+    def _terminate_torn_line(self) -> None:
+        # A write cut off mid-line would otherwise swallow the next appended order
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def append(self, record: Dict[str, Any]) -> None:
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with self._lock:
+            os.write(self._fd, line)
+
+    def __iter__(self) -> Iterator[dict]:
+        """Streams every order from oldest to newest, skipping corrupt lines."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt order line in {self.path}")
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class Ticket:
+    __slots__ = ("number", "order_id", "order", "placed_at")
+
+    def __init__(self, number: int, order_id: str, order: Dict[str, Any], placed_at: float):
+        self.number = number
+        self.order_id = order_id
+        self.order = order
+        self.placed_at = placed_at
+
+    def describe(self) -> str:
+        order = self.order
+        extras = ", ".join(order.get("extras") or []) or "no extras"
+        return f"#{self.number} {order.get('size')} {order.get('drinkType')} with {order.get('milk')} milk, {extras} for {order.get('name')}"
+
+
+class OrderQueue:
+    """Saves orders to the OrderLog and hands them to the barista as numbered tickets.
+
+    `place()` returns once the order line is on disk, then puts a Ticket on an
+    asyncio queue; a ticket therefore always refers to a saved order. One
+    consumer task (`start()`) drains the queue into `on_ticket`, which is the
+    barista display. The queue and ticket numbers are per worker process;
+    the log file is shared by all of them.
+    """
+
+    def __init__(self, log: OrderLog, on_ticket: Optional[Callable[[Ticket], None]] = None):
+        self.log = log
+        self.on_ticket = on_ticket or (lambda ticket: logger.info(f"Barista ticket {ticket.describe()}"))
+        self._queue: "asyncio.Queue[Ticket]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self._next_number = 1
+
+        self._placed = 0
+        self._served = 0
+        # Recent order-to-ticket latencies; bounded so a long-lived worker does not grow without limit
+        self._latencies_ms: Deque[float] = collections.deque(maxlen=10_000)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="barista-ticket-consumer")
+
+    async def place(self, order: Dict[str, Any]) -> Ticket:
+        placed_at = time.perf_counter()
+        order_id = new_order_id()
+        record = {"order_id": order_id, "placed_at": datetime.now().isoformat(timespec="seconds"), **order}
+        # Disk write off the loop so a slow disk never delays audio for other sessions
+        await asyncio.to_thread(self.log.append, record)
+        ticket = Ticket(self._next_number, order_id, order, placed_at)
+        self._next_number += 1
+        self._placed += 1
+        self._queue.put_nowait(ticket)
+        return ticket
+
+    async def _run(self) -> None:
+        while True:
+            ticket = await self._queue.get()
+            self._latencies_ms.append((time.perf_counter() - ticket.placed_at) * 1000)
+            self._served += 1
+            try:
+                self.on_ticket(ticket)
+            except Exception as e:
+                logger.error(f"Barista display failed for ticket #{ticket.number}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def drain(self) -> None:
+        """Waits until every placed ticket has reached the consumer."""
+        await self._queue.join()
+
+    async def close(self) -> None:
+        if self._task is not None:
+            await self.drain()
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies_ms)
+
+        def pct(p: float) -> float:
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3) if latencies else 0.0
+
+        return {
+            "placed": self._placed,
+            "served": self._served,
+            "queue_depth": self._queue.qsize(),
+            "p50_order_to_ticket_ms": pct(0.50),
+            "p95_order_to_ticket_ms": pct(0.95),
+            "max_order_to_ticket_ms": round(latencies[-1], 3) if latencies else 0.0,
+        }
+
+
+# --- Benchmark: `python order_queue.py [sessions] [orders_per_session]` ---
+
+async def _run_sessions(sessions: int, orders_per_session: int, gap: float) -> None:
+    """Every session places its orders back to back (gap=0) or one every `gap` seconds."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = OrderLog(os.path.join(tmp, "orders.jsonl"))
+        queue = OrderQueue(log, on_ticket=lambda ticket: None)
+        queue.start()
+
+        async def customer_session(session: int) -> None:
+            for i in range(orders_per_session):
+                await queue.place({
+                    "drinkType": "Latte", "size": "Large", "milk": "Oat",
+                    "extras": ["Extra Shot"] if i % 2 else [], "name": f"Guest {session}-{i}",
+                })
+                if gap:
+                    await asyncio.sleep(gap)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(customer_session(s) for s in range(sessions)))
+        await queue.drain()
+        elapsed = time.perf_counter() - started
+        await queue.close()
+        log.close()
+
+        total = sessions * orders_per_session
+        saved = list(log)
+        unique = len({record["order_id"] for record in saved})
+        label = "back to back" if not gap else f"one every {gap * 1000:.0f} ms"
+        print(f"{sessions} concurrent sessions, orders {label}: {total:,} orders in {elapsed:.2f} s, {total / elapsed:,.0f} orders/s")
+        print(f"  Saved {len(saved):,} order lines with {unique:,} unique ids")
+        print(f"  Queue stats: {queue.stats()}")
+
+
+async def _benchmark(sessions: int, orders_per_session: int) -> None:
+    # Saturation: how many orders per second one worker process sustains
+    await _run_sessions(sessions, orders_per_session, gap=0)
+    # A busy but realistic rate: order-to-ticket latency without a backlog
+    await _run_sessions(sessions, orders_per_session, gap=0.05)
+
+
+if __name__ == "__main__":
+    import sys
+
+    asyncio.run(_benchmark(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    ))
@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional
+
+from menu import Menu
+
+# Order in which missing slots are asked for
+SLOTS = ("drinkType", "size", "milk", "extras", "name")
+
+
+def slot_prompt(slot: str, menu: Menu) -> str:
+    """The question the agent asks next for a missing slot."""
+    if slot == "drinkType":
+        return f"What can I get started for you? We have {', '.join(menu.names('drink'))}."
+    if slot == "size":
+        return f"What size would you like: {', '.join(menu.names('size'))}?"
+    if slot == "milk":
+        milks = [name for name in menu.names("milk") if name != "None"]
+        return f"Which milk would you like: {', '.join(milks)}, or no milk?"
+    if slot == "extras":
+        return f"Any extras, like {', '.join(menu.names('extra')[:4])}? Or nothing extra?"
+    return "And what name should I put on the order?"
+
+
+class CoffeeOrderState:
+    """The order being taken in one session, filled slot by slot.
+
+    Each slot holds a menu name once resolved; `extras` is None until the
+    customer has answered (an empty list means "no extras"). The next
+    question is computed here from the first empty slot, so the LLM never
+    has to track which fields are still missing.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.drinkType: Optional[str] = None
+        self.size: Optional[str] = None
+        self.milk: Optional[str] = None
+        self.extras: Optional[List[str]] = None
+        self.name: Optional[str] = None
+        self.assumed: List[str] = []
+
+    def missing(self) -> List[str]:
+        return [slot for slot in SLOTS if getattr(self, slot) is None]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing()
+
+    def apply(
+        self,
+        menu: Menu,
+        drinkType: Optional[str] = None,
+        size: Optional[str] = None,
+        milk: Optional[str] = None,
+        extras: Optional[List[str]] = None,
+        name: Optional[str] = None,
+    ) -> List[str]:
+        """Stores whichever slots resolve; returns corrections for the ones that did not.
+
+        A later value replaces an earlier one, so "actually make it large"
+        just updates the size. Items named in another slot's text ("large
+        cap") fill their own slots too, but only slots that are still empty.
+        """
+        resolution = menu.resolve_fields(drinkType, size, milk, extras)
+        given = {"drinkType": drinkType, "size": size, "milk": milk, "extras": extras}
+        for slot, value in resolution.order.items():
+            if given.get(slot) is not None or getattr(self, slot) is None:
+                setattr(self, slot, value)
+        if name and name.strip():
+            self.name = name.strip()
+        self.assumed.extend(resolution.assumed)
+        return resolution.corrections
+
+    def as_order(self) -> Dict[str, object]:
+        return {slot: getattr(self, slot) for slot in SLOTS}
+
+    def summary(self) -> str:
+        extras = ", ".join(self.extras or []) or "no extras"
+        return f"{self.size or '?'} {self.drinkType or '?'} with {self.milk or '?'} milk, {extras}, for {self.name or '?'}"
+
+
+class CoffeeSessionState:
+    """Per-session userdata: the current order plus the cost of taking orders."""
+
+    def __init__(self) -> None:
+        self.order = CoffeeOrderState()
+        self.orders_completed = 0
+        self.tool_calls = 0
+        self.user_turns = 0
+        # User turns spent on each completed order
+        self.turns_per_order: List[int] = []
+        self._turns_at_order_start = 0
+
+    def order_completed(self) -> None:
+        self.orders_completed += 1
+        self.turns_per_order.append(self.user_turns - self._turns_at_order_start)
+        self._turns_at_order_start = self.user_turns
+        self.order.reset()
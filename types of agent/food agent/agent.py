@@ -18,12 +18,16 @@ from livekit.agents import (
 )
 from livekit.plugins import murf, deepgram, google, silero
 
+from order_history import SegmentedOrderHistory
+
 load_dotenv(".env.local")
 logger = logging.getLogger("grocery-agent")
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CATALOG_FILE = os.path.join(SCRIPT_DIR, "grocery_catalog.json")
-ORDERS_FILE = os.path.join(SCRIPT_DIR, "orders.json")
+ORDERS_FILE = os.path.join(SCRIPT_DIR, "orders.json")  # legacy single-array file, imported once
+ORDERS_DIR = os.path.join(SCRIPT_DIR, "orders")
+COMPACTION_INTERVAL_SECONDS = 300
 
 RECIPES = {
     # --- Indian Mains (10) ---
@@ -67,22 +71,23 @@ RECIPES = {
     "pudding_dessert": ["kheer_mix", "milk", "sugar", "cardamom"]
 }
 
+def load_order_history() -> SegmentedOrderHistory:
+    """One history per worker process; sessions share it instead of each replaying the segments."""
+    orders = SegmentedOrderHistory(ORDERS_DIR)
+    orders.import_legacy_array(ORDERS_FILE)
+    return orders
+
 class StoreManager:
-    def __init__(self):
+    def __init__(self, orders: SegmentedOrderHistory):
         self.catalog = []
         self._load_catalog()
-        self._ensure_orders_file()
+        self.orders = orders
 
     def _load_catalog(self):
         if os.path.exists(CATALOG_FILE):
             with open(CATALOG_FILE, "r") as f:
                 self.catalog = json.load(f)
 
-    def _ensure_orders_file(self):
-        if not os.path.exists(ORDERS_FILE):
-            with open(ORDERS_FILE, "w") as f:
-                json.dump([], f)
-
     def get_item_by_name(self, name_query: str):
         name_query = name_query.lower()
         for item in self.catalog:
@@ -100,29 +105,14 @@ class StoreManager:
             "total": total,
             "status": "received"
         }
-        
-        try:
-            with open(ORDERS_FILE, "r") as f:
-                data = json.load(f)
-        except Exception:
-            data = []
-            
-        data.append(order)
-        
-        with open(ORDERS_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-        
+        self.orders.append_order(order)
         return order_id
 
     def update_mock_statuses(self):
         try:
-            with open(ORDERS_FILE, "r") as f:
-                orders = json.load(f)
-            
             now = datetime.now()
-            updated = False
-            
-            for order in orders:
+            # Only orders that are not delivered yet can change, and those all live in memory.
+            for order in self.orders.open_orders():
                 order_time = datetime.fromisoformat(order["timestamp"])
                 elapsed = (now - order_time).total_seconds()
                 
@@ -132,20 +122,16 @@ class StoreManager:
                 elif elapsed > 30: new_status = "being_prepared"
                 
                 if new_status != order["status"]:
-                    order["status"] = new_status
-                    updated = True
-            
-            if updated:
-                with open(ORDERS_FILE, "w") as f:
-                    json.dump(orders, f, indent=2)
-            
-            return orders
+                    self.orders.set_status(order["id"], new_status)
         except Exception as e:
             logger.error(f"Error updating statuses: {e}")
-            return []
+
+    def recent_orders(self, limit: int = 3):
+        self.update_mock_statuses()
+        return self.orders.recent_orders(limit)
 
 class GroceryAgent(Agent):
-    def __init__(self):
+    def __init__(self, orders: SegmentedOrderHistory):
         super().__init__(
             instructions="""
             You are 'luna', a friendly grocery ordering assistant.
@@ -165,7 +151,7 @@ class GroceryAgent(Agent):
             - Always confirm price when adding items.
             """
         )
-        self.store = StoreManager()
+        self.store = StoreManager(orders)
         self.cart = {}
 
     @function_tool
@@ -269,10 +255,9 @@ class GroceryAgent(Agent):
     @function_tool
     async def track_orders(self, ctx: RunContext):
         """Check status of recent orders."""
-        orders = self.store.update_mock_statuses()
-        if not orders: return "No order history found."
+        recent = self.store.recent_orders(3)
+        if not recent: return "No order history found."
         
-        recent = orders[-3:]
         details = []
         for o in recent:
             details.append(f"Order {o['id']}: {o['status']} (Total ${o['total']})")
@@ -282,6 +267,7 @@ class GroceryAgent(Agent):
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    proc.userdata["orders"] = load_order_history()
 
 async def entrypoint(ctx: JobContext):
     try:
@@ -299,8 +285,21 @@ async def entrypoint(ctx: JobContext):
             vad=ctx.proc.userdata["vad"],
         )
 
-        agent = GroceryAgent()
+        orders = ctx.proc.userdata["orders"]
+        agent = GroceryAgent(orders)
         await session.start(agent=agent, room=ctx.room)
+
+        # Roll delivered orders out of past-day segments in the background, once per
+        # process; across processes the history's owner lock lets only one compact.
+        if ctx.proc.userdata.get("compaction_task") is None:
+            compaction_task = asyncio.create_task(orders.run_compaction(COMPACTION_INTERVAL_SECONDS))
+            ctx.proc.userdata["compaction_task"] = compaction_task
+
+            async def stop_compaction():
+                compaction_task.cancel()
+                ctx.proc.userdata["compaction_task"] = None
+
+            ctx.add_shutdown_callback(stop_compaction)
         
         # Greet the user automatically
         await session.say("Hi! Welcome to luna. I can help you order groceries. What do you need today?", allow_interruptions=True)
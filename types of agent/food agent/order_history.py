@@ -0,0 +1,325 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker process there
+    fcntl = None
+
+logger = logging.getLogger("grocery-agent")
+
+TERMINAL_STATUS = "delivered"
+
+
+def _day_of(order: dict) -> str:
+    return order["timestamp"][:10]
+
+
+@contextmanager
+def _flock(path: str, exclusive: bool = True):
+    """Holds an flock on `path` shared by every worker process using the same directory."""
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class SegmentedOrderHistory:
+    """Order storage split into daily JSONL segments plus a small manifest.
+
+    Layout under `root_dir`:
+        segments/YYYY-MM-DD.jsonl   append-only order and status records
+        archive/YYYY-MM.jsonl       delivered orders rolled out of old segments
+        manifest.json               segment/archive names and counts
+        history.lock                flock taken shared by appends, exclusively by rewrites
+        compaction.owner            flock held by the one process that runs compaction
+
+    Placing an order or changing a status only appends one line to today's
+    segment. Orders that are not yet archived are kept in memory (there are
+    only ever a handful of them), and `compact()` moves delivered orders out
+    of past segments into the monthly archive; workers that do not own
+    compaction `refresh()` instead, dropping what the owner archived.
+    Several worker processes may share one directory: anything that
+    rewrites a file or the manifest holds the exclusive lock and re-reads
+    the on-disk state first, so no process acts on another's stale copy.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.segments_dir = os.path.join(root_dir, "segments")
+        self.archive_dir = os.path.join(root_dir, "archive")
+        self.manifest_path = os.path.join(root_dir, "manifest.json")
+        self.lock_path = os.path.join(root_dir, "history.lock")
+        self.owner_path = os.path.join(root_dir, "compaction.owner")
+        os.makedirs(self.segments_dir, exist_ok=True)
+        os.makedirs(self.archive_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._owner_file = None
+        with _flock(self.lock_path, exclusive=False):
+            self._manifest = self._load_manifest()
+            # order id -> latest known order dict, for every order still in a live segment
+            self._live: Dict[str, dict] = self._replay_segments()
+
+    # --- manifest ---
+
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r") as f:
+                    return json.load(f)
+            except (IOError, json.JSONDecodeError):
+                logger.warning(f"Could not read {self.manifest_path}. Rebuilding from segment files.")
+        return {"segments": {day: {"orders": None} for day in self._segment_days()}, "archives": {}}
+
+    def _write_manifest(self):
+        """Callers hold the exclusive file lock and have just re-read the manifest."""
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _register_segment(self, day: str):
+        with _flock(self.lock_path):
+            self._manifest = self._load_manifest()
+            if day not in self._manifest["segments"]:
+                self._manifest["segments"][day] = {"orders": None}
+                self._write_manifest()
+
+    # --- segment files ---
+
+    def _segment_path(self, day: str) -> str:
+        return os.path.join(self.segments_dir, f"{day}.jsonl")
+
+    def _archive_path(self, month: str) -> str:
+        return os.path.join(self.archive_dir, f"{month}.jsonl")
+
+    def _segment_days(self) -> List[str]:
+        # The directory, not a possibly stale manifest, decides which segments exist
+        return sorted(name[:-6] for name in os.listdir(self.segments_dir) if name.endswith(".jsonl"))
+
+    @staticmethod
+    def _read_jsonl(path: str) -> List[dict]:
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {path}")
+        return records
+
+    def _write_records(self, day: str, records: List[dict]):
+        with open(self._segment_path(day), "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def _append(self, day: str, record: dict):
+        if day not in self._manifest["segments"]:
+            # First write of the day registers the new segment; every later write only appends.
+            self._register_segment(day)
+        with _flock(self.lock_path, exclusive=False):
+            self._write_records(day, [record])
+
+    def _replay_segments(self) -> Dict[str, dict]:
+        live: Dict[str, dict] = {}
+        for day in self._segment_days():
+            for record in self._read_jsonl(self._segment_path(day)):
+                if record.get("type") == "status":
+                    order = live.get(record["id"])
+                    if order:
+                        order["status"] = record["status"]
+                else:
+                    order = record.get("order", record)
+                    live[order["id"]] = order
+        return live
+
+    def refresh(self):
+        """Re-reads the manifest and live segments, e.g. after another process compacted them."""
+        with self._lock, _flock(self.lock_path, exclusive=False):
+            self._manifest = self._load_manifest()
+            self._live = self._replay_segments()
+
+    # --- hot path ---
+
+    def append_order(self, order: dict):
+        with self._lock:
+            self._live[order["id"]] = order
+            self._append(datetime.now().strftime("%Y-%m-%d"), {"type": "order", "order": order})
+
+    def set_status(self, order_id: str, status: str):
+        with self._lock:
+            order = self._live.get(order_id)
+            if not order or order["status"] == status:
+                return
+            order["status"] = status
+            self._append(
+                datetime.now().strftime("%Y-%m-%d"),
+                {"type": "status", "id": order_id, "status": status, "at": datetime.now().isoformat()},
+            )
+
+    def open_orders(self) -> List[dict]:
+        with self._lock:
+            return [o for o in self._live.values() if o["status"] != TERMINAL_STATUS]
+
+    # --- cold history ---
+
+    def recent_orders(self, limit: int) -> List[dict]:
+        """Most recent orders, oldest first. Only opens archive months when live segments run short."""
+        with self._lock:
+            orders = sorted(self._live.values(), key=lambda o: o["timestamp"])[-limit:]
+            for month in sorted(self._manifest["archives"], reverse=True):
+                if len(orders) >= limit:
+                    break
+                # Until the next refresh, orders another process just archived may still be live here
+                archived = [o for o in self._read_jsonl(self._archive_path(month)) if o["id"] not in self._live]
+                orders = archived[-(limit - len(orders)):] + orders
+            return [dict(o) for o in orders]
+
+    # --- compaction ---
+
+    def compact(self) -> int:
+        """Rolls delivered orders from past-day segments into the monthly archive.
+
+        Runs under the exclusive file lock on state re-read from disk, so orders
+        and statuses written by other processes are neither lost nor archived
+        twice. Today's segment is never rewritten. Returns the number of
+        archived orders.
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        archived_count = 0
+        with self._lock, _flock(self.lock_path):
+            self._manifest = self._load_manifest()
+            live = self._replay_segments()
+            segments = self._manifest["segments"]
+            for day in self._segment_days():
+                if day >= today:
+                    segments.setdefault(day, {"orders": None})
+                    continue
+                orders = [o for o in live.values() if _day_of(o) == day]
+                delivered = [o for o in orders if o["status"] == TERMINAL_STATUS]
+                remaining = [o for o in orders if o["status"] != TERMINAL_STATUS]
+
+                if delivered:
+                    month = day[:7]
+                    with open(self._archive_path(month), "a") as f:
+                        for order in delivered:
+                            f.write(json.dumps(order) + "\n")
+                    entry = self._manifest["archives"].setdefault(month, {"orders": 0})
+                    entry["orders"] += len(delivered)
+                    for order in delivered:
+                        del live[order["id"]]
+                    archived_count += len(delivered)
+
+                path = self._segment_path(day)
+                if remaining:
+                    tmp_path = path + ".tmp"
+                    with open(tmp_path, "w") as f:
+                        for order in remaining:
+                            f.write(json.dumps({"type": "order", "order": order}) + "\n")
+                    os.replace(tmp_path, path)
+                    segments[day] = {"orders": len(remaining)}
+                else:
+                    os.remove(path)
+                    segments.pop(day, None)
+
+            self._write_manifest()
+            self._live = live
+
+        if archived_count:
+            logger.info(f"Compacted order history: archived {archived_count} delivered orders.")
+        return archived_count
+
+    def _claim_compaction(self) -> bool:
+        """Takes (and keeps) the per-directory compaction ownership if no other process has it."""
+        if self._owner_file is not None:
+            return True
+        f = open(self.owner_path, "a")
+        if fcntl:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                return False
+        self._owner_file = f
+        return True
+
+    def _release_compaction(self):
+        if self._owner_file is not None:
+            self._owner_file.close()
+            self._owner_file = None
+
+    async def run_compaction(self, interval_seconds: float = 300.0):
+        """Background loop; run with asyncio.create_task and cancel on shutdown.
+
+        Only the process holding `compaction.owner` compacts; the others
+        refresh from disk, so orders the owner archived leave their memory
+        too, and keep checking so one of them takes over if the owner exits.
+        """
+        try:
+            while True:
+                owner = self._claim_compaction()
+                try:
+                    await asyncio.to_thread(self.compact if owner else self.refresh)
+                except Exception as e:
+                    logger.error(f"Order history {'compaction' if owner else 'refresh'} failed: {e}")
+                await asyncio.sleep(interval_seconds)
+        finally:
+            self._release_compaction()
+
+    # --- migration ---
+
+    def import_legacy_array(self, path: str) -> int:
+        """One-time import of the old single-array `orders.json` into daily segments.
+
+        Safe to call from several processes at once: the import runs under the
+        exclusive lock, and a file another process already moved counts as migrated.
+        """
+        with self._lock, _flock(self.lock_path):
+            try:
+                if os.path.getsize(path) == 0:
+                    return 0
+                with open(path, "r") as f:
+                    legacy = json.load(f)
+            except FileNotFoundError:
+                return 0
+            except (IOError, json.JSONDecodeError):
+                logger.warning(f"Could not parse legacy orders file {path}; skipping import.")
+                return 0
+            if not isinstance(legacy, list) or not legacy:
+                return 0
+
+            self._manifest = self._load_manifest()
+            self._live = self._replay_segments()
+            by_day: Dict[str, List[dict]] = {}
+            imported = 0
+            for order in sorted(legacy, key=lambda o: o["timestamp"]):
+                if order["id"] in self._live:
+                    continue
+                self._live[order["id"]] = order
+                by_day.setdefault(_day_of(order), []).append({"type": "order", "order": order})
+                imported += 1
+            for day, records in by_day.items():
+                self._manifest["segments"].setdefault(day, {"orders": None})
+                self._write_records(day, records)
+            self._write_manifest()
+            try:
+                os.replace(path, path + ".migrated")
+            except FileNotFoundError:
+                pass
+        logger.info(f"Imported {imported} of {len(legacy)} orders from {path} into segmented history.")
+        return imported
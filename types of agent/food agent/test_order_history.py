@@ -0,0 +1,52 @@
+import asyncio
+import json
+
+from order_history import SegmentedOrderHistory
+
+PAST_DAY = "2020-01-05"
+
+
+def _order(order_id: str, status: str, timestamp: str = f"{PAST_DAY}T10:00:00") -> dict:
+    return {"id": order_id, "timestamp": timestamp, "status": status, "total": 1}
+
+
+def _write_past_segment(root, orders):
+    segments = root / "segments"
+    segments.mkdir(parents=True, exist_ok=True)
+    with open(segments / f"{PAST_DAY}.jsonl", "w") as f:
+        for order in orders:
+            f.write(json.dumps({"type": "order", "order": order}) + "\n")
+
+
+def test_orders_archived_by_the_owner_leave_other_workers(tmp_path):
+    _write_past_segment(tmp_path, [_order("ORD-1", "delivered"), _order("ORD-2", "received")])
+    # Two instances stand in for two worker processes sharing the directory
+    owner = SegmentedOrderHistory(str(tmp_path))
+    other = SegmentedOrderHistory(str(tmp_path))
+    assert owner._claim_compaction()
+
+    assert owner.compact() == 1
+    assert [o["id"] for o in other.recent_orders(5)] == ["ORD-1", "ORD-2"]
+
+    async def one_tick():
+        task = asyncio.create_task(other.run_compaction(interval_seconds=60))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(one_tick())
+    assert set(other._live) == {"ORD-2"}
+    assert [o["id"] for o in other.recent_orders(5)] == ["ORD-1", "ORD-2"]
+    owner._release_compaction()
+
+
+def test_legacy_import_counts_only_new_orders(tmp_path):
+    history = SegmentedOrderHistory(str(tmp_path))
+    history.append_order(_order("ORD-1", "received", "2020-02-01T09:00:00"))
+    legacy = tmp_path / "orders.json"
+    legacy.write_text(json.dumps([
+        _order("ORD-1", "received", "2020-02-01T09:00:00"),
+        _order("ORD-2", "delivered", "2020-02-01T10:00:00"),
+    ]))
+
+    assert history.import_legacy_array(str(legacy)) == 1
+    assert history.import_legacy_array(str(legacy)) == 0
@@ -15,16 +15,39 @@ from livekit.agents import (
     function_tool,
     RunContext
 )
+from livekit import api
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+import asyncio
 import json
-from typing import Literal
+import os
+from datetime import datetime
+from typing import List, Literal, Optional
+
+from audit_index import AuditIndex
+from answer_matching import VerificationMetrics, answer_matches
+from audit_log import AuditSink
+from case_index import CaseIndex
+from case_store import CaseRepository, SQLiteCaseRepository
+from session_state import CaseLockRegistry, VerificationState, resolve_case
 
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CASES_DB_PATH = os.getenv("FRAUD_CASES_DB", os.path.join(SCRIPT_DIR, "fraud_cases.db"))
+AUDIT_LOG_PATH = os.path.join(SCRIPT_DIR, "logger.json")
+# "always", "interval" (every AUDIT_FSYNC_INTERVAL_MS) or "shutdown"
+AUDIT_FSYNC_POLICY = os.getenv("FRAUD_AUDIT_FSYNC", "interval")
+AUDIT_FSYNC_INTERVAL_MS = int(os.getenv("FRAUD_AUDIT_FSYNC_MS", "1000"))
+# Set to register for explicit dispatch from the outbound campaign runner (campaign.py)
+AGENT_NAME = os.getenv("FRAUD_AGENT_NAME", "")
+SIP_OUTBOUND_TRUNK_ID = os.getenv("SIP_OUTBOUND_TRUNK_ID", "")
+
+# Seed data for the case store; cases already in the database keep their stored status
+FRAUD_CASES = {
     # Existing Cases (Ravi)
     "ravi": {
         "case_id": "FRD-7777",
@@ -34,6 +57,7 @@ load_dotenv(".env.local")
         "transaction_amount": "150.50",
         "merchant_name": "Local Grocery Store",
         "location": "Mumbai, India",
+        "home_region": "India",
         "timestamp": "Nov 25, 2025, 7:15 PM IST",
         "security_question": "What is the last four digits of your registered phone number?",
         "security_answer": "5432", 
@@ -48,6 +72,7 @@ load_dotenv(".env.local")
         "transaction_amount": "20.00",
         "merchant_name": "World Martial Arts",
         "location": "Toronto, Canada",
+        "home_region": "Japan",
         "timestamp": "Nov 26, 2025, 4:00 PM EST",
         "security_question": "who is your friend?",
         "security_answer": "nobita", 
@@ -62,6 +87,7 @@ load_dotenv(".env.local")
         "transaction_amount": "5.00",
         "merchant_name": "Clovers General Store",
         "location": "jaipur,Rajsthan",
+        "home_region": "India",
         "timestamp": "Nov 26, 2025, 10:00 AM CET",
         "security_question": "What is the color of your cloak?",
         "security_answer": "black", 
@@ -76,6 +102,7 @@ load_dotenv(".env.local")
         "transaction_amount": "60.00",
         "merchant_name": "Blue Lock Football",
         "location": "Surat,India",
+        "home_region": "India",
         "timestamp": "Nov 27, 2025, 5:00 PM CET",
         "security_question": "What is your primary weapon?",
         "security_answer": "cool", 
@@ -85,8 +112,22 @@ load_dotenv(".env.local")
   
 }
 
+# Minimum index score to accept a match (one phonetic match on a name token)
+CASE_MATCH_MIN_SCORE = 2.0
+# Wrong security answers allowed before the call is ended
+MAX_ANSWER_ATTEMPTS = 1
+# Name lookups allowed per call (one retry for a misheard name)
+MAX_LOOKUP_ATTEMPTS = 2
+
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        case_store: CaseRepository,
+        case_index: CaseIndex,
+        case_locks: CaseLockRegistry,
+        audit_sink: AuditSink,
+        verification_metrics: VerificationMetrics,
+    ) -> None:
         super().__init__(
             instructions="""You are an extremely precise and professional Fraud Detection Representative for OmniBank. Your single purpose is to resolve a single suspicious transaction with the customer.
             The user is interacting with you via voice.
@@ -104,9 +145,13 @@ class Assistant(Agent):
             9. The last response you provide to the user must be the **final action taken** returned by the `confirm_transaction` tool, and then you must say goodbye and end the conversation immediately. Do not deviate from this structured, professional call flow.
             """,
         )
-        # FIX: Initializing a state dictionary directly on the Assistant instance (self)
-        # to bypass the RunContext.run_state attribute error.
-        self.user_session_data = {}
+        # Per-call state lives on the Assistant instance; shared case data only changes through the store
+        self.verification = VerificationState()
+        self.case_store = case_store
+        self.case_index = case_index
+        self.case_locks = case_locks
+        self.audit_sink = audit_sink
+        self.verification_metrics = verification_metrics
 
     @function_tool
     async def load_fraud_case(self, context: RunContext, username: str) -> str:
@@ -120,24 +165,19 @@ class Assistant(Agent):
         Returns:
             A JSON string containing the case details and the security question, or an error message.
         """
-        # Normalize and split all input words from the transcription for robust lookup
-        input_words = [word.strip() for word in username.lower().split() if word.strip()]
-        
-        found_key = None
-        # Check if any word in the user's spoken name matches a key in the database
-        for word in input_words:
-            if word in FRAUD_CASES:
-                found_key = word
-                break
+        if not self.verification.start_lookup(MAX_LOOKUP_ATTEMPTS):
+            return json.dumps({
+                "status": "error",
+                "message": "I'm sorry, I cannot look up any further cases on this call. To protect your security, I must end this call. Please call our main fraud line later."
+            })
+        # Ranked candidates from exact, Metaphone and Soundex keys, so STT variants like "Hetvee" still resolve
+        candidates = self.case_index.lookup(username, min_score=CASE_MATCH_MIN_SCORE)
+        logger.info(f"Case lookup for '{username}': {candidates}")
+        # The index is built at startup, so skip candidates another call has resolved since
+        case = await asyncio.to_thread(self._first_pending, [case_id for case_id, _ in candidates])
         
-        if found_key:
-            user_key = found_key
-            
-            # We fetch the specific case for the user
-            case = FRAUD_CASES[user_key].copy()
-            
-            # FIX: Storing state on the Assistant instance (self.user_session_data)
-            self.user_session_data["current_user_key"] = user_key
+        if case:
+            self.verification.load_case(case)
             
             # Prepare data to be visible to the LLM for conversation framing
             details = {
@@ -173,19 +213,20 @@ class Assistant(Agent):
         Returns:
             A string indicating if verification passed or failed, and the transaction details if passed.
         """
-        # FIX: Getting state from the Assistant instance
-        user_key = self.user_session_data.get("current_user_key")
+        state = self.verification
+        case_details = await asyncio.to_thread(self.case_store.get, state.case_id) if state.case_id else None
         
-        if not user_key or user_key not in FRAUD_CASES:
-            # FIX: Setting state on the Assistant instance
-            self.user_session_data["verification_failed"] = True
+        if not case_details:
+            state.verification_failed = True
             return "Internal Error: Unable to verify account details."
+        if state.verification_failed:
+            return "Verification failed. We cannot proceed further with the verification process."
+        state.answer_attempts += 1
             
-        case_details = FRAUD_CASES[user_key]
-        # We store the security answer in the database in lowercase, so we normalize the user's response for comparison
-        expected_answer = case_details["security_answer"].strip().lower()
-
-        if user_response.strip().lower() == expected_answer:
+        # Both sides are normalized ("five four three two" -> "5432", fillers dropped) and compared in constant time
+        if answer_matches(case_details["security_answer"], user_response):
+            state.verified = True
+            self.verification_metrics.record(True, state.answer_attempts, state.verification_started_at)
             # Construct transaction details to be read out
             details = (
                 f"a purchase of ${case_details.get('transaction_amount', 'an unknown amount')} "
@@ -196,15 +237,17 @@ class Assistant(Agent):
             )
             return f"Verification successful. The suspicious transaction details are: {details}. **You must now ask the user if they made this transaction (yes/no).**"
         else:
+            if state.answer_attempts < MAX_ANSWER_ATTEMPTS:
+                return "That answer did not match. Please ask the security question one more time."
             # Flag verification as failed in state to trigger hangup behavior
-            # FIX: Setting state on the Assistant instance
-            self.user_session_data["verification_failed"] = True
+            state.verification_failed = True
+            self.verification_metrics.record(False, state.answer_attempts, state.verification_started_at)
             return "Verification failed. We cannot proceed further with the verification process."
 
     @function_tool
     async def confirm_transaction(self, context: RunContext, is_legitimate: Literal["yes", "no"]) -> str:
         """
-        Updates the fraud case status in the mock database and provides the final action to read back to the user.
+        Updates the fraud case status in the case store and provides the final action to read back to the user.
         The agent MUST call this tool after the user confirms or denies the transaction.
 
         Args:
@@ -213,12 +256,10 @@ class Assistant(Agent):
         Returns:
             A string describing the final action taken.
         """
-        # FIX: Getting state from the Assistant instance
-        user_key = self.user_session_data.get("current_user_key")
-        if not user_key or user_key not in FRAUD_CASES:
-            return "I'm sorry, an issue occurred with your case details. Please call our main fraud line for assistance."
+        state = self.verification
+        if not state.verified:
+            return "The customer has not passed security verification, so the case cannot be updated. Please call our main fraud line for assistance."
             
-        case_id = FRAUD_CASES[user_key]["case_id"]
         status_to_update = "processing_error"
         outcome_note_to_update = "Processing failed."
         action_taken_message = "I'm sorry, an issue occurred while processing your request. Please call our main fraud line for assistance."
@@ -232,36 +273,48 @@ class Assistant(Agent):
             outcome_note_to_update = "Customer denied transaction. Card blocked and dispute raised (mock)."
             action_taken_message = "Thank you for confirming. The transaction has been marked as fraudulent. We have immediately blocked your card and initiated a dispute. A new card will be sent to you in 3-5 business days."
         
-        # Mock database update
-        FRAUD_CASES[user_key]["status"] = status_to_update
-        FRAUD_CASES[user_key]["outcome_note"] = outcome_note_to_update
-        logger.info(f"Updated Fraud Case {case_id} ({user_key}): Status: {status_to_update}, Note: {outcome_note_to_update}")
+        # Serialized per case within this worker; other workers are caught by the version check
+        ok, reason, case = await resolve_case(
+            self.case_store, self.case_locks, state, status_to_update, outcome_note_to_update
+        )
+        if not ok:
+            logger.warning(f"Could not resolve Fraud Case {state.case_id}: {reason}")
+            if reason == "already_resolved":
+                return "I'm sorry, this case has already been updated by another of our representatives. Please call our main fraud line to review the latest status."
+            return "I'm sorry, an issue occurred with your case details. Please call our main fraud line for assistance."
+        case_id = case["case_id"]
+        logger.info(f"Updated Fraud Case {case_id} ({case['customer_key']}): Status: {status_to_update}, Note: {outcome_note_to_update}")
         
         # --- START: JSON Logging Block ---
         log_entry = {
             "case_id": case_id,
-            "customer_name": FRAUD_CASES[user_key]["customer_name"],
-            "security_identifier": FRAUD_CASES[user_key]["security_identifier"],
-            "transaction_amount": FRAUD_CASES[user_key]["transaction_amount"],
-            "merchant_name": FRAUD_CASES[user_key]["merchant_name"],
-            "location": FRAUD_CASES[user_key]["location"],
-            "timestamp": FRAUD_CASES[user_key]["timestamp"],
+            "customer_name": case["customer_name"],
+            "security_identifier": case["security_identifier"],
+            "transaction_amount": case["transaction_amount"],
+            "merchant_name": case["merchant_name"],
+            "location": case["location"],
+            "timestamp": case["timestamp"],
             "final_status": status_to_update,
             "outcome_note": outcome_note_to_update,
+            "logged_at": datetime.now().isoformat(timespec="seconds"),
         }
 
-        try:
-            with open("logger.json", "a") as f:
-                # Write the JSON log entry followed by a newline for JSON Lines format
-                f.write(json.dumps(log_entry) + "\n")
-            logger.info(f"Successfully logged Case {case_id} outcome to logger.json")
-        except Exception as e:
-            logger.error(f"Error writing to logger.json: {e}")
+        # Queued for the background writer; the file I/O never runs on the event loop
+        await self.audit_sink.put(log_entry)
+        logger.info(f"Queued Case {case_id} outcome for the audit log")
         # --- END: JSON Logging Block ---
 
         # The LLM is instructed to read this message back and end the call.
         return action_taken_message
 
+    def _first_pending(self, case_ids: List[str]) -> Optional[dict]:
+        """Blocking store reads; run through asyncio.to_thread."""
+        for case_id in case_ids:
+            stored = self.case_store.get(case_id)
+            if stored and stored["status"] == "pending_review":
+                return stored
+        return None
+
     # Override on_error to ensure the call ends gracefully
     async def on_error(self, context: RunContext, error: Exception):
         logger.error(f"Agent error occurred: {error}")
@@ -270,6 +323,13 @@ class Assistant(Agent):
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    # Every worker process opens the shared SQLite store; only the lookup index is held in memory
+    case_store = SQLiteCaseRepository(CASES_DB_PATH)
+    case_store.seed(FRAUD_CASES)
+    proc.userdata["case_store"] = case_store
+    proc.userdata["case_index"] = CaseIndex.from_rows(case_store.iter_index_rows())
+    proc.userdata["case_locks"] = CaseLockRegistry()
+    proc.userdata["verification_metrics"] = VerificationMetrics()
 
 
 async def entrypoint(ctx: JobContext):
@@ -311,12 +371,49 @@ async def entrypoint(ctx: JobContext):
     async def log_usage():
         summary = usage_collector.get_summary()
         logger.info(f"Usage: {summary}")
+        logger.info(f"Verification: {ctx.proc.userdata['verification_metrics'].summary()}")
 
     ctx.add_shutdown_callback(log_usage)
 
+    # One audit writer per worker process, shared by all calls it hosts
+    audit_sink = ctx.proc.userdata.get("audit_sink")
+    if audit_sink is None:
+        audit_sink = AuditSink(
+            AUDIT_LOG_PATH,
+            fsync_policy=AUDIT_FSYNC_POLICY,
+            fsync_interval_ms=AUDIT_FSYNC_INTERVAL_MS,
+        )
+        ctx.proc.userdata["audit_sink"] = audit_sink
+
+        async def start_audit_sink():
+            # Sidecar index (case_id -> offset, per-day status counts), kept current as batches land.
+            # Loading or rebuilding it reads whole files, so it runs in a thread; entries queue
+            # meanwhile and the writer starts only once the index is listening.
+            try:
+                audit_sink.add_listener(await asyncio.to_thread(AuditIndex, AUDIT_LOG_PATH))
+            except Exception as e:
+                logger.error(f"Audit index unavailable, writing the audit log without it: {e}")
+            audit_sink.start()
+
+        ctx.proc.userdata["audit_sink_ready"] = asyncio.create_task(start_audit_sink())
+    elif ctx.proc.userdata["audit_sink_ready"].done():
+        audit_sink.start()
+
+    async def flush_audit_log():
+        await audit_sink.flush()
+        logger.info(f"Audit log: {audit_sink.stats()}")
+
+    ctx.add_shutdown_callback(flush_audit_log)
+
     # Start the session
     await session.start(
-        agent=Assistant(),
+        agent=Assistant(
+            case_store=ctx.proc.userdata["case_store"],
+            case_index=ctx.proc.userdata["case_index"],
+            case_locks=ctx.proc.userdata["case_locks"],
+            audit_sink=audit_sink,
+            verification_metrics=ctx.proc.userdata["verification_metrics"],
+        ),
         room=ctx.room,
         room_input_options=RoomInputOptions(
             noise_cancellation=noise_cancellation.BVC(),
@@ -326,6 +423,26 @@ async def entrypoint(ctx: JobContext):
     # Join the room and connect to the user
     await ctx.connect()
 
+    # Campaign calls carry the number to dial in the job metadata
+    job_metadata = json.loads(ctx.job.metadata) if ctx.job.metadata else {}
+    phone_number = job_metadata.get("phone_number")
+    if phone_number:
+        logger.info(f"Outbound campaign call for case {job_metadata.get('case_id')}")
+        try:
+            await ctx.api.sip.create_sip_participant(
+                api.CreateSIPParticipantRequest(
+                    room_name=ctx.room.name,
+                    sip_trunk_id=SIP_OUTBOUND_TRUNK_ID,
+                    sip_call_to=phone_number,
+                    participant_identity=f"customer-{job_metadata.get('case_id')}",
+                    wait_until_answered=True,
+                )
+            )
+        except api.TwirpError as e:
+            # Not answered or not reachable; the campaign runner sees the room close and retries later
+            logger.info(f"Outbound call was not answered: {e.message}")
+            ctx.shutdown()
+
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
\ No newline at end of file
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm, agent_name=AGENT_NAME))
\ No newline at end of file
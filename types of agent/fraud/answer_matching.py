@@ -0,0 +1,187 @@
+import hmac
+import re
+import time
+from typing import List
+
+# Spoken digits; "oh" and "o" only count as zero next to other digits
+_UNITS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4,
+    "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
+}
+_TEENS = {
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+}
+_TENS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+_ZERO_ALIASES = ("oh", "o")
+_REPEATS = {"double": 2, "triple": 3}
+_SCALES = {"hundred": 2, "thousand": 3}
+
+# Words callers wrap answers in ("um, I think it's five four three two")
+FILLER_WORDS = frozenset(
+    "um umm uh uhh er erm ah hmm like so well okay ok yeah yes i think it its it's is was my the a an "
+    "answer number digits name would be that".split()
+)
+
+# Maximum edit distance accepted per question type; tolerance only applies to
+# answers of at least MIN_FUZZY_LENGTH characters so short answers stay exact
+ANSWER_TOLERANCE = {
+    "digits": 0,  # phone digits, PINs, years: one wrong digit is a wrong answer
+    "word": 1,  # single word, e.g. a name that STT may spell slightly differently
+    "phrase": 2,
+}
+MIN_FUZZY_LENGTH = 5
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _words_to_digits(tokens: List[str]) -> List[str]:
+    out: List[str] = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token in _REPEATS and nxt is not None and (nxt in _UNITS or nxt.isdigit() or nxt in _ZERO_ALIASES):
+            digit = str(_UNITS.get(nxt, 0)) if not nxt.isdigit() else nxt
+            out.append(digit * _REPEATS[token])
+            i += 2
+        elif token in _TENS:
+            if nxt in _UNITS and _UNITS[nxt]:
+                out.append(str(_TENS[token] + _UNITS[nxt]))
+                i += 2
+            else:
+                out.append(str(_TENS[token]))
+                i += 1
+        elif token in _SCALES and out and out[-1].isdigit():
+            # "five hundred" -> 500, "five hundred three" -> 503, "two thousand twenty five" -> 2025
+            following = 1 if nxt in _UNITS else 2 if nxt in _TEENS or nxt in _TENS else 0
+            out[-1] += "0" * (_SCALES[token] - following)
+            i += 1
+        elif token in _TEENS:
+            out.append(str(_TEENS[token]))
+            i += 1
+        elif token in _UNITS:
+            out.append(str(_UNITS[token]))
+            i += 1
+        elif token in _ZERO_ALIASES and (out and out[-1].isdigit() or nxt in _UNITS or (nxt or "").isdigit()):
+            out.append("0")
+            i += 1
+        else:
+            out.append(token)
+            i += 1
+    return out
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercases, converts number words to digits, drops punctuation and filler words.
+
+    Consecutive digit groups are joined, so "five four, three two" and
+    "fifty four thirty two" both become "5432".
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower().replace("-", " "))
+    tokens = [t for t in tokens if t not in FILLER_WORDS]
+    tokens = [t.replace("'", "") for t in _words_to_digits(tokens)]
+
+    joined: List[str] = []
+    for token in tokens:
+        if token.isdigit() and joined and joined[-1].isdigit():
+            joined[-1] += token
+        elif token:
+            joined.append(token)
+    return " ".join(joined)
+
+
+def question_type(expected: str) -> str:
+    """Classifies a normalized stored answer: "digits", "word" or "phrase"."""
+    compact = expected.replace(" ", "")
+    if compact.isdigit():
+        return "digits"
+    return "word" if " " not in expected else "phrase"
+
+
+def _bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance capped at max_distance + 1.
+
+    Every cell of the table is filled with no early exit, so the running time
+    depends only on the two lengths and not on where the strings differ.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def answer_matches(expected: str, response: str) -> bool:
+    """Compares a spoken response with the stored security answer after normalization.
+
+    The exact comparison uses hmac.compare_digest, so it takes the same time
+    wherever the first mismatch is.
+    """
+    expected_norm = normalize_answer(expected)
+    response_norm = normalize_answer(response)
+    if not expected_norm:
+        return False
+    kind = question_type(expected_norm)
+    if kind == "digits":
+        # Spaces between spoken digit groups carry no meaning
+        expected_norm = expected_norm.replace(" ", "")
+        response_norm = response_norm.replace(" ", "")
+    if hmac.compare_digest(expected_norm.encode(), response_norm.encode()):
+        return True
+    tolerance = ANSWER_TOLERANCE[kind]
+    if not tolerance or len(expected_norm) < MIN_FUZZY_LENGTH:
+        return False
+    return _bounded_edit_distance(expected_norm, response_norm, tolerance) <= tolerance
+
+
+class VerificationMetrics:
+    """Per-process verification outcomes, shared by all calls a worker hosts."""
+
+    def __init__(self) -> None:
+        self.verifications = 0
+        self.successes = 0
+        self.failures = 0
+        self.total_turns = 0
+        self.total_seconds = 0.0
+
+    def record(self, success: bool, turns: int, started_at: float) -> None:
+        """`turns` is the number of answers the caller gave; `started_at` is a time.monotonic() value."""
+        self.verifications += 1
+        if success:
+            self.successes += 1
+        else:
+            self.failures += 1
+        self.total_turns += turns
+        self.total_seconds += time.monotonic() - started_at
+
+    def summary(self) -> dict:
+        count = self.verifications or 1
+        return {
+            "verifications": self.verifications,
+            "success_rate": round(self.successes / count, 3),
+            "avg_turns_per_verification": round(self.total_turns / count, 2),
+            "avg_verification_seconds": round(self.total_seconds / count, 2),
+        }
+
+
+if __name__ == "__main__":
+    examples = [
+        ("5432", "five four three two"),
+        ("5432", "um, it's 54 32"),
+        ("5432", "fifty four thirty two"),
+        ("5432", "five four three three"),
+        ("1005", "one double oh five"),
+        ("nobita", "Nobeta."),
+        ("black", "It's black!"),
+        ("cool", "pool"),
+    ]
+    for expected, spoken in examples:
+        print(f"{spoken!r:32} -> {normalize_answer(spoken)!r:10} matches {expected!r}: {answer_matches(expected, spoken)}")
@@ -0,0 +1,209 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from audit_log import log_lock
+
+logger = logging.getLogger("agent")
+
+
+class AuditIndex:
+    """Sidecar index over the fraud audit log (`logger.json`).
+
+    Keeps case_id -> (file, byte offset) for every outcome and per-day status
+    counts. It is updated by AuditSink as batches are written, and every update
+    is appended to `logger.idx` so another process can load the index without
+    reading the log. Point lookups are one dict access plus one seek/readline.
+    Daily aggregates are a dict access.
+
+    Every worker process appends to the same `logger.idx` under the log's
+    lock, so its lines are in log order. Each instance applies the sidecar
+    from where it last read (its own records and other processes' batches
+    and rotations alike), and starts over if a rebuild replaced the file.
+    """
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None):
+        self.log_path = log_path
+        self.log_dir = os.path.dirname(os.path.abspath(log_path))
+        self.index_path = index_path or os.path.splitext(log_path)[0] + ".idx"
+
+        self._lock = threading.Lock()
+        self._by_case: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        self._daily: Dict[str, Counter] = defaultdict(Counter)
+        # How far into which sidecar file (by inode) this instance has applied
+        self._index_inode: Optional[int] = None
+        self._index_pos = 0
+
+        if os.path.exists(self.index_path):
+            with self._lock:
+                self._catch_up()
+        else:
+            self.rebuild()
+
+    # --- loading ---
+
+    def _apply(self, record: dict) -> None:
+        if record.get("type") == "rotate":
+            old, new = record["from"], record["to"]
+            for locations in self._by_case.values():
+                for i, (name, offset) in enumerate(locations):
+                    if name == old:
+                        locations[i] = (new, offset)
+            return
+        self._by_case[record["case_id"]].append((record["file"], record["offset"]))
+        self._daily[record["day"]][record["status"]] += 1
+
+    def _catch_up(self) -> None:
+        """Applies sidecar lines appended since the last call. Callers hold `self._lock`."""
+        try:
+            f = open(self.index_path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            inode = os.fstat(f.fileno()).st_ino
+            if inode != self._index_inode:
+                self._by_case.clear()
+                self._daily.clear()
+                self._index_inode, self._index_pos = inode, 0
+            f.seek(self._index_pos)
+            chunk = f.read()
+        # A line still being appended is picked up next time
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        self._index_pos += len(chunk)
+        for line in chunk.splitlines():
+            line = line.strip()
+            if line:
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, KeyError):
+                    logger.warning(f"Skipping corrupt line in {self.index_path}")
+
+    def _append_records(self, records: List[dict]) -> None:
+        with open(self.index_path, "ab") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records).encode())
+
+    def rebuild(self) -> int:
+        """Scans the current and rotated log files once and rewrites the sidecar.
+
+        Holds the log lock throughout, so no process writes or rotates mid-scan.
+        """
+        with log_lock(self.log_path):
+            return self._rebuild()
+
+    def _rebuild(self) -> int:
+        base, ext = os.path.splitext(self.log_path)
+        paths = sorted(glob.glob(f"{glob.escape(base)}.*{ext}"), key=os.path.getmtime) + [self.log_path]
+        records = []
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            mtime_day = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+            with open(path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    line = raw.strip()
+                    if line:
+                        try:
+                            entry = json.loads(line)
+                            records.append(self._index_record(os.path.basename(path), offset, entry, mtime_day))
+                        except json.JSONDecodeError:
+                            logger.warning(f"Skipping corrupt audit line at {path}:{offset}")
+                    offset += len(raw)
+
+        with self._lock:
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.writelines(json.dumps(r) + "\n" for r in records)
+            os.replace(tmp_path, self.index_path)
+            self._catch_up()
+        return len(records)
+
+    @staticmethod
+    def _index_record(file_name: str, offset: int, entry: dict, default_day: str) -> dict:
+        return {
+            "case_id": entry.get("case_id"),
+            "file": file_name,
+            "offset": offset,
+            "day": (entry.get("logged_at") or default_day)[:10],
+            "status": entry.get("final_status"),
+        }
+
+    # --- AuditListener (called from the sink's writer thread) ---
+
+    def on_batch_written(self, path: str, records: List[Tuple[int, dict]]) -> None:
+        today = datetime.now().strftime("%Y-%m-%d")
+        file_name = os.path.basename(path)
+        index_records = [self._index_record(file_name, offset, entry, today) for offset, entry in records]
+        with self._lock:
+            self._append_records(index_records)
+            self._catch_up()
+
+    def on_rotated(self, old_path: str, new_path: str) -> None:
+        record = {"type": "rotate", "from": os.path.basename(old_path), "to": os.path.basename(new_path)}
+        with self._lock:
+            self._append_records([record])
+            self._catch_up()
+
+    # --- queries ---
+
+    def _read_at(self, file_name: str, offset: int) -> dict:
+        with open(os.path.join(self.log_dir, file_name), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    def case_history(self, case_id: str) -> List[dict]:
+        with self._lock:
+            self._catch_up()
+            locations = list(self._by_case.get(case_id, ()))
+        return [self._read_at(name, offset) for name, offset in locations]
+
+    def latest(self, case_id: str) -> Optional[dict]:
+        with self._lock:
+            self._catch_up()
+            locations = self._by_case.get(case_id)
+            location = locations[-1] if locations else None
+        return self._read_at(*location) if location else None
+
+    def daily_counts(self, day: Optional[str] = None) -> Dict[str, int]:
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            self._catch_up()
+            return dict(self._daily.get(day, {}))
+
+    def count(self, status: str, day: Optional[str] = None) -> int:
+        return self.daily_counts(day).get(status, 0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Query the fraud audit log through its sidecar index.")
+    parser.add_argument("--log", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "logger.json"))
+    sub = parser.add_subparsers(dest="command", required=True)
+    case_cmd = sub.add_parser("case", help="Show the logged outcomes for a case id")
+    case_cmd.add_argument("case_id")
+    day_cmd = sub.add_parser("day", help="Status counts for a day (default: today)")
+    day_cmd.add_argument("day", nargs="?")
+    day_cmd.add_argument("--status", help="Only print the count for this status, e.g. confirmed_fraud")
+    sub.add_parser("rebuild", help="Rebuild the sidecar index from the log files")
+    args = parser.parse_args()
+
+    index = AuditIndex(args.log)
+    if args.command == "case":
+        for entry in index.case_history(args.case_id):
+            print(json.dumps(entry))
+    elif args.command == "day":
+        if args.status:
+            print(index.count(args.status, args.day))
+        else:
+            print(json.dumps(index.daily_counts(args.day), indent=2))
+    else:
+        print(f"Indexed {index.rebuild()} audit entries into {index.index_path}")
+
+
+if __name__ == "__main__":
+    main()
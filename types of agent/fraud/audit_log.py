@@ -0,0 +1,242 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Literal, Optional, Protocol, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker process there
+    fcntl = None
+
+logger = logging.getLogger("agent")
+
+FsyncPolicy = Literal["always", "interval", "shutdown"]
+
+
+@contextmanager
+def log_lock(log_path: str):
+    """Exclusive flock on `<log>.lock`, held by whichever process writes, rotates or re-indexes the log."""
+    with open(log_path + ".lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class AuditListener(Protocol):
+    """Notified from the writer thread after each batch lands on disk."""
+
+    def on_batch_written(self, path: str, records: List[Tuple[int, dict]]) -> None:
+        """`records` are (byte offset, entry) pairs for the lines just written to `path`."""
+
+    def on_rotated(self, old_path: str, new_path: str) -> None:
+        ...
+
+
+class AuditSink:
+    """Background JSON Lines writer for fraud case outcomes.
+
+    Tools only enqueue entries; a single task drains the queue in batches and
+    does the file I/O in a worker thread, so the event loop that drives audio
+    never blocks on disk. Files are rotated when they reach `max_bytes` or when
+    the day changes (`logger.json` -> `logger.2025-11-27.1.json`).
+
+    Worker processes share the log: each batch is written (and listeners are
+    told its offsets) under `log_lock`, and a writer whose open file was
+    rotated away by another process reopens `logger.json` before writing.
+
+    fsync policies:
+        always    fsync after every batch
+        interval  fsync at most every `fsync_interval_ms`
+        shutdown  only fsync in `flush()` / `close()`
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        fsync_policy: FsyncPolicy = "interval",
+        fsync_interval_ms: int = 1000,
+        max_bytes: int = 10 * 1024 * 1024,
+        batch_size: int = 256,
+        max_queue: int = 10_000,
+    ):
+        if fsync_policy not in ("always", "interval", "shutdown"):
+            raise ValueError(f"Unknown fsync policy: {fsync_policy}")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval_ms / 1000
+        self.max_bytes = max_bytes
+        self.batch_size = batch_size
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self._file = None
+        self._file_day: Optional[str] = None
+        self._last_fsync = 0.0
+        self._listeners: List[AuditListener] = []
+
+        self._entries_written = 0
+        self._batches_written = 0
+        self._rotations = 0
+        self._max_queue_depth = 0
+        self._write_ms_total = 0.0
+        self._write_ms_max = 0.0
+        self._queue_wait_ms_total = 0.0
+
+    def add_listener(self, listener: AuditListener) -> None:
+        self._listeners.append(listener)
+
+    # --- producer side ---
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="fraud-audit-sink")
+
+    async def put(self, entry: dict) -> None:
+        """Enqueues one entry; only waits if the queue is full."""
+        await self._queue.put((time.perf_counter(), entry))
+        self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+
+    async def flush(self) -> None:
+        """Waits until everything enqueued so far is written, then fsyncs."""
+        await self._queue.join()
+        if self._file:
+            await asyncio.to_thread(self._fsync)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._file:
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+
+    # --- metrics ---
+
+    def stats(self) -> dict:
+        batches = self._batches_written or 1
+        entries = self._entries_written or 1
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self._max_queue_depth,
+            "entries_written": self._entries_written,
+            "batches_written": self._batches_written,
+            "rotations": self._rotations,
+            "avg_write_ms": round(self._write_ms_total / batches, 3),
+            "max_write_ms": round(self._write_ms_max, 3),
+            "avg_queue_wait_ms": round(self._queue_wait_ms_total / entries, 3),
+        }
+
+    # --- writer task ---
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            dequeued_at = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write_batch, [entry for _, entry in batch])
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} audit entries to {self.path}: {e}")
+            else:
+                write_ms = (time.perf_counter() - dequeued_at) * 1000
+                self._write_ms_total += write_ms
+                self._write_ms_max = max(self._write_ms_max, write_ms)
+                self._queue_wait_ms_total += sum((dequeued_at - t) * 1000 for t, _ in batch)
+                self._entries_written += len(batch)
+                self._batches_written += 1
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    # --- file I/O (runs in a worker thread) ---
+
+    def _write_batch(self, entries: list) -> None:
+        lines = [(json.dumps(entry) + "\n").encode() for entry in entries]
+        payload = b"".join(lines)
+        with log_lock(self.path):
+            self._reopen_if_rotated()
+            self._maybe_rotate(len(payload))
+            self._file.write(payload)
+
+            if self._listeners:
+                # Unbuffered O_APPEND under the lock: tell() is the end of this batch
+                offset = self._file.tell() - len(payload)
+                records = []
+                for line, entry in zip(lines, entries):
+                    records.append((offset, entry))
+                    offset += len(line)
+                for listener in self._listeners:
+                    listener.on_batch_written(self.path, records)
+
+        now = time.monotonic()
+        if self.fsync_policy == "always" or (
+            self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval
+        ):
+            self._fsync()
+
+    def _fsync(self) -> None:
+        if self._file:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.monotonic()
+
+    def _reopen_if_rotated(self) -> None:
+        """Another process may have renamed the file we hold; appends must go to the new one."""
+        if self._file is None:
+            return
+        try:
+            current = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(self._file.fileno()).st_ino:
+            self._file.close()
+            self._open()
+
+    def _maybe_rotate(self, incoming_bytes: int) -> None:
+        today = datetime.now().strftime("%Y-%m-%d")
+        if self._file is None:
+            self._open()
+        # Other processes append too, so ask the file rather than our own position
+        size = os.fstat(self._file.fileno()).st_size
+        if size and (self._file_day != today or size + incoming_bytes > self.max_bytes):
+            self._fsync()
+            self._file.close()
+            rotated_path = self._rotated_path(self._file_day)
+            os.replace(self.path, rotated_path)
+            self._rotations += 1
+            for listener in self._listeners:
+                listener.on_rotated(self.path, rotated_path)
+            self._open()
+
+    def _open(self) -> None:
+        self._file = open(self.path, "ab", buffering=0)
+        if self._file.tell():
+            # Existing file: it belongs to the day it was last written
+            self._file_day = datetime.fromtimestamp(os.path.getmtime(self.path)).strftime("%Y-%m-%d")
+        else:
+            self._file_day = datetime.now().strftime("%Y-%m-%d")
+
+    def _rotated_path(self, day: str) -> str:
+        base, ext = os.path.splitext(self.path)
+        n = 1
+        while os.path.exists(f"{base}.{day}.{n}{ext}"):
+            n += 1
+        return f"{base}.{day}.{n}{ext}"
@@ -0,0 +1,331 @@
+import argparse
+import asyncio
+import heapq
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Dict, List, Optional, Protocol
+
+from case_store import PENDING_STATUS, CaseRepository, CaseVersionConflict, SQLiteCaseRepository
+from risk_scoring import CallbackQueue
+
+logger = logging.getLogger("agent")
+
+# Call outcomes reported by a dispatcher
+RESOLVED = "resolved"  # the case left pending_review during the call
+NO_ANSWER = "no_answer"  # nobody picked up, or the call ended without a decision; retried
+FAILED = "failed"  # dispatch error or call timeout; retried
+SKIPPED = "skipped"  # the case cannot be called (e.g. no phone number); not retried
+
+RETRY_OUTCOMES = (NO_ANSWER, FAILED)
+
+
+class CallDispatcher(Protocol):
+    async def dispatch(self, case: dict) -> str:
+        """Places one outbound call for `case` and returns its outcome once the call is over."""
+
+
+class RateLimiter:
+    """Token bucket: at most `per_minute` acquisitions per minute, bursts of up to `burst`."""
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        self.interval = 60.0 / per_minute
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.interval)
+
+
+class CampaignRunner:
+    """Works through the pending fraud cases with outbound calls.
+
+    Pending cases are loaded from the case store and called highest risk first.
+    At most `concurrency` calls are live at once and new calls start no faster
+    than `calls_per_minute`. Unanswered or failed calls are retried with
+    exponential backoff up to `max_attempts`. Before each attempt the case is
+    re-read, so cases resolved meanwhile (e.g. by an inbound call) are dropped.
+    """
+
+    def __init__(
+        self,
+        store: CaseRepository,
+        dispatcher: CallDispatcher,
+        *,
+        concurrency: int = 4,
+        calls_per_minute: float = 30,
+        max_attempts: int = 3,
+        backoff_seconds: float = 300,
+        max_backoff_seconds: float = 3600,
+        call_timeout: float = 600,
+    ):
+        self.store = store
+        self.dispatcher = dispatcher
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(calls_per_minute, burst=concurrency)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.call_timeout = call_timeout
+
+        # (ready_at, sequence, case_id, attempt); ready_at is on the monotonic clock
+        self._ready: List[tuple] = []
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._in_flight = 0
+
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._outcomes: Dict[str, int] = {RESOLVED: 0, NO_ANSWER: 0, FAILED: 0, SKIPPED: 0}
+        self._dispatched = 0
+        self._retries = 0
+        self._gave_up = 0
+        self._dropped = 0
+        self._queue_waits_ms: List[float] = []
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retry number `attempt` (1-based), with up to 20% jitter."""
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        return delay * random.uniform(1.0, 1.2)
+
+    def _schedule(self, case_id: str, attempt: int, delay: float = 0.0) -> None:
+        self._sequence += 1
+        heapq.heappush(self._ready, (time.monotonic() + delay, self._sequence, case_id, attempt))
+        self._wakeup.set()
+
+    async def run(self, limit: Optional[int] = None) -> dict:
+        """Calls every case pending at start (up to `limit`) until each is resolved or out of attempts."""
+        queue = CallbackQueue()
+        queue.add_cases(self.store.load_pending(limit))
+        for _ in range(len(queue)):
+            case_id, _ = queue.pop()
+            self._schedule(case_id, 1)
+        logger.info(f"Campaign started with {len(self._ready)} pending cases")
+
+        self._started_at = time.monotonic()
+        workers = [asyncio.create_task(self._worker(), name=f"fraud-campaign-{i}") for i in range(self.concurrency)]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        self._finished_at = time.monotonic()
+        stats = self.stats()
+        logger.info(f"Campaign finished: {stats}")
+        return stats
+
+    async def _next_job(self) -> Optional[tuple]:
+        while True:
+            if self._ready:
+                ready_at = self._ready[0][0]
+                delay = ready_at - time.monotonic()
+                if delay <= 0:
+                    return heapq.heappop(self._ready)
+            elif self._in_flight == 0:
+                # Nothing queued and no call that could schedule a retry
+                self._wakeup.set()
+                return None
+            else:
+                delay = None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._next_job()
+            if job is None:
+                return
+            ready_at, _, case_id, attempt = job
+            self._in_flight += 1
+            try:
+                await self.limiter.acquire()
+                self._queue_waits_ms.append((time.monotonic() - ready_at) * 1000)
+                await self._attempt(case_id, attempt)
+            finally:
+                self._in_flight -= 1
+                self._wakeup.set()
+
+    async def _attempt(self, case_id: str, attempt: int) -> None:
+        case = await asyncio.to_thread(self.store.get, case_id)
+        if case is None or case["status"] != PENDING_STATUS:
+            self._dropped += 1
+            return
+
+        self._dispatched += 1
+        try:
+            outcome = await asyncio.wait_for(self.dispatcher.dispatch(case), self.call_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Campaign call for {case_id} timed out after {self.call_timeout}s")
+            outcome = FAILED
+        except Exception as e:
+            logger.error(f"Campaign call for {case_id} failed: {e}")
+            outcome = FAILED
+        self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+        if outcome not in RETRY_OUTCOMES:
+            return
+        if attempt >= self.max_attempts:
+            self._gave_up += 1
+            logger.info(f"Giving up on {case_id} after {attempt} attempts")
+            return
+        self._retries += 1
+        self._schedule(case_id, attempt + 1, self.backoff(attempt))
+
+    # --- metrics ---
+
+    def stats(self) -> dict:
+        end = self._finished_at or time.monotonic()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        waits = sorted(self._queue_waits_ms)
+        return {
+            "dispatched": self._dispatched,
+            **self._outcomes,
+            "retries": self._retries,
+            "gave_up": self._gave_up,
+            "dropped_already_resolved": self._dropped,
+            "elapsed_s": round(elapsed, 3),
+            "resolved_per_minute": round(self._outcomes[RESOLVED] / (elapsed / 60), 2) if elapsed else 0.0,
+            "avg_queue_wait_ms": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_queue_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+            "max_queue_wait_ms": round(waits[-1], 3) if waits else 0.0,
+        }
+
+
+class StubDispatcher:
+    """Simulated calls for tests and dry runs; answered calls resolve the case in the store."""
+
+    def __init__(
+        self,
+        store: CaseRepository,
+        answer_rate: float = 0.7,
+        call_seconds: float = 0.05,
+        seed: Optional[int] = None,
+    ):
+        self.store = store
+        self.answer_rate = answer_rate
+        self.call_seconds = call_seconds
+        self._random = random.Random(seed)
+        self.calls: List[str] = []
+
+    async def dispatch(self, case: dict) -> str:
+        self.calls.append(case["case_id"])
+        await asyncio.sleep(self.call_seconds * self._random.uniform(0.5, 1.5))
+        if self._random.random() >= self.answer_rate:
+            return NO_ANSWER
+        status = "confirmed_safe" if self._random.random() < 0.5 else "confirmed_fraud"
+        try:
+            await asyncio.to_thread(
+                self.store.update_status, case["case_id"], status, "Resolved by simulated outbound call.", case["version"]
+            )
+        except CaseVersionConflict:
+            pass
+        return RESOLVED
+
+
+class LiveKitDispatcher:
+    """Dispatches the fraud agent into a new room per call through the LiveKit server API.
+
+    The worker must run with FRAUD_AGENT_NAME set to `agent_name`; the job
+    metadata carries the case id and phone number, and the agent dials out
+    over the SIP trunk. The call outcome is read back from the case store.
+    """
+
+    def __init__(self, store: CaseRepository, agent_name: str, poll_seconds: float = 2.0):
+        self.store = store
+        self.agent_name = agent_name
+        self.poll_seconds = poll_seconds
+
+    async def dispatch(self, case: dict) -> str:
+        from livekit import api
+
+        if not case.get("phone_number"):
+            logger.warning(f"Case {case['case_id']} has no phone number; skipping")
+            return SKIPPED
+
+        room_name = f"fraud-{case['case_id']}-{uuid.uuid4().hex[:6]}"
+        metadata = json.dumps({"case_id": case["case_id"], "phone_number": case["phone_number"]})
+        # Reads LIVEKIT_URL, LIVEKIT_API_KEY and LIVEKIT_API_SECRET from the environment
+        async with api.LiveKitAPI() as lkapi:
+            await lkapi.agent_dispatch.create_dispatch(
+                api.CreateAgentDispatchRequest(agent_name=self.agent_name, room=room_name, metadata=metadata)
+            )
+            try:
+                while True:
+                    await asyncio.sleep(self.poll_seconds)
+                    current = await asyncio.to_thread(self.store.get, case["case_id"])
+                    if current and current["status"] != PENDING_STATUS:
+                        return RESOLVED
+                    rooms = await lkapi.room.list_rooms(api.ListRoomsRequest(names=[room_name]))
+                    if not rooms.rooms:
+                        # The agent left (no answer, hang-up or failed verification) without a decision
+                        return NO_ANSWER
+            finally:
+                try:
+                    await lkapi.room.delete_room(api.DeleteRoomRequest(room=room_name))
+                except api.TwirpError:
+                    pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Call pending fraud cases with the outbound campaign runner.")
+    parser.add_argument("--db", default=os.getenv("FRAUD_CASES_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fraud_cases.db")))
+    parser.add_argument("--dispatcher", choices=("stub", "livekit"), default="stub")
+    parser.add_argument("--agent-name", default=os.getenv("FRAUD_AGENT_NAME", "fraud-agent"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--calls-per-minute", type=float, default=30)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--backoff", type=float, default=300, help="Seconds before the first retry; doubles per attempt")
+    parser.add_argument("--limit", type=int, help="Only call this many pending cases")
+    parser.add_argument("--synthetic", type=int, help="Stub only: call this many synthetic cases in a temporary database")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db_path = args.db
+    if args.synthetic:
+        import tempfile
+
+        db_path = os.path.join(tempfile.mkdtemp(), "campaign.db")
+        SQLiteCaseRepository(db_path).seed({
+            f"customer{i}": {
+                "case_id": f"FRD-{i:06d}",
+                "customer_name": f"Customer {i}",
+                "transaction_amount": f"{random.lognormvariate(4.0, 1.2):.2f}",
+                "status": PENDING_STATUS,
+            }
+            for i in range(args.synthetic)
+        })
+    store = SQLiteCaseRepository(db_path)
+    if args.dispatcher == "stub":
+        dispatcher = StubDispatcher(store)
+    else:
+        dispatcher = LiveKitDispatcher(store, args.agent_name)
+
+    runner = CampaignRunner(
+        store,
+        dispatcher,
+        concurrency=args.concurrency,
+        calls_per_minute=args.calls_per_minute,
+        max_attempts=args.max_attempts,
+        backoff_seconds=args.backoff,
+    )
+    print(json.dumps(asyncio.run(runner.run(args.limit)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import re
+from bisect import bisect_left
+import time
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_NON_ALPHA = re.compile(r"[^a-z]+")
+
+# How much each kind of key contributes to a candidate's score
+EXACT_WEIGHT = 3.0
+METAPHONE_WEIGHT = 2.0
+SOUNDEX_WEIGHT = 1.0
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+_VOWELS = set("aeiouy")
+
+# Posting lists longer than this only re-score candidates found through rarer keys
+MAX_CANDIDATE_POSTINGS = 2000
+
+
+def normalize_token(text: str) -> str:
+    """Lowercases and strips everything except letters and digits ("ID-300C" -> "id300c")."""
+    return _NON_ALNUM.sub("", text.lower())
+
+
+def tokenize(text: str) -> List[str]:
+    return [tok for tok in (normalize_token(part) for part in text.split()) if tok]
+
+
+def soundex(word: str) -> str:
+    word = _NON_ALPHA.sub("", word.lower())
+    if not word:
+        return ""
+    first = word[0]
+    digits = []
+    last = _SOUNDEX_CODES.get(first, "")
+    for ch in word[1:]:
+        code = _SOUNDEX_CODES.get(ch, "")
+        if code and code != last:
+            digits.append(code)
+        if ch not in "hw":
+            last = code
+    return (first.upper() + "".join(digits) + "000")[:4]
+
+
+def metaphone(word: str) -> str:
+    """Primary code of a simplified Double Metaphone.
+
+    Covers the rules that matter for transcribed names (silent h, ph/f, v/f,
+    soft c/g, sh/ch, doubled letters, vowels only kept in first position), plus
+    the aspirated consonants common in Indian names (bh, dh, kh, th, gh) and
+    the v/w merger.
+    """
+    word = _NON_ALPHA.sub("", word.lower())
+    if not word:
+        return ""
+    for src, dst in (("ph", "f"), ("bh", "b"), ("dh", "d"), ("kh", "k"), ("gh", "g"), ("th", "t"), ("ck", "k"), ("sch", "sk")):
+        word = word.replace(src, dst)
+    if word[:2] in ("kn", "gn", "wr", "pn"):
+        word = word[1:]
+
+    out = []
+    n = len(word)
+    for i, ch in enumerate(word):
+        nxt = word[i + 1] if i + 1 < n else ""
+        prev = word[i - 1] if i > 0 else ""
+        if ch == prev and ch != "c":
+            continue
+        if ch in _VOWELS:
+            if i == 0:
+                out.append("A")
+            continue
+        if ch == "h":
+            if i == 0 and nxt in _VOWELS:
+                out.append("H")
+            continue
+        if ch == "w":
+            # Indian English merges v and w between vowels ("Ravi" / "Rawi")
+            if nxt in _VOWELS:
+                out.append("F" if i > 0 else "W")
+            continue
+        if ch == "c":
+            if nxt == "h":
+                out.append("X")
+            elif nxt in "eiy":
+                out.append("S")
+            else:
+                out.append("K")
+            continue
+        if ch == "s" and nxt == "h":
+            out.append("X")
+            continue
+        if ch == "g" and nxt in "eiy":
+            out.append("J")
+            continue
+        code = {"q": "K", "v": "F", "z": "S", "x": "KS"}.get(ch, ch.upper())
+        if not out or out[-1] != code:
+            out.append(code)
+    return "".join(out)
+
+
+def _full_name_keys(tokens: List[str]) -> List[str]:
+    words = [tok for tok in tokens if tok.isalpha() and len(tok) > 1]
+    if len(words) < 2:
+        return []
+    return [
+        "m:" + "|".join(sorted(metaphone(w) for w in words)),
+        "s:" + "|".join(sorted(soundex(w) for w in words)),
+    ]
+
+
+def _contains(plist: List[int], pos: int) -> bool:
+    i = bisect_left(plist, pos)
+    return i < len(plist) and plist[i] == pos
+
+
+class CaseIndex:
+    """Maps exact, Metaphone and Soundex keys of names and identifiers to case references.
+
+    Built once when cases are loaded; `lookup` scores every posting list the
+    spoken name touches in one pass and returns ranked candidates, so the agent
+    no longer depends on the transcription matching a dict key exactly.
+    """
+
+    def __init__(self) -> None:
+        self._refs: List[str] = []
+        self._names: List[str] = []
+        # Posting lists of case positions; positions only grow, so lists stay sorted and unique
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._metaphone: Dict[str, List[int]] = defaultdict(list)
+        self._soundex: Dict[str, List[int]] = defaultdict(list)
+        # Whole-name keys ("HTF|XRM"), far more selective than any single token
+        self._full_name: Dict[str, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    @classmethod
+    def from_cases(cls, cases: Dict[str, dict]) -> "CaseIndex":
+        index = cls()
+        for ref, case in cases.items():
+            index.add(ref, case)
+        return index
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict], ref_field: str = "case_id") -> "CaseIndex":
+        """Builds the index from lightweight rows, e.g. `CaseRepository.iter_index_rows()`."""
+        index = cls()
+        for row in rows:
+            index.add(row[ref_field], row)
+        return index
+
+    def add(self, ref: str, case: dict) -> None:
+        pos = len(self._refs)
+        self._refs.append(ref)
+        self._names.append(case.get("customer_name", "").lower())
+
+        for token in tokenize(ref) + tokenize(case.get("customer_key", "")) + tokenize(case.get("customer_name", "")):
+            self._post(self._exact, token, pos)
+            if token.isalpha() and len(token) > 1:
+                self._post(self._metaphone, metaphone(token), pos)
+                self._post(self._soundex, soundex(token), pos)
+        for ident in (case.get("security_identifier"), case.get("case_id")):
+            if ident:
+                self._post(self._exact, normalize_token(ident), pos)
+        for key in _full_name_keys(tokenize(case.get("customer_name", ""))):
+            self._post(self._full_name, key, pos)
+
+    @staticmethod
+    def _post(postings: Dict[str, List[int]], key: str, pos: int) -> None:
+        plist = postings[key]
+        if not plist or plist[-1] != pos:
+            plist.append(pos)
+
+    def lookup(self, spoken: str, limit: int = 3, min_score: float = 1.0) -> List[Tuple[str, float]]:
+        """Returns up to `limit` (ref, score) pairs, best first."""
+        tokens = tokenize(spoken)
+        if not tokens:
+            return []
+
+        # One (posting list, weight) group per spoken token; identifiers are often
+        # transcribed as separate words ("I D 300 C"), so the joined form is tried too.
+        groups: List[List[Tuple[List[int], float]]] = []
+        for token in tokens + (["".join(tokens)] if len(tokens) > 1 else []):
+            group = [(self._exact[token], EXACT_WEIGHT)] if token in self._exact else []
+            if token.isalpha() and len(token) > 1:
+                for postings, key, weight in (
+                    (self._metaphone, metaphone(token), METAPHONE_WEIGHT),
+                    (self._soundex, soundex(token), SOUNDEX_WEIGHT),
+                ):
+                    if key in postings:
+                        group.append((postings[key], weight))
+            if group:
+                groups.append(group)
+        if not groups:
+            return []
+
+        # Candidates come from whole-name keys and selective posting lists only; common
+        # keys (a popular surname, a crowded Soundex bucket) just add score via bisect.
+        candidates = set()
+        for key in _full_name_keys(tokens):
+            candidates.update(self._full_name.get(key, ()))
+        for group in groups:
+            for plist, _ in group:
+                if len(plist) <= MAX_CANDIDATE_POSTINGS:
+                    candidates.update(plist)
+        if not candidates:
+            smallest = min((plist for group in groups for plist, _ in group), key=len)
+            candidates.update(smallest[:MAX_CANDIDATE_POSTINGS])
+
+        spoken_lower = " ".join(tokens)
+        scored = []
+        for pos in candidates:
+            score = 0.0
+            for group in groups:
+                score += max((weight for plist, weight in group if _contains(plist, pos)), default=0.0)
+            scored.append((score, pos))
+        # Break ties between phonetically equal candidates by spelling similarity
+        scored.sort(reverse=True)
+        ranked = sorted(
+            ((score + SequenceMatcher(None, spoken_lower, self._names[pos]).ratio(), pos) for score, pos in scored[: limit * 10]),
+            reverse=True,
+        )
+        return [(self._refs[pos], round(score, 3)) for score, pos in ranked[:limit] if score >= min_score]
+
+    def best(self, spoken: str, min_score: float = 2.0) -> Optional[str]:
+        candidates = self.lookup(spoken, limit=1, min_score=min_score)
+        return candidates[0][0] if candidates else None
+
+
+# --- Benchmark: `python case_index.py [num_cases]` ---
+
+_SYLLABLES = ["ra", "vi", "he", "tv", "ar", "ia", "sha", "rm", "an", "ka", "ni", "pri", "ya", "de", "vo", "mo", "hi", "ta", "su", "ja", "la", "kri", "na", "bh", "ma"]
+_SURNAMES = ["sharma", "patel", "singh", "kumar", "mehta", "iyer", "reddy", "gupta", "shah", "nair", "joshi", "das"]
+
+
+def _synthetic_cases(count: int) -> Dict[str, dict]:
+    cases = {}
+    n_syl = len(_SYLLABLES)
+    for i in range(count):
+        first = _SYLLABLES[i % n_syl] + _SYLLABLES[(i // n_syl) % n_syl] + _SYLLABLES[(i // n_syl**2) % n_syl]
+        # i -> (first, last) is injective, so every synthetic customer name is unique
+        j = ((i // n_syl**3) * 2459) % (n_syl * n_syl * len(_SURNAMES))
+        last = _SYLLABLES[j % n_syl] + _SYLLABLES[(j // n_syl) % n_syl] + _SURNAMES[j // (n_syl * n_syl)]
+        cases[f"case{i}"] = {
+            "case_id": f"FRD-{i:07d}",
+            "customer_name": f"{first.title()} {last.title()}",
+            "security_identifier": f"ID-{i:06X}",
+        }
+    return cases
+
+
+def _misspell(name: str, variant: int) -> str:
+    """STT-style variants: long vowels, dropped/added h, v/w and s/sh swaps."""
+    rules = [("i", "ee"), ("a", "aa"), ("v", "w"), ("sh", "s"), ("th", "t"), ("e", "i"), ("k", "c"), ("y", "i")]
+    src, dst = rules[variant % len(rules)]
+    if src in name:
+        return name.replace(src, dst, 1)
+    return name + "h"
+
+
+def _benchmark(count: int) -> None:
+    started = time.perf_counter()
+    cases = _synthetic_cases(count)
+    cases.update({
+        "ravi": {"case_id": "FRD-7777", "customer_name": "Ravi Sharma", "security_identifier": "ID-300C"},
+        "hetvi": {"case_id": "FRD-4445", "customer_name": "Hetvi", "security_identifier": "ID-112A"},
+    })
+    index = CaseIndex.from_cases(cases)
+    print(f"Indexed {len(index):,} cases in {time.perf_counter() - started:.1f}s")
+
+    queries = ["Hetvee", "Ravee Sharma", "ID 300 C", "hetvi"]
+    step = max(1, count // 2000)
+    sample_refs = [f"case{i}" for i in range(0, count, step)][:2000]
+    queries += [cases[ref]["customer_name"] for ref in sample_refs[:500]]
+    started = time.perf_counter()
+    for q in queries:
+        index.lookup(q)
+    elapsed = time.perf_counter() - started
+    print(f"Lookup latency: {elapsed / len(queries) * 1000:.3f} ms avg over {len(queries)} queries")
+
+    # Match rate on misspelled full names: is the intended case the top candidate / in the top 3?
+    top1 = top3 = 0
+    for i, ref in enumerate(sample_refs):
+        spoken = _misspell(cases[ref]["customer_name"].lower(), i)
+        ranked = [r for r, _ in index.lookup(spoken, limit=3)]
+        top1 += bool(ranked) and ranked[0] == ref
+        top3 += ref in ranked
+    print(f"Misspelled-name match rate: top-1 {top1 / len(sample_refs):.1%}, top-3 {top3 / len(sample_refs):.1%} over {len(sample_refs)} names")
+    for q in ("Hetvee", "Ravee", "I D 300 C"):
+        print(f"  {q!r} -> {index.lookup(q)}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
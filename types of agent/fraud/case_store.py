@@ -0,0 +1,196 @@
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger("agent")
+
+CASE_FIELDS = (
+    "case_id",
+    "customer_key",
+    "customer_name",
+    "security_identifier",
+    "masked_card",
+    "transaction_amount",
+    "merchant_name",
+    "location",
+    "home_region",
+    "phone_number",
+    "timestamp",
+    "security_question",
+    "security_answer",
+    "status",
+    "outcome_note",
+)
+
+# Columns added after the first schema; older databases get them through ALTER TABLE
+OPTIONAL_COLUMNS = ("home_region", "phone_number")
+
+PENDING_STATUS = "pending_review"
+
+
+class CaseVersionConflict(Exception):
+    """Raised when a case was updated by another call since it was loaded."""
+
+
+class CaseRepository(ABC):
+    """Storage for fraud cases. Every case carries a `version` used for optimistic updates."""
+
+    @abstractmethod
+    def get(self, case_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def find_by_customer_key(self, customer_key: str) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def load_pending(self, limit: Optional[int] = None) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def iter_index_rows(self, status: str = PENDING_STATUS) -> Iterator[dict]:
+        """Yields only the fields needed to build a CaseIndex (no answers or transaction data)."""
+
+    @abstractmethod
+    def update_status(self, case_id: str, status: str, outcome_note: str, expected_version: int) -> int:
+        """Sets status and note if the case is still at `expected_version`; returns the new version."""
+
+
+class SQLiteCaseRepository(CaseRepository):
+    """Local SQLite case store, safe to share between worker processes.
+
+    WAL mode lets many readers proceed while one call writes, and each status
+    change is a single conditional UPDATE, so two calls resolving the same case
+    cannot overwrite each other: the second one gets CaseVersionConflict.
+
+    Calls block for up to `busy_timeout_ms` while another process writes, so
+    agents run them through `asyncio.to_thread`; the connection is shared by
+    those threads behind a lock.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout_ms / 1000, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cases (
+                case_id TEXT PRIMARY KEY,
+                customer_key TEXT NOT NULL,
+                customer_name TEXT NOT NULL,
+                security_identifier TEXT,
+                masked_card TEXT,
+                transaction_amount TEXT,
+                merchant_name TEXT,
+                location TEXT,
+                home_region TEXT,
+                phone_number TEXT,
+                timestamp TEXT,
+                security_question TEXT,
+                security_answer TEXT,
+                status TEXT NOT NULL,
+                outcome_note TEXT NOT NULL DEFAULT '',
+                version INTEGER NOT NULL DEFAULT 1,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_cases_customer_key ON cases (customer_key);
+            CREATE INDEX IF NOT EXISTS idx_cases_status ON cases (status);
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(cases)")}
+        for name in OPTIONAL_COLUMNS:
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE cases ADD COLUMN {name} TEXT")
+
+    def close(self):
+        self._conn.close()
+
+    def seed(self, cases: Dict[str, dict]) -> int:
+        """Inserts cases keyed by customer key; cases that already exist keep their stored state."""
+        rows = []
+        for customer_key, case in cases.items():
+            row = {name: case.get(name, "") for name in CASE_FIELDS}
+            row["customer_key"] = customer_key.lower()
+            rows.append(row)
+        with self._lock:
+            return self._seed_rows(rows)
+
+    def _seed_rows(self, rows: List[dict]) -> int:
+        columns = ", ".join(CASE_FIELDS)
+        placeholders = ", ".join(f":{name}" for name in CASE_FIELDS)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self._conn.executemany(
+                f"INSERT OR IGNORE INTO cases ({columns}, version, updated_at) VALUES ({placeholders}, 1, {time.time()})",
+                rows,
+            )
+            inserted = cursor.rowcount
+            # Back-fill optional columns on cases seeded before those columns existed
+            assignments = ", ".join(f"{name} = COALESCE({name}, :{name})" for name in OPTIONAL_COLUMNS)
+            self._conn.executemany(f"UPDATE cases SET {assignments} WHERE case_id = :case_id", rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        if inserted:
+            logger.info(f"Seeded {inserted} new fraud cases into {self.path}")
+        return inserted
+
+    def get(self, case_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM cases WHERE case_id = ?", (case_id,)).fetchone()
+        return dict(row) if row else None
+
+    def find_by_customer_key(self, customer_key: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM cases WHERE customer_key = ?", (customer_key.lower(),)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def load_pending(self, limit: Optional[int] = None) -> List[dict]:
+        sql = "SELECT * FROM cases WHERE status = ? ORDER BY case_id"
+        params: tuple = (PENDING_STATUS,)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def iter_index_rows(self, status: str = PENDING_STATUS) -> Iterator[dict]:
+        # Streams rows for building the startup index, before any call runs
+        cursor = self._conn.execute(
+            "SELECT case_id, customer_key, customer_name, security_identifier FROM cases WHERE status = ?",
+            (status,),
+        )
+        for row in cursor:
+            yield dict(row)
+
+    def update_status(self, case_id: str, status: str, outcome_note: str, expected_version: int) -> int:
+        # A single conditional statement is its own transaction in autocommit mode
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE cases SET status = ?, outcome_note = ?, version = version + 1, updated_at = ? "
+                "WHERE case_id = ? AND version = ?",
+                (status, outcome_note, time.time(), case_id, expected_version),
+            )
+            updated = cursor.rowcount == 1
+        if not updated:
+            current = self.get(case_id)
+            if current is None:
+                raise KeyError(f"Unknown case id: {case_id}")
+            raise CaseVersionConflict(
+                f"Case {case_id} is at version {current['version']} (status {current['status']}), expected {expected_version}."
+            )
+        return expected_version + 1
@@ -0,0 +1,305 @@
+import heapq
+import math
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Feature weights for the logistic risk score
+WEIGHTS = {
+    "amount": 1.2,  # standardized log amount
+    "merchant": 2.0,  # merchant category risk, 0..1
+    "away_from_home": 1.5,  # transaction country differs from the customer's home region
+    "night": 0.8,  # between midnight and 5 AM local time
+}
+BIAS = -2.0
+
+# Substring -> risk for merchant names; first match wins, unknown merchants get DEFAULT_MERCHANT_RISK
+MERCHANT_RISK_KEYWORDS = (
+    ("crypto", 1.0),
+    ("gift card", 0.9),
+    ("jewel", 0.8),
+    ("electronic", 0.6),
+    ("martial", 0.5),
+    ("football", 0.4),
+    ("travel", 0.4),
+    ("grocery", 0.1),
+    ("general store", 0.1),
+    ("pharmacy", 0.1),
+)
+DEFAULT_MERCHANT_RISK = 0.3
+
+# Spellings of a country -> canonical name
+COUNTRY_ALIASES = {
+    "india": "india", "bharat": "india",
+    "uae": "united arab emirates", "united arab emirates": "united arab emirates",
+    "uk": "united kingdom", "united kingdom": "united kingdom", "england": "united kingdom", "great britain": "united kingdom",
+    "us": "united states", "usa": "united states", "united states": "united states", "america": "united states",
+    "canada": "canada", "japan": "japan",
+}
+# States, provinces and cities seen as the last part of a location -> canonical country
+REGION_COUNTRY = {
+    **{name: "india" for name in (
+        "andhra pradesh", "assam", "bihar", "delhi", "new delhi", "goa", "gujarat", "haryana", "karnataka",
+        "kerala", "madhya pradesh", "maharashtra", "odisha", "punjab", "rajasthan", "rajsthan", "tamil nadu",
+        "telangana", "uttar pradesh", "west bengal", "mumbai", "jaipur", "surat", "bangalore", "bengaluru",
+        "chennai", "kolkata", "hyderabad", "pune", "ahmedabad",
+    )},
+    **{name: "canada" for name in ("ontario", "quebec", "british columbia", "alberta", "toronto", "vancouver")},
+    **{name: "united arab emirates" for name in ("dubai", "abu dhabi", "sharjah")},
+    **{name: "united kingdom" for name in ("london", "scotland", "wales")},
+    **{name: "japan" for name in ("tokyo", "osaka")},
+}
+
+_TIME_RE = re.compile(r"(\d{1,2}):\d{2}\s*([AP]M)", re.IGNORECASE)
+# The number inside an amount; a currency's own dot ("Rs. 500") is not a decimal point
+_AMOUNT_RE = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def merchant_risk(name: str) -> float:
+    lowered = name.lower()
+    for keyword, risk in MERCHANT_RISK_KEYWORDS:
+        if keyword in lowered:
+            return risk
+    return DEFAULT_MERCHANT_RISK
+
+
+def _normalize_place(part: str) -> str:
+    return " ".join(re.sub(r"[^a-z ]", " ", part.lower()).split())
+
+
+def _country(place: str) -> str:
+    """Canonical country for "City, Region, Country" or a bare region/country.
+
+    Parts are tried right to left, so "jaipur,Rajsthan" and "India" both
+    give "india"; an unrecognized place falls back to its normalized last part.
+    """
+    parts = [_normalize_place(p) for p in (place or "").split(",")]
+    parts = [p for p in parts if p]
+    for part in reversed(parts):
+        country = COUNTRY_ALIASES.get(part) or REGION_COUNTRY.get(part)
+        if country:
+            return country
+    return parts[-1] if parts else ""
+
+
+def parse_amount(value) -> float:
+    """Amounts as stored or spoken ("60.00", "$1,200", "Rs. 500"); unparseable values count as 0."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _AMOUNT_RE.search(str(value or ""))
+    return float(match.group(0).replace(",", "")) if match else 0.0
+
+
+def _hour(timestamp: str) -> int:
+    match = _TIME_RE.search(timestamp or "")
+    if not match:
+        return 12
+    hour = int(match.group(1)) % 12
+    return hour + 12 if match.group(2).upper() == "PM" else hour
+
+
+def _factorize(values: Iterable[str]) -> Tuple[np.ndarray, List[str]]:
+    """Hash-based factorization: (integer code per value, distinct values in code order)."""
+    codes: Dict[str, int] = {}
+    inverse = np.fromiter((codes.setdefault(v, len(codes)) for v in values), dtype=np.int64)
+    return inverse, list(codes)
+
+
+def _categorical(values: Iterable[str], fn) -> np.ndarray:
+    """Applies `fn` once per distinct value and gathers the results back into a column."""
+    inverse, uniques = _factorize(values)
+    return np.fromiter((fn(u) for u in uniques), dtype=np.float64, count=len(uniques))[inverse]
+
+
+def _country_column(places: Iterable[str], countries: Dict[str, int]) -> np.ndarray:
+    inverse, uniques = _factorize(places)
+    lookup = np.fromiter((countries.setdefault(_country(p), len(countries)) for p in uniques), dtype=np.int64, count=len(uniques))
+    return lookup[inverse]
+
+
+class RiskFeatures:
+    """Column arrays for a batch of cases; built once, scored many times."""
+
+    __slots__ = ("case_ids", "log_amount", "merchant", "away_from_home", "night")
+
+    def __init__(self, cases: Sequence[dict]):
+        self.case_ids = [c["case_id"] for c in cases]
+        amounts = np.fromiter((parse_amount(c.get("transaction_amount")) for c in cases), dtype=np.float64, count=len(cases))
+        self.log_amount = np.log1p(np.abs(amounts))
+        self.merchant = _categorical((c.get("merchant_name") or "" for c in cases), merchant_risk)
+
+        # Countries are compared as integer codes from one shared vocabulary
+        countries: Dict[str, int] = {"": 0}
+        location_country = _country_column((c.get("location") or "" for c in cases), countries)
+        home_country = _country_column((c.get("home_region") or "" for c in cases), countries)
+        # Unknown home region is treated as "not away"
+        self.away_from_home = ((home_country != 0) & (home_country != location_country)).astype(np.float64)
+
+        hours = _categorical((c.get("timestamp") or "" for c in cases), _hour)
+        self.night = (hours < 5).astype(np.float64)
+
+    def __len__(self) -> int:
+        return len(self.case_ids)
+
+
+class RiskScorer:
+    """Vectorized logistic scorer; amount is standardized with running stats across batches."""
+
+    def __init__(self) -> None:
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def update_stats(self, log_amount: np.ndarray) -> None:
+        # Chan et al. parallel merge of (count, mean, M2)
+        n_b = len(log_amount)
+        if not n_b:
+            return
+        mean_b = float(log_amount.mean())
+        m2_b = float(((log_amount - mean_b) ** 2).sum())
+        n = self._n + n_b
+        delta = mean_b - self._mean
+        self._mean += delta * n_b / n
+        self._m2 += m2_b + delta * delta * self._n * n_b / n
+        self._n = n
+
+    @property
+    def amount_std(self) -> float:
+        return math.sqrt(self._m2 / self._n) if self._n > 1 and self._m2 > 0 else 1.0
+
+    def score(self, features: RiskFeatures) -> np.ndarray:
+        z = (features.log_amount - self._mean) / self.amount_std
+        logits = (
+            BIAS
+            + WEIGHTS["amount"] * z
+            + WEIGHTS["merchant"] * features.merchant
+            + WEIGHTS["away_from_home"] * features.away_from_home
+            + WEIGHTS["night"] * features.night
+        )
+        return 1.0 / (1.0 + np.exp(-logits))
+
+
+class CallbackQueue:
+    """Priority queue of pending cases to call, highest risk first.
+
+    New cases are scored as a batch when they arrive; existing entries keep
+    their score until `rescore()` is called (e.g. after the amount distribution
+    has shifted). Resolved cases are dropped lazily when they reach the top.
+    """
+
+    def __init__(self, scorer: Optional[RiskScorer] = None):
+        self.scorer = scorer or RiskScorer()
+        self._heap: List[Tuple[float, str]] = []
+        self._scores: Dict[str, float] = {}
+        self._batches: List[RiskFeatures] = []
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def add_cases(self, cases: Sequence[dict]) -> np.ndarray:
+        features = RiskFeatures(cases)
+        self.scorer.update_stats(features.log_amount)
+        scores = self.scorer.score(features)
+        self._batches.append(features)
+        self._push(features.case_ids, scores)
+        return scores
+
+    def _push(self, case_ids: Iterable[str], scores: np.ndarray) -> None:
+        entries = [(-s, cid) for cid, s in zip(case_ids, scores.tolist())]
+        self._scores.update((cid, -neg) for neg, cid in entries)
+        if len(entries) > len(self._heap):
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def rescore(self) -> None:
+        """Re-scores every queued case with the current stats in one vectorized pass per batch."""
+        self._heap = []
+        pending = dict(self._scores)
+        self._scores = {}
+        for features in self._batches:
+            scores = self.scorer.score(features)
+            keep = [(cid, s) for cid, s in zip(features.case_ids, scores.tolist()) if cid in pending]
+            self._heap.extend((-s, cid) for cid, s in keep)
+            self._scores.update(keep)
+        heapq.heapify(self._heap)
+        self._batches = [b for b in self._batches if any(cid in self._scores for cid in b.case_ids)]
+
+    def discard(self, case_id: str) -> None:
+        self._scores.pop(case_id, None)
+
+    def _prune(self) -> None:
+        while self._heap and self._scores.get(self._heap[0][1]) != -self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def pop(self) -> Optional[Tuple[str, float]]:
+        self._prune()
+        if not self._heap:
+            return None
+        neg_score, case_id = heapq.heappop(self._heap)
+        del self._scores[case_id]
+        return case_id, -neg_score
+
+    def peek(self, n: int = 10) -> List[Tuple[str, float]]:
+        self._prune()
+        top = heapq.nsmallest(n, (e for e in self._heap if self._scores.get(e[1]) == -e[0]))
+        return [(cid, -neg) for neg, cid in top]
+
+
+# --- Benchmark: `python risk_scoring.py [num_cases]` ---
+
+_MERCHANTS = ["Local Grocery Store", "World Martial Arts", "Clovers General Store", "Blue Lock Football",
+              "Croma Electronics", "Tanishq Jewellers", "Amazon Gift Cards", "CoinDCX Crypto", "Air India Travel"]
+_PLACES = ["Mumbai, India", "Toronto, Canada", "Jaipur, India", "Surat, India", "Dubai, UAE", "London, UK"]
+
+
+def _synthetic_cases(count: int, start: int = 0) -> List[dict]:
+    rng = np.random.default_rng(start)
+    amounts = np.round(rng.lognormal(4.0, 1.2, count), 2)
+    merchants = rng.integers(0, len(_MERCHANTS), count)
+    places = rng.integers(0, len(_PLACES), count)
+    hours = rng.integers(1, 13, count)
+    pm = rng.integers(0, 2, count)
+    return [
+        {
+            "case_id": f"FRD-{start + i:07d}",
+            "transaction_amount": f"{amounts[i]:.2f}",
+            "merchant_name": _MERCHANTS[merchants[i]],
+            "location": _PLACES[places[i]],
+            "home_region": "India",
+            "timestamp": f"Nov 25, 2025, {hours[i]}:15 {'PM' if pm[i] else 'AM'} IST",
+        }
+        for i in range(count)
+    ]
+
+
+def _benchmark(count: int) -> None:
+    cases = _synthetic_cases(count)
+    queue = CallbackQueue()
+
+    started = time.perf_counter()
+    queue.add_cases(cases)
+    print(f"Scored and queued {count:,} cases in {time.perf_counter() - started:.2f}s")
+
+    new_cases = _synthetic_cases(10_000, start=count)
+    started = time.perf_counter()
+    queue.add_cases(new_cases)
+    print(f"Incrementally scored {len(new_cases):,} new cases in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    queue.rescore()
+    print(f"Full re-score of {len(queue):,} queued cases in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    top = [queue.pop() for _ in range(1000)]
+    print(f"Popped 1,000 highest-risk cases in {(time.perf_counter() - started) * 1000:.1f} ms; top: {top[:3]}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from case_store import PENDING_STATUS, CaseRepository, CaseVersionConflict
+
+
+class VerificationState:
+    """Per-call verification progress. One instance per Assistant, never shared between calls.
+
+    Answer attempts and a failed verification last for the whole call:
+    loading a case again does not reset them, and once verification has
+    failed no case can be loaded at all.
+    """
+
+    __slots__ = (
+        "case_id",
+        "case_version",
+        "lookup_attempts",
+        "answer_attempts",
+        "verification_started_at",
+        "verified",
+        "verification_failed",
+        "resolved_status",
+    )
+
+    def __init__(self) -> None:
+        self.case_id: Optional[str] = None
+        self.case_version: Optional[int] = None
+        self.lookup_attempts = 0
+        self.answer_attempts = 0
+        self.verification_started_at: Optional[float] = None
+        self.verified = False
+        self.verification_failed = False
+        self.resolved_status: Optional[str] = None
+
+    def start_lookup(self, max_lookups: int) -> bool:
+        """Counts one case lookup; False once verification failed or `max_lookups` are used up."""
+        if self.verification_failed or self.lookup_attempts >= max_lookups:
+            return False
+        self.lookup_attempts += 1
+        return True
+
+    def load_case(self, case: dict) -> None:
+        if self.verification_failed:
+            raise ValueError("Verification already failed on this call; no case can be loaded.")
+        if case["case_id"] != self.case_id:
+            self.verified = False
+        self.case_id = case["case_id"]
+        self.case_version = case["version"]
+        if self.verification_started_at is None:
+            self.verification_started_at = time.monotonic()
+
+
+class CaseLockRegistry:
+    """One asyncio.Lock per case id, shared by all calls in a worker process.
+
+    A lock exists only while some call holds or waits for it; the entry is
+    evicted as soon as its last user releases it, so the registry stays as
+    small as the number of cases currently being resolved.
+    """
+
+    def __init__(self) -> None:
+        # case id -> [lock, number of holders and waiters]
+        self._locks: Dict[str, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def hold(self, case_id: str) -> AsyncIterator[None]:
+        entry = self._locks.get(case_id)
+        if entry is None:
+            entry = self._locks[case_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[case_id]
+
+
+async def resolve_case(
+    store: CaseRepository,
+    locks: CaseLockRegistry,
+    state: VerificationState,
+    status: str,
+    outcome_note: str,
+) -> Tuple[bool, str, Optional[dict]]:
+    """Applies the caller's decision to their case.
+
+    Returns (ok, reason, case). Calls in this process are serialized per case by
+    the lock; calls in other processes are caught by the store's version check.
+    Store calls run in a thread so a busy database never blocks the event loop.
+    """
+    if not state.case_id:
+        return False, "no_case", None
+    if not state.verified:
+        return False, "not_verified", None
+
+    async with locks.hold(state.case_id):
+        case = await asyncio.to_thread(store.get, state.case_id)
+        if case is None:
+            return False, "no_case", None
+        if case["status"] != PENDING_STATUS:
+            return False, "already_resolved", case
+        try:
+            state.case_version = await asyncio.to_thread(
+                store.update_status, case["case_id"], status, outcome_note, state.case_version
+            )
+        except CaseVersionConflict:
+            return False, "already_resolved", await asyncio.to_thread(store.get, case["case_id"])
+    state.resolved_status = status
+    return True, "resolved", case
+
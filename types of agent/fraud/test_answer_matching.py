@@ -0,0 +1,34 @@
+import pytest
+
+from answer_matching import answer_matches, normalize_answer
+
+
+@pytest.mark.parametrize(
+    "spoken, normalized",
+    [
+        ("five four three two", "5432"),
+        ("Um, it's 54-32.", "5432"),
+        ("fifty four thirty two", "5432"),
+        ("one double oh five", "1005"),
+        ("two thousand twenty five", "2025"),
+        ("The answer is Black!", "black"),
+    ],
+)
+def test_normalize_answer(spoken, normalized):
+    assert normalize_answer(spoken) == normalized
+
+
+@pytest.mark.parametrize(
+    "expected, spoken, matches",
+    [
+        ("5432", "five four three two", True),
+        ("5432", "five four three three", False),
+        ("5432", "543", False),
+        ("nobita", "Nobeta", True),
+        ("nobita", "doremon", False),
+        ("cool", "pool", False),
+        ("black", "", False),
+    ],
+)
+def test_answer_matches(expected, spoken, matches):
+    assert answer_matches(expected, spoken) is matches
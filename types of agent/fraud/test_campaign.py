@@ -0,0 +1,110 @@
+import asyncio
+
+from campaign import NO_ANSWER, RESOLVED, CampaignRunner, StubDispatcher
+from case_store import PENDING_STATUS, SQLiteCaseRepository
+
+NUM_CASES = 30
+
+
+def _seed_store(path) -> SQLiteCaseRepository:
+    store = SQLiteCaseRepository(str(path))
+    store.seed({
+        f"customer{i}": {
+            "case_id": f"FRD-{i:04d}",
+            "customer_name": f"Customer {i}",
+            "transaction_amount": str(10 * (i + 1)),
+            "status": PENDING_STATUS,
+        }
+        for i in range(NUM_CASES)
+    })
+    return store
+
+
+class _CountingDispatcher(StubDispatcher):
+    """Stub that records the peak number of simultaneous calls."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.live = 0
+        self.peak = 0
+
+    async def dispatch(self, case: dict) -> str:
+        self.live += 1
+        self.peak = max(self.peak, self.live)
+        try:
+            return await super().dispatch(case)
+        finally:
+            self.live -= 1
+
+
+def test_campaign_resolves_every_case_within_concurrency(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    dispatcher = _CountingDispatcher(store, answer_rate=0.6, call_seconds=0.01, seed=7)
+    runner = CampaignRunner(
+        store,
+        dispatcher,
+        concurrency=5,
+        calls_per_minute=60_000,
+        max_attempts=20,
+        backoff_seconds=0.001,
+        max_backoff_seconds=0.01,
+    )
+
+    stats = asyncio.run(runner.run())
+
+    assert store.load_pending() == []
+    assert stats[RESOLVED] == NUM_CASES
+    assert stats["dispatched"] == NUM_CASES + stats["retries"]
+    assert stats["retries"] == stats[NO_ANSWER]
+    assert 1 < dispatcher.peak <= 5
+    assert stats["resolved_per_minute"] > 0
+    # Highest transaction amount has the highest risk score, so it is called first
+    assert dispatcher.calls[0] == f"FRD-{NUM_CASES - 1:04d}"
+
+
+def test_unanswered_cases_are_retried_then_given_up(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    dispatcher = StubDispatcher(store, answer_rate=0.0, call_seconds=0.0)
+    runner = CampaignRunner(store, dispatcher, concurrency=3, calls_per_minute=60_000, max_attempts=3, backoff_seconds=0.001)
+
+    stats = asyncio.run(runner.run(limit=10))
+
+    assert stats["dispatched"] == 30
+    assert stats["retries"] == 20
+    assert stats["gave_up"] == 10
+    assert len(store.load_pending()) == NUM_CASES
+
+
+def test_rate_limit_spaces_out_calls(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    dispatcher = StubDispatcher(store, answer_rate=1.0, call_seconds=0.0)
+    # 600 calls per minute = one every 0.1 s after an initial burst of `concurrency`
+    runner = CampaignRunner(store, dispatcher, concurrency=2, calls_per_minute=600)
+
+    stats = asyncio.run(runner.run(limit=6))
+
+    assert stats[RESOLVED] == 6
+    assert stats["elapsed_s"] >= 0.35
+    assert stats["max_queue_wait_ms"] >= 300
+
+
+def test_cases_resolved_elsewhere_are_not_called(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    dispatcher = StubDispatcher(store, answer_rate=1.0, call_seconds=0.0)
+    inbound = _seed_store(tmp_path / "cases.db")
+
+    class _InboundDuringCall(StubDispatcher):
+        async def dispatch(self, case: dict) -> str:
+            # The next case in risk order is resolved by an inbound call while this one is live
+            if case["case_id"] == f"FRD-{NUM_CASES - 1:04d}":
+                other = inbound.get(f"FRD-{NUM_CASES - 2:04d}")
+                inbound.update_status(other["case_id"], "confirmed_safe", "Resolved inbound.", other["version"])
+            return await dispatcher.dispatch(case)
+
+    runner = CampaignRunner(store, _InboundDuringCall(store), concurrency=1, calls_per_minute=60_000)
+
+    stats = asyncio.run(runner.run())
+
+    assert f"FRD-{NUM_CASES - 2:04d}" not in dispatcher.calls
+    assert stats["dropped_already_resolved"] == 1
+    assert stats[RESOLVED] == NUM_CASES - 1
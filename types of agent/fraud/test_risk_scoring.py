@@ -0,0 +1,29 @@
+from risk_scoring import RiskFeatures, _country, parse_amount
+
+
+def test_region_and_country_spellings_resolve_to_one_country():
+    assert _country("jaipur,Rajsthan") == "india"
+    assert _country("India") == "india"
+    assert _country("Dubai, UAE") == _country("United Arab Emirates")
+    assert _country("Toronto, Canada") == "canada"
+    assert _country("Springfield, Atlantis") == "atlantis"
+    assert _country("") == ""
+
+
+def test_domestic_region_is_not_away_from_home():
+    cases = [
+        {"case_id": "A", "location": "jaipur,Rajsthan", "home_region": "India"},
+        {"case_id": "B", "location": "Toronto, Canada", "home_region": "Japan"},
+        {"case_id": "C", "location": "Mumbai, India", "home_region": ""},
+    ]
+    assert RiskFeatures(cases).away_from_home.tolist() == [0.0, 1.0, 0.0]
+
+
+def test_amounts_with_currency_symbols_and_separators():
+    assert parse_amount("$1,200") == 1200.0
+    assert parse_amount("INR 2,500.50") == 2500.5
+    assert parse_amount("Rs. 500") == 500.0
+    assert parse_amount("Rs 500") == 500.0
+    assert parse_amount("60.00") == 60.0
+    assert parse_amount(None) == 0.0
+    assert parse_amount("unknown") == 0.0
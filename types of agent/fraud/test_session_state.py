@@ -0,0 +1,111 @@
+import asyncio
+import random
+
+from case_store import PENDING_STATUS, SQLiteCaseRepository
+from session_state import CaseLockRegistry, VerificationState, resolve_case
+
+NUM_CASES = 20
+CALLS_PER_CASE = 25
+
+
+def _seed_store(path) -> SQLiteCaseRepository:
+    store = SQLiteCaseRepository(str(path))
+    store.seed({
+        f"customer{i}": {
+            "case_id": f"FRD-{i:04d}",
+            "customer_name": f"Customer {i}",
+            "security_answer": "5432",
+            "status": PENDING_STATUS,
+        }
+        for i in range(NUM_CASES)
+    })
+    return store
+
+
+async def _simulated_call(store, locks, case_id: str, decision: str) -> str:
+    state = VerificationState()
+    state.load_case(store.get(case_id))
+    # Let other calls for the same case load it before anyone resolves it
+    await asyncio.sleep(random.random() / 100)
+    state.verified = True
+    ok, reason, _ = await resolve_case(store, locks, state, decision, f"resolved by {id(state)}")
+    return reason
+
+
+def test_concurrent_calls_resolve_each_case_once(tmp_path):
+    db_path = tmp_path / "cases.db"
+    # Two stores and registries stand in for two worker processes sharing the database
+    workers = [(_seed_store(db_path), CaseLockRegistry()), (SQLiteCaseRepository(str(db_path)), CaseLockRegistry())]
+
+    async def run():
+        calls = []
+        for i in range(NUM_CASES):
+            for n in range(CALLS_PER_CASE):
+                store, locks = workers[n % 2]
+                decision = "confirmed_safe" if n % 3 else "confirmed_fraud"
+                calls.append(_simulated_call(store, locks, f"FRD-{i:04d}", decision))
+        random.shuffle(calls)
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(run())
+
+    assert results.count("resolved") == NUM_CASES
+    assert results.count("already_resolved") == NUM_CASES * (CALLS_PER_CASE - 1)
+    store = workers[0][0]
+    for i in range(NUM_CASES):
+        case = store.get(f"FRD-{i:04d}")
+        assert case["status"] != PENDING_STATUS
+        assert case["version"] == 2
+    # Locks are evicted once nobody holds or waits for them
+    assert all(len(locks) == 0 for _, locks in workers)
+    assert store.load_pending() == []
+
+
+def test_unverified_call_cannot_resolve(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    state = VerificationState()
+    state.load_case(store.get("FRD-0000"))
+
+    ok, reason, _ = asyncio.run(resolve_case(store, CaseLockRegistry(), state, "confirmed_fraud", "note"))
+
+    assert not ok and reason == "not_verified"
+    assert store.get("FRD-0000")["status"] == PENDING_STATUS
+
+
+def test_verification_state_is_slotted():
+    state = VerificationState()
+    try:
+        state.user_key = "ravi"
+    except AttributeError:
+        return
+    raise AssertionError("VerificationState should not accept arbitrary attributes")
+
+
+def test_failed_verification_survives_reloading_the_case(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    state = VerificationState()
+    assert state.start_lookup(max_lookups=2)
+    state.load_case(store.get("FRD-0000"))
+    state.answer_attempts = 1
+    state.verification_failed = True
+
+    assert not state.start_lookup(max_lookups=2)
+    try:
+        state.load_case(store.get("FRD-0000"))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("load_case should refuse a call that failed verification")
+    assert state.answer_attempts == 1 and state.verification_failed
+
+
+def test_lookups_are_capped_per_call(tmp_path):
+    store = _seed_store(tmp_path / "cases.db")
+    state = VerificationState()
+    for _ in range(2):
+        assert state.start_lookup(max_lookups=2)
+        state.load_case(store.get("FRD-0000"))
+    state.answer_attempts = 1
+
+    assert not state.start_lookup(max_lookups=2)
+    assert state.lookup_attempts == 2 and state.answer_attempts == 1
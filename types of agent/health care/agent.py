@@ -1,5 +1,7 @@
+import asyncio
 import logging
 import json
+import time
 from datetime import datetime
 import os 
 
@@ -21,37 +23,66 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from wellness_log import UserWellness, WellnessStore
+from wellness_trends import describe_trends
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
-# NEW: Define the JSON log file path
-WELLNESS_LOG_FILE = "wellness_log.json"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# One append-only JSON Lines log and manifest per user under wellness_data/users/
+WELLNESS_DATA_DIR = os.path.join(SCRIPT_DIR, "wellness_data")
+# Logs from before per-user partitions are moved once into this user's partition
+SHARED_WELLNESS_LOG_FILES = (
+    os.path.join(SCRIPT_DIR, "wellness_log.json"),
+    os.path.join(SCRIPT_DIR, "wellness_log.jsonl"),
+)
+LEGACY_WELLNESS_USER_ID = os.getenv("WELLNESS_LEGACY_USER_ID", "legacy")
+# Load the latest check-in while the session starts and put it in the initial context ("0" falls back to
+# the LLM calling get_past_checkin_summary on its first turn; useful to compare time to first audio)
+PRELOAD_WELLNESS_HISTORY = os.getenv("WELLNESS_PRELOAD_HISTORY", "1") != "0"
+
+
+def describe_latest_checkin(latest: dict) -> str:
+    date_str = latest['date'].split(' ')[0]
+    summary = latest.get('mood_summary', 'no mood recorded')
+    obj_count = len(latest.get('objectives', []))
+    return f"Your last check-in was on {date_str}. You reported: '{summary}'. You had {obj_count} objectives set."
 
 
 class Assistant(Agent):
-    def __init__(self) -> None:
+    def __init__(self, user_history: "asyncio.Future[UserWellness]", preload_history: bool = True) -> None:
+        if preload_history:
+            history_instruction = "Your context already contains a summary of the user's previous check-in; use it to personalize your greeting instead of calling a tool."
+        else:
+            history_instruction = "Before starting the conversation, use the `get_past_checkin_summary` tool to retrieve any historical context."
         super().__init__(
-            instructions="""You are Luna, a supportive, realistic, and grounded Health & Wellness Voice Companion.
+            instructions=f"""You are Luna, a supportive, realistic, and grounded Health & Wellness Voice Companion.
             Your role is to conduct a short daily check-in with the user about their mood, energy, and daily objectives.
             You must avoid diagnosis or medical claims.
             Your responses are concise, to the point, and without any complex formatting or punctuation including emojis, asterisks, or other symbols.
             
-            Before starting the conversation, use the `get_past_checkin_summary` tool to retrieve any historical context.
+            {history_instruction}
+            If the user asks how they have been doing over time (streaks, weekly progress, recurring moods), use the `get_wellness_trends` tool.
             When the check-in is complete (mood, energy, and 1-3 objectives are gathered), you MUST use the `save_checkin_data` tool to persist the session details, and then recap the session and confirm with the user before concluding.
             """,
         )
+        # Only this user's partition is read or written during the session; it is
+        # opened in a worker thread while the session starts
+        self._user_history = user_history
+        self.preload_history = preload_history
 
-    def _read_wellness_log(self):
-        """Helper function to read all previous check-ins."""
-        if not os.path.exists(WELLNESS_LOG_FILE):
-            return []
-        try:
-            with open(WELLNESS_LOG_FILE, 'r') as f:
-                return json.load(f)
-        except (IOError, json.JSONDecodeError):
-            logger.warning(f"Could not read or parse {WELLNESS_LOG_FILE}. Starting fresh.")
-            return []
+    async def on_enter(self):
+        if self.preload_history:
+            user_wellness = await self._user_history
+            latest = user_wellness.latest()
+            context = describe_latest_checkin(latest) if latest else "This is the user's first check-in."
+            chat_ctx = self.chat_ctx.copy()
+            chat_ctx.add_message(role="system", content=f"Previous check-in context: {context}")
+            await self.update_chat_ctx(chat_ctx)
+        # With the history already in context the greeting takes a single LLM pass
+        self.session.generate_reply(instructions="Greet the user and start today's check-in.")
 
     @function_tool
     async def save_checkin_data(self, context: RunContext, mood_summary: str, objectives: list[str]):
@@ -63,17 +94,15 @@ class Assistant(Agent):
             objectives: A list of 1 to 3 simple, practical goals or intentions for the day.
         """
 
-        log_data = self._read_wellness_log()
         new_entry = {
             "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             "mood_summary": mood_summary,
             "objectives": objectives,
             "agent_summary_sentence": f"Check-in logged successfully on {datetime.now().strftime('%Y-%m-%d')}."
         }
-        log_data.append(new_entry)
-
-        with open(WELLNESS_LOG_FILE, 'w') as f:
-            json.dump(log_data, f, indent=4)
+        # One appended line; earlier check-ins are never read or rewritten
+        user_wellness = await self._user_history
+        user_wellness.append(new_entry)
 
         logger.info(f"Saved wellness check-in: {new_entry}")
         
@@ -86,21 +115,43 @@ class Assistant(Agent):
         """Use this tool to retrieve a summary of the most recent check-in to provide historical context to the user.
         This should be called at the very start of a new session to personalize the greeting.
         """
-        log_data = self._read_wellness_log()
-        if log_data:
-            latest = log_data[-1]
-            date_str = latest['date'].split(' ')[0]
-            summary = latest.get('mood_summary', 'no mood recorded')
-            obj_count = len(latest.get('objectives', []))
-            
+        # Reads only the tail of this user's log
+        user_wellness = await self._user_history
+        latest = user_wellness.latest()
+        if latest:
             # The LLM uses this information to generate its first response
-            return f"Your last check-in was on {date_str}. You reported: '{summary}'. You had {obj_count} objectives set. Use this to ask a relevant opening question."
+            return f"{describe_latest_checkin(latest)} Use this to ask a relevant opening question."
         
         return "No past wellness check-in data found."
 
+    @function_tool
+    async def get_wellness_trends(self, context: RunContext):
+        """Use this tool to retrieve the user's check-in streak, objectives set over the last 7 and 30 days, and their most frequent moods.
+        Call it when the user asks about their progress or patterns over time.
+        """
+        # Precomputed on every save, so this never reads the check-in log
+        user_wellness = await self._user_history
+        return describe_trends(user_wellness.aggregates.summary())
+
 
 def prewarm(proc: JobProcess):
     proc.userdata["vad"] = silero.VAD.load()
+    wellness_store = WellnessStore(WELLNESS_DATA_DIR)
+    for path in SHARED_WELLNESS_LOG_FILES:
+        wellness_store.import_shared_log(path, LEGACY_WELLNESS_USER_ID)
+    proc.userdata["wellness_store"] = wellness_store
+
+
+def resolve_user_id(room_metadata: str, participant_identity: str) -> str:
+    """Prefers a `user_id` set in the room metadata by the token server, else the participant identity."""
+    if room_metadata:
+        try:
+            user_id = json.loads(room_metadata).get("user_id")
+            if user_id:
+                return str(user_id)
+        except (json.JSONDecodeError, AttributeError):
+            logger.warning("Room metadata is not a JSON object; using the participant identity.")
+    return participant_identity
 
 
 async def entrypoint(ctx: JobContext):
@@ -170,19 +221,43 @@ async def entrypoint(ctx: JobContext):
     # # Start the avatar and wait for it to join
     # await avatar.start(session, room=ctx.room)
 
+    # Join the room and wait for the user so the session is bound to their wellness partition
+    await ctx.connect()
+    participant = await ctx.wait_for_participant()
+    user_id = resolve_user_id(ctx.room.metadata, participant.identity)
+    ctx.log_context_fields["user_id"] = user_id
+
+    # Time to first audio: from the user joining until the agent first starts speaking
+    joined_at = time.perf_counter()
+    first_audio_logged = False
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev):
+        nonlocal first_audio_logged
+        if ev.new_state == "speaking" and not first_audio_logged:
+            first_audio_logged = True
+            logger.info(
+                f"Time to first audio: {(time.perf_counter() - joined_at) * 1000:.0f} ms "
+                f"(history preloaded: {PRELOAD_WELLNESS_HISTORY})"
+            )
+
+    # Open the user's partition (manifest, aggregates, log tail) concurrently with session.start
+    user_history = asyncio.ensure_future(
+        asyncio.to_thread(ctx.proc.userdata["wellness_store"].for_user, user_id)
+    )
+
     # Start the session, which initializes the voice pipeline and warms up the models
     await session.start(
-        agent=Assistant(),
+        agent=Assistant(user_history=user_history, preload_history=PRELOAD_WELLNESS_HISTORY),
         room=ctx.room,
         room_input_options=RoomInputOptions(
+            # Listen only to the participant whose partition this session writes
+            participant_identity=participant.identity,
             # For telephony applications, use `BVCTelephony` for best results
             noise_cancellation=noise_cancellation.BVC(),
         ),
     )
 
-    # Join the room and connect to the user
-    await ctx.connect()
-
 
 if __name__ == "__main__":
 
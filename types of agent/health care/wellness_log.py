@@ -0,0 +1,256 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator, Optional
+
+from wellness_trends import WellnessAggregates
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, so run a single worker process there
+    fcntl = None
+
+logger = logging.getLogger("agent")
+
+# Bytes read per step when scanning backwards for the last line
+TAIL_BLOCK_SIZE = 4096
+
+
+@contextmanager
+def _exclusive_lock(path: str):
+    """flock on `path`, shared by every worker process prewarming against the same data directory."""
+    with open(path, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class WellnessLog:
+    """Append-only JSON Lines store for wellness check-ins.
+
+    Saving a check-in appends one line, and `latest()` reads backwards from the
+    end of the file until it finds the last complete line, so both stay
+    constant time however long the history grows.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._terminate_torn_line()
+
+    def _terminate_torn_line(self) -> None:
+        # A write cut off mid-line would otherwise swallow the next appended entry
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def append(self, entry: dict) -> None:
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def latest(self) -> Optional[dict]:
+        """Returns the last entry; a torn or corrupt final line falls back to the one before it."""
+        for line in self._reverse_lines():
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping corrupt line at the end of {self.path}")
+        return None
+
+    def _reverse_lines(self) -> Iterator[bytes]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            remainder = b""
+            while position > 0:
+                step = min(TAIL_BLOCK_SIZE, position)
+                position -= step
+                f.seek(position)
+                block = f.read(step) + remainder
+                lines = block.split(b"\n")
+                # The first piece may be the tail of a line that starts in an earlier block
+                remainder = lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        yield line
+            if remainder.strip():
+                yield remainder
+
+    def __iter__(self) -> Iterator[dict]:
+        """Streams every entry from oldest to newest."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping corrupt line in {self.path}")
+
+    def import_legacy_array(self, path: str) -> int:
+        """One-time import of the old single-array `wellness_log.json`."""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        try:
+            with open(path, "r") as f:
+                legacy = json.load(f)
+        except (IOError, json.JSONDecodeError):
+            logger.warning(f"Could not parse legacy wellness log {path}; skipping import.")
+            return 0
+        if not isinstance(legacy, list):
+            return 0
+
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in legacy)
+        os.replace(path, path + ".migrated")
+        logger.info(f"Imported {len(legacy)} check-ins from {path} into {self.path}.")
+        return len(legacy)
+
+
+class UserWellness:
+    """One user's partition: their check-in log, a small manifest and trend aggregates.
+
+    The manifest holds the user id and check-in counters so callers can answer
+    "has this user checked in before, and when" without touching the log.
+    Aggregates (streaks, rolling objective counts, mood frequencies) are
+    updated with every appended check-in.
+    """
+
+    def __init__(self, user_id: str, directory: str):
+        self.user_id = user_id
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.log = WellnessLog(os.path.join(directory, "checkins.jsonl"))
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = self._load_manifest()
+        self.aggregates_path = os.path.join(directory, "aggregates.json")
+        self.aggregates = WellnessAggregates.load(self.aggregates_path)
+        if self.aggregates is None or self.aggregates.total_checkins != self.manifest["checkin_count"]:
+            self.rebuild_aggregates()
+
+    def _load_manifest(self) -> dict:
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r") as f:
+                    return json.load(f)
+            except (IOError, json.JSONDecodeError):
+                logger.warning(f"Could not read {self.manifest_path}; rebuilding it from the log.")
+                return self.rebuild_manifest()
+        return {
+            "user_id": self.user_id,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "checkin_count": 0,
+            "first_checkin_at": None,
+            "last_checkin_at": None,
+        }
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    def rebuild_manifest(self) -> dict:
+        """Recomputes the counters with one pass over this user's log."""
+        count, first, last = 0, None, None
+        for entry in self.log:
+            count += 1
+            first = first or entry.get("date")
+            last = entry.get("date")
+        self.manifest = {
+            "user_id": self.user_id,
+            "created_at": first or datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "checkin_count": count,
+            "first_checkin_at": first,
+            "last_checkin_at": last,
+        }
+        self._write_manifest()
+        return self.manifest
+
+    def rebuild_aggregates(self) -> WellnessAggregates:
+        """Recomputes the trend aggregates with one streaming pass over this user's log."""
+        self.aggregates = WellnessAggregates.from_entries(self.log)
+        self.aggregates.save(self.aggregates_path)
+        return self.aggregates
+
+    def append(self, entry: dict) -> None:
+        self.log.append(entry)
+        self.manifest["checkin_count"] += 1
+        self.manifest["first_checkin_at"] = self.manifest["first_checkin_at"] or entry.get("date")
+        self.manifest["last_checkin_at"] = entry.get("date")
+        self._write_manifest()
+        self.aggregates.add(entry)
+        self.aggregates.save(self.aggregates_path)
+
+    def latest(self) -> Optional[dict]:
+        if not self.manifest["checkin_count"]:
+            return None
+        return self.log.latest()
+
+
+class WellnessStore:
+    """Wellness history partitioned per user under `root_dir/users/`.
+
+    A user's directory is derived from a hash of their id (two-level fan-out,
+    e.g. `users/3f/3fa2...`), so opening a partition is a path computation and
+    never depends on how many other users exist.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        os.makedirs(os.path.join(root_dir, "users"), exist_ok=True)
+
+    def user_dir(self, user_id: str) -> str:
+        digest = hashlib.sha256(user_id.encode()).hexdigest()[:32]
+        return os.path.join(self.root_dir, "users", digest[:2], digest)
+
+    def for_user(self, user_id: str) -> UserWellness:
+        return UserWellness(user_id, self.user_dir(user_id))
+
+    def import_shared_log(self, path: str, user_id: str) -> int:
+        """One-time move of a pre-partitioning log (array or JSON Lines) into one user's partition.
+
+        Every worker process calls this from prewarm, so the move runs under an
+        exclusive lock and a log another process already moved counts as migrated.
+        """
+        with _exclusive_lock(os.path.join(self.root_dir, "migration.lock")):
+            try:
+                return self._import_shared_log(path, user_id)
+            except FileNotFoundError:
+                return 0
+
+    def _import_shared_log(self, path: str, user_id: str) -> int:
+        if not os.path.exists(path):
+            return 0
+        user = self.for_user(user_id)
+        if path.endswith(".jsonl"):
+            entries = list(WellnessLog(path))
+            for entry in entries:
+                user.log.append(entry)
+            os.replace(path, path + ".migrated")
+            count = len(entries)
+        else:
+            count = user.log.import_legacy_array(path)
+        if count:
+            user.rebuild_manifest()
+            user.rebuild_aggregates()
+            logger.info(f"Moved {count} shared check-ins from {path} into the partition for '{user_id}'.")
+        return count
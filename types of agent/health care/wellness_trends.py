@@ -0,0 +1,197 @@
+import json
+import os
+import re
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+# Days of per-day counters kept for the rolling windows
+WINDOW_DAYS = 30
+
+# Words in a mood summary mapped to the mood they are counted as
+MOOD_KEYWORDS = {
+    "stressed": "stressed", "stress": "stressed", "stressful": "stressed", "overwhelmed": "stressed",
+    "anxious": "anxious", "anxiety": "anxious", "worried": "anxious", "nervous": "anxious",
+    "tired": "tired", "exhausted": "tired", "sleepy": "tired", "drained": "tired", "fatigued": "tired",
+    "calm": "calm", "relaxed": "calm", "peaceful": "calm",
+    "happy": "happy", "good": "happy", "great": "happy", "cheerful": "happy", "excited": "happy",
+    "sad": "sad", "down": "sad", "upset": "sad", "lonely": "sad",
+    "motivated": "motivated", "focused": "motivated", "productive": "motivated",
+    "energetic": "energetic", "energized": "energetic",
+    "frustrated": "frustrated", "angry": "frustrated", "irritated": "frustrated",
+}
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def mood_keywords(mood_summary: str) -> List[str]:
+    """Distinct moods mentioned in a summary, e.g. "very stressed but calm" -> ["stressed", "calm"]."""
+    seen: Dict[str, None] = {}
+    for word in _WORD_RE.findall((mood_summary or "").lower()):
+        mood = MOOD_KEYWORDS.get(word)
+        if mood:
+            seen.setdefault(mood)
+    return list(seen)
+
+
+def _entry_day(entry: dict) -> Optional[date]:
+    try:
+        return datetime.strptime(entry["date"][:10], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class WellnessAggregates:
+    """Rolling check-in aggregates, updated once per saved check-in.
+
+    Keeps the check-in streak, all-time totals and per-day counters for the
+    last WINDOW_DAYS days. Every query reads at most WINDOW_DAYS small
+    counters, so trend summaries cost the same after one week or ten years
+    of check-ins. `from_entries()` recomputes everything in one pass over the log.
+    """
+
+    def __init__(self) -> None:
+        self.total_checkins = 0
+        self.total_objectives = 0
+        self.current_streak = 0
+        self.longest_streak = 0
+        self.last_checkin_day: Optional[str] = None
+        self.mood_totals: Counter = Counter()
+        # "YYYY-MM-DD" -> {"checkins": n, "objectives": n, "moods": {mood: n}}
+        self.days: Dict[str, dict] = {}
+
+    # --- updates ---
+
+    def add(self, entry: dict) -> None:
+        objectives = len(entry.get("objectives") or [])
+        moods = mood_keywords(entry.get("mood_summary", ""))
+        self.total_checkins += 1
+        self.total_objectives += objectives
+        self.mood_totals.update(moods)
+
+        day = _entry_day(entry)
+        if day is None:
+            return
+        self._advance_streak(day)
+
+        key = day.isoformat()
+        bucket = self.days.setdefault(key, {"checkins": 0, "objectives": 0, "moods": {}})
+        bucket["checkins"] += 1
+        bucket["objectives"] += objectives
+        for mood in moods:
+            bucket["moods"][mood] = bucket["moods"].get(mood, 0) + 1
+        self._prune(day)
+
+    def _advance_streak(self, day: date) -> None:
+        last = date.fromisoformat(self.last_checkin_day) if self.last_checkin_day else None
+        if last is not None and day <= last:
+            # Same day, or a back-dated entry: the streak only moves forward
+            return
+        if last is not None and day - last == timedelta(days=1):
+            self.current_streak += 1
+        else:
+            self.current_streak = 1
+        self.longest_streak = max(self.longest_streak, self.current_streak)
+        self.last_checkin_day = day.isoformat()
+
+    def _prune(self, newest: date) -> None:
+        cutoff = (newest - timedelta(days=WINDOW_DAYS - 1)).isoformat()
+        for key in [k for k in self.days if k < cutoff]:
+            del self.days[key]
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[dict]) -> "WellnessAggregates":
+        """Rebuilds the aggregates in one streaming pass over a log."""
+        aggregates = cls()
+        for entry in entries:
+            aggregates.add(entry)
+        return aggregates
+
+    # --- queries ---
+
+    def _window(self, today: date, days: int) -> dict:
+        cutoff = (today - timedelta(days=days - 1)).isoformat()
+        checkins = objectives = 0
+        moods: Counter = Counter()
+        for key, bucket in self.days.items():
+            if key >= cutoff:
+                checkins += bucket["checkins"]
+                objectives += bucket["objectives"]
+                moods.update(bucket["moods"])
+        return {"checkins": checkins, "objectives": objectives, "moods": dict(moods.most_common())}
+
+    def active_streak(self, today: date) -> int:
+        """The streak still counts if the last check-in was today or yesterday."""
+        if not self.last_checkin_day:
+            return 0
+        gap = today - date.fromisoformat(self.last_checkin_day)
+        return self.current_streak if gap <= timedelta(days=1) else 0
+
+    def summary(self, today: Optional[date] = None) -> dict:
+        today = today or date.today()
+        return {
+            "current_streak_days": self.active_streak(today),
+            "longest_streak_days": self.longest_streak,
+            "last_checkin_day": self.last_checkin_day,
+            "total_checkins": self.total_checkins,
+            "last_7_days": self._window(today, 7),
+            "last_30_days": self._window(today, 30),
+            "top_moods_all_time": dict(self.mood_totals.most_common(5)),
+        }
+
+    # --- persistence ---
+
+    def to_dict(self) -> dict:
+        return {
+            "total_checkins": self.total_checkins,
+            "total_objectives": self.total_objectives,
+            "current_streak": self.current_streak,
+            "longest_streak": self.longest_streak,
+            "last_checkin_day": self.last_checkin_day,
+            "mood_totals": dict(self.mood_totals),
+            "days": self.days,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WellnessAggregates":
+        aggregates = cls()
+        aggregates.total_checkins = data["total_checkins"]
+        aggregates.total_objectives = data["total_objectives"]
+        aggregates.current_streak = data["current_streak"]
+        aggregates.longest_streak = data["longest_streak"]
+        aggregates.last_checkin_day = data["last_checkin_day"]
+        aggregates.mood_totals = Counter(data["mood_totals"])
+        aggregates.days = data["days"]
+        return aggregates
+
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["WellnessAggregates"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return cls.from_dict(json.load(f))
+        except (IOError, json.JSONDecodeError, KeyError):
+            return None
+
+
+def describe_trends(summary: dict) -> str:
+    """Turns `WellnessAggregates.summary()` into a sentence for the LLM to paraphrase."""
+    if not summary["total_checkins"]:
+        return "No past wellness check-in data found."
+    week, month = summary["last_7_days"], summary["last_30_days"]
+    parts = [
+        f"Current check-in streak: {summary['current_streak_days']} days (longest {summary['longest_streak_days']}).",
+        f"Last 7 days: {week['checkins']} check-ins with {week['objectives']} objectives set.",
+        f"Last 30 days: {month['checkins']} check-ins with {month['objectives']} objectives set.",
+    ]
+    if month["moods"]:
+        top = ", ".join(f"{mood} ({count})" for mood, count in list(month["moods"].items())[:3])
+        parts.append(f"Most mentioned moods in the last 30 days: {top}.")
+    return " ".join(parts)
@@ -1,4 +1,5 @@
 
+import asyncio
 import json
 import logging
 import os
@@ -25,10 +26,19 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from tutor_content import TutorConcept, TutorContentLibrary
+
 logger = logging.getLogger("agent")
 
 load_dotenv(".env.local")
 
+# Directory of concept JSON files with a manifest.json; the built-in concepts are used when unset
+TUTOR_CONTENT_DIR = os.getenv("TUTOR_CONTENT_DIR")
+# Concept bodies cached per worker process
+TUTOR_CONTENT_CACHE_SIZE = int(os.getenv("TUTOR_CONTENT_CACHE_SIZE", "256"))
+# Concept ids listed in the instructions and by `list_concepts`; a curriculum can hold far more
+MAX_CONCEPTS_LISTED = 20
+
 LEARNING_MODES = ("learn", "quiz", "teach_back")
 
 VOICE_PERSONAS = {
@@ -57,6 +67,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "variables",
         "title": "Variables",
+        "aliases": ["variable", "vars", "storing values"],
         "summary": "Variables store values so you can reuse them later, much like a labeled box you put information into. For example, if you store the number 10 in a variable named 'age', you can refer to that value simply by saying 'age'. This is essential for writing code that can adapt and remember information.",
         "sample_question": "What is a variable and why is it useful? Focus on the reusability aspect.",
         "teach_back_prompt": "Explain what a variable is and why it's useful in your own words."
@@ -64,6 +75,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "loops",
         "title": "Loops",
+        "aliases": ["for loop", "while loop", "looping", "iteration"],
         "summary": "Loops let you repeat an action multiple times without having to write the same code over and over. Think of it like setting an alarm to go off every morning at 7 a.m.—the loop keeps repeating the action. The two main types are 'for' loops, which run a set number of times, and 'while' loops, which run as long as a certain condition is true.",
         "sample_question": "What is the difference between a for loop and a while loop?",
         "teach_back_prompt": "Explain the difference between a for loop and a while loop in detail."
@@ -71,6 +83,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "function",
         "title": "Functions",
+        "aliases": ["functions", "methods", "def", "reusable code"],
         "summary": "Functions are blocks of organized, reusable code that perform a single, related action. They allow you to modularize your code, making it easier to read, test, and debug. When you need to perform an action multiple times, you simply call the function instead of writing the code repeatedly.",
         "sample_question": "Explain how functions help with code organization and reusability.",
         "teach_back_prompt": "Teach me back the concept of a function and its main benefits."
@@ -78,6 +91,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "if_else",
         "title": "If-Else Statements",
+        "aliases": ["if statement", "if else", "conditionals", "conditional", "branching"],
         "summary": "If-Else statements are the fundamental way to control the flow of a program. They allow your code to make decisions based on whether a condition is true or false. If the condition is true, the code in the 'if' block runs; otherwise, the code in the 'else' block runs.",
         "sample_question": "Describe a real-world scenario where an If-Else statement would be necessary in a program.",
         "teach_back_prompt": "Explain how if-else statements control program flow and give an example."
@@ -85,6 +99,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "data_types",
         "title": "Data Types",
+        "aliases": ["types", "integers", "strings", "booleans", "integer string boolean"],
         "summary": "Data types define the kind of value a variable can hold, such as numbers, text, or boolean (true/false) values. Common types include integers, floats, strings, and booleans. Using the correct data type is crucial for performing accurate operations and managing memory efficiently.",
         "sample_question": "What is a Data Type and what's the difference between an integer and a string?",
         "teach_back_prompt": "Teach me the difference between an integer, a string, and a boolean."
@@ -92,6 +107,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "operators",
         "title": "Operators",
+        "aliases": ["arithmetic operators", "comparison operators", "logical operators"],
         "summary": "Operators are special symbols that perform operations on variables and values. They are categorized into arithmetic (like +, -), comparison (like ==, >), and logical (like AND, OR) operators. They are the tools you use to manipulate data and create conditions in your code.",
         "sample_question": "Explain the difference between the assignment operator (=) and the comparison operator (==).",
         "teach_back_prompt": "Explain the three main categories of operators and give an example of one."
@@ -99,6 +115,7 @@ TUTOR_CONCEPTS_DATA = [
     {
         "id": "oop",
         "title": "OOP (Object-Oriented Programming)",
+        "aliases": ["object oriented", "classes", "objects", "classes and objects"],
         "summary": "Object-Oriented Programming is a paradigm based on the concept of 'objects,' which can contain data and code. The main principles are encapsulation, inheritance, and polymorphism. It helps manage complexity by modeling real-world entities and their interactions in code.",
         "sample_question": "Summarize the core principles of Object-Oriented Programming (OOP).",
         "teach_back_prompt": "Explain the core idea behind Object-Oriented Programming."
@@ -106,17 +123,6 @@ TUTOR_CONCEPTS_DATA = [
 ]
 
 
-@dataclass
-class TutorConcept:
-    """Structured representation of one concept."""
-
-    id: str
-    title: str
-    summary: str
-    sample_question: str
-    teach_back_prompt: str
-
-
 @dataclass
 class ConceptMastery:
     """Simple counters that let the tutor track progress."""
@@ -142,49 +148,11 @@ class TutorSessionState:
         return self.mastery[concept_id]
 
 
-class TutorContentLibrary:
-    """Loads and serves concept content from in-memory data."""
-
-    def __init__(self, concepts: List[TutorConcept]):
-        if not concepts:
-            raise ValueError("TutorContentLibrary requires at least one concept.")
-        self._concepts: Dict[str, TutorConcept] = {c.id: c for c in concepts}
-        self._order: List[str] = [c.id for c in concepts]
-
-    @classmethod
-    def from_data(cls, data: List[Dict]) -> "TutorContentLibrary":
-        """Loads content from the hardcoded list of dictionaries."""
-        concepts = [TutorConcept(**item) for item in data]
-        return cls(concepts)
-
-    @classmethod
-    def from_env(cls) -> "TutorContentLibrary":
-        """Loads content from the global TUTOR_CONCEPTS_DATA."""
-        global TUTOR_CONCEPTS_DATA
-        return cls.from_data(TUTOR_CONCEPTS_DATA)
-    
-    def list_concepts(self) -> List[TutorConcept]:
-        return [self._concepts[cid] for cid in self._order]
-
-    def get(self, concept_id: Optional[str]) -> TutorConcept:
-        target_id = concept_id or self._order[0]
-        if target_id not in self._concepts:
-            normalized_id = target_id.lower().replace(' ', '_').replace('-', '_')
-            if normalized_id.endswith('s'):
-                normalized_id = normalized_id[:-1]
-                if normalized_id in self._concepts:
-                     return self._concepts[normalized_id]
-            raise KeyError(f"Unknown concept id: {target_id}")
-        return self._concepts[target_id]
-
-    def next_concept_id(self, current_id: Optional[str]) -> str:
-        if current_id is None:
-            return self._order[0]
-        try:
-            idx = self._order.index(current_id)
-        except ValueError:
-            return self._order[0]
-        return self._order[(idx + 1) % len(self._order)]
+def load_tutor_content() -> TutorContentLibrary:
+    """Loads the concept directory from TUTOR_CONTENT_DIR, or the built-in TUTOR_CONCEPTS_DATA."""
+    if TUTOR_CONTENT_DIR:
+        return TutorContentLibrary.from_directory(TUTOR_CONTENT_DIR, cache_size=TUTOR_CONTENT_CACHE_SIZE)
+    return TutorContentLibrary.from_data(TUTOR_CONCEPTS_DATA)
 
 
 @dataclass
@@ -200,6 +168,9 @@ class TeachTheTutorAgent(Agent):
 
     def __init__(self, *, userdata: Userdata) -> None:
         
+        hidden = len(userdata.content) - MAX_CONCEPTS_LISTED
+        more_concepts = f" (and {hidden} more; pass the learner's topic to `set_focus_concept`)" if hidden > 0 else ""
+
         # --- CRITICAL INSTRUCTION FIX ---
         instructions = f"""You are Oracle, an active recall coach that helps users master core coding concepts.
 Key behaviors:
@@ -211,7 +182,7 @@ Key behaviors:
 - Keep responses concise, use plain conversational language, and explain any jargon.
 - Always mention that Murf Falcon provides the fast voices powering the experience at least once per conversation.
 
-Concepts available for the `set_focus_concept` tool: {', '.join(userdata.content._order)}
+Concepts available for the `set_focus_concept` tool: {', '.join(c.id for c in userdata.content.list_concepts(MAX_CONCEPTS_LISTED))}{more_concepts}
 """
         super().__init__(instructions=instructions)
 
@@ -239,16 +210,33 @@ Concepts available for the `set_focus_concept` tool: {', '.join(userdata.content
     @function_tool
     async def list_concepts(self, ctx: RunContext[Userdata]) -> str:
         """List available concepts with their IDs and titles so the learner can choose."""
-        concepts = ctx.userdata.content.list_concepts()
+        content = ctx.userdata.content
+        concepts = content.list_concepts(MAX_CONCEPTS_LISTED)
         formatted = ", ".join(f"'{c.id}' ({c.title})" for c in concepts)
+        if len(content) > len(concepts):
+            formatted += f", and {len(content) - len(concepts)} more"
         return f"Available concepts: {formatted}. Ask the learner which one they want to focus on."
 
     @function_tool
     async def set_focus_concept(self, ctx: RunContext[Userdata], concept_id: str) -> str:
-        """Set the active concept that the session should focus on."""
-        concept = ctx.userdata.content.get(concept_id) 
+        """Set the active concept that the session should focus on.
+
+        Args:
+            concept_id: The concept id, or the learner's own words for it (e.g. "for loops", "classes").
+        """
+        content = ctx.userdata.content
+        # The first name that is not an exact id builds the resolver, which takes a while for large curricula
+        match = await asyncio.to_thread(content.resolve, concept_id)
+        if match is None:
+            suggestions = content.resolver.suggest(concept_id)
+            hint = f" Ask if they meant: {', '.join(suggestions)}." if suggestions else " Call list_concepts to offer options."
+            raise ToolError(f"No concept matches '{concept_id}'.{hint}")
+        concept = content.get(match.concept_id)
         ctx.userdata.state.current_concept_id = concept.id
         ctx.userdata.state.ensure_mastery(concept.id)
+        if match.confidence < 1.0:
+            logger.info("Resolved spoken concept %r to %s (confidence %.2f).", concept_id, concept.id, match.confidence)
+            return f"Understood '{concept_id}' as {concept.title}. Concept locked: {concept.title}. Mention the topic so the learner can correct you."
         return f"Concept locked: {concept.title}. You're clear to continue working on {concept.title}."
 
     @function_tool
@@ -304,7 +292,7 @@ Concepts available for the `set_focus_concept` tool: {', '.join(userdata.content
 def prewarm(proc: JobProcess):
     """Prewarm models and load tutor content."""
     proc.userdata["vad"] = silero.VAD.load()
-    proc.userdata["tutor_content"] = TutorContentLibrary.from_env()
+    proc.userdata["tutor_content"] = load_tutor_content()
 
 
 async def entrypoint(ctx: JobContext):
@@ -315,7 +303,7 @@ async def entrypoint(ctx: JobContext):
     }
 
     content = ctx.proc.userdata["tutor_content"]
-    state = TutorSessionState(current_concept_id=content.list_concepts()[0].id)
+    state = TutorSessionState(current_concept_id=content.first_id)
     userdata = Userdata(state=state, content=content)
 
     session = AgentSession[Userdata](
@@ -0,0 +1,252 @@
+import math
+import re
+from array import array
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Resolutions below this confidence are reported as unknown, with suggestions
+MIN_CONFIDENCE = 0.5
+# Trigrams shared by more phrases than this are too common to pick candidates with
+MAX_TRIGRAM_POSTINGS = 500
+# Candidates scored exactly per query
+MAX_CANDIDATES = 200
+
+# Words a learner wraps around a concept name: "let's do the concept of loops please"
+STOPWORDS = frozenset(
+    "a an the of on in to for and about with me my i we us let lets let's do does doing go can could would "
+    "please want like learn learning study teach quiz explain tell talk switch focus concept concepts topic "
+    "topics lesson next now some more what is are how basic basics intro introduction".split()
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word: str) -> str:
+    # Plural stripping that maps both forms to one stem: "loops"/"loop", "classes"/"class", "types"/"type",
+    # "boxes"/"box", "libraries"/"library"; words like "class", "status" and "analysis" are left alone
+    if len(word) < 4:
+        return word
+    if word.endswith("ies") and len(word) >= 6:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "xes", "ches", "shes", "zzes")):
+        return word[:-2]
+    if word.endswith(("ss", "us", "is")) or not word.endswith("s"):
+        return word
+    return word[:-1]
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall((text or "").lower().replace("_", " ")) if w not in STOPWORDS]
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class ConceptMatch:
+    """Best concept for a spoken name, with a 0-1 confidence and runner-up ids."""
+
+    concept_id: str
+    confidence: float
+    matched: str
+    alternatives: List[str] = field(default_factory=list)
+
+
+class ConceptResolver:
+    """Maps spoken concept names to concept ids.
+
+    Every id, title (and the parts of a title like "OOP (Object-Oriented
+    Programming)") and alias is indexed as a phrase: by its normalized text
+    for exact hits, by token for word overlap weighted by rarity, and by
+    trigram for misheard spellings. A query is scored only against
+    phrases that share a token or an uncommon trigram with it. Postings are
+    compact integer arrays and per-phrase trigrams are recomputed for those
+    few candidates, so the index stays small next to the manifest.
+    """
+
+    def __init__(self, concepts: Iterable[Tuple[str, str, Iterable[str]]]):
+        # (concept id, normalized phrase)
+        self._phrases: List[Tuple[str, str]] = []
+        self._exact: Dict[str, str] = {}
+        self._by_token: Dict[str, array] = defaultdict(lambda: array("I"))
+        self._by_trigram: Dict[str, array] = defaultdict(lambda: array("I"))
+        self._rank: Dict[str, int] = {}
+        for rank, (concept_id, title, aliases) in enumerate(concepts):
+            self._rank[concept_id] = rank
+            for phrase in {concept_id, title, *re.split(r"[()]", title), *aliases}:
+                self._add(concept_id, phrase)
+        self._idf = {
+            token: math.log(1 + len(self._phrases) / len(postings)) for token, postings in self._by_token.items()
+        }
+        # Words never seen in any phrase weigh as much as the rarest indexed word
+        self._max_idf = math.log(1 + len(self._phrases))
+
+    def _add(self, concept_id: str, phrase: str) -> None:
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        normalized = " ".join(tokens)
+        if normalized in self._exact:
+            return
+        self._exact[normalized] = concept_id
+        pos = len(self._phrases)
+        self._phrases.append((concept_id, normalized))
+        for token in set(tokens):
+            self._by_token[token].append(pos)
+        for gram in trigrams(normalized):
+            self._by_trigram[gram].append(pos)
+
+    def _token_score(self, query: Set[str], tokens: Set[str]) -> float:
+        """IDF-weighted Jaccard overlap of the two token sets."""
+        union = query | tokens
+        shared = sum(self._idf.get(t, 0.0) for t in query & tokens)
+        total = sum(self._idf.get(t, self._max_idf) for t in union)
+        return shared / total if total else 0.0
+
+    def resolve(self, text: str, limit: int = 3) -> Optional[ConceptMatch]:
+        """Returns the best match (with up to `limit - 1` alternatives), or None if nothing is close."""
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        normalized = " ".join(tokens)
+        exact = self._exact.get(normalized)
+        if exact is not None:
+            return ConceptMatch(exact, 1.0, normalized)
+
+        query_tokens = set(tokens)
+        query_grams = trigrams(normalized)
+        candidates: Dict[int, int] = defaultdict(int)
+        for token in query_tokens:
+            for pos in self._by_token.get(token, ()):
+                candidates[pos] += 3
+        for gram in query_grams:
+            postings = self._by_trigram.get(gram, ())
+            if len(postings) <= MAX_TRIGRAM_POSTINGS:
+                for pos in postings:
+                    candidates[pos] += 1
+        if len(candidates) > MAX_CANDIDATES:
+            candidates = dict(sorted(candidates.items(), key=lambda item: item[1], reverse=True)[:MAX_CANDIDATES])
+
+        best: Dict[str, Tuple[float, str]] = {}
+        for pos in candidates:
+            concept_id, phrase = self._phrases[pos]
+            phrase_grams = trigrams(phrase)
+            token_score = self._token_score(query_tokens, set(phrase.split()))
+            gram_score = 2 * len(query_grams & phrase_grams) / (len(query_grams) + len(phrase_grams))
+            score = max(token_score, gram_score)
+            if concept_id not in best or score > best[concept_id][0]:
+                best[concept_id] = (score, phrase)
+        if not best:
+            return None
+        ranked = sorted(best.items(), key=lambda item: (-item[1][0], self._rank[item[0]]))
+        concept_id, (score, phrase) = ranked[0]
+        if score < MIN_CONFIDENCE:
+            return None
+        return ConceptMatch(concept_id, round(score, 3), phrase, [cid for cid, _ in ranked[1:limit]])
+
+    def suggest(self, text: str, limit: int = 3) -> List[str]:
+        """Closest concept ids regardless of confidence, for "did you mean" replies."""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        query_grams = trigrams(" ".join(tokens))
+        scores: Dict[str, float] = {}
+        for gram in query_grams:
+            postings = self._by_trigram.get(gram, ())
+            if len(postings) > MAX_TRIGRAM_POSTINGS:
+                continue
+            for pos in postings:
+                concept_id = self._phrases[pos][0]
+                scores[concept_id] = scores.get(concept_id, 0) + 1
+        return [cid for cid, _ in sorted(scores.items(), key=lambda item: (-item[1], self._rank[item[0]]))[:limit]]
+
+
+# --- Benchmark: `python concept_resolver.py [extra_concepts]` ---
+
+# Spoken or misheard concept names for the built-in concepts, with the intended id
+_SPOKEN_NAMES = [
+    ("variables", "variables"), ("a variable", "variables"), ("varaibles", "variables"), ("vars", "variables"),
+    ("loops", "loops"), ("for loops", "loops"), ("while loop", "loops"), ("looping", "loops"), ("iteration", "loops"),
+    ("functions", "function"), ("function", "function"), ("fuctions", "function"), ("methods", "function"),
+    ("if else", "if_else"), ("if-else statements", "if_else"), ("if statements", "if_else"),
+    ("conditionals", "if_else"), ("ifelse", "if_else"),
+    ("data types", "data_types"), ("data type", "data_types"), ("types of data", "data_types"),
+    ("integers and strings", "data_types"), ("type", "data_types"),
+    ("operators", "operators"), ("operator", "operators"), ("opperators", "operators"),
+    ("arithmetic operators", "operators"),
+    ("oop", "oop"), ("object oriented programming", "oop"), ("object-oriented", "oop"), ("classes and objects", "oop"),
+    ("class", "oop"),
+    ("let's do the concept of loops please", "loops"), ("teach me about OOP", "oop"),
+]
+
+# Mirrors the built-in TUTOR_CONCEPTS_DATA ids, titles and aliases in agent.py
+_BUILT_IN = [
+    ("variables", "Variables", ["variable", "vars", "storing values"]),
+    ("loops", "Loops", ["for loop", "while loop", "looping", "iteration"]),
+    ("function", "Functions", ["functions", "methods", "def", "reusable code"]),
+    ("if_else", "If-Else Statements", ["if statement", "if else", "conditionals", "conditional", "branching"]),
+    ("data_types", "Data Types", ["types", "integers", "strings", "booleans", "integer string boolean"]),
+    ("operators", "Operators", ["arithmetic operators", "comparison operators", "logical operators"]),
+    ("oop", "OOP (Object-Oriented Programming)", ["object oriented", "classes", "objects", "classes and objects"]),
+]
+
+
+def _old_get(concept_id: str, ids: List[str]) -> Optional[str]:
+    """The previous TutorContentLibrary.get normalization."""
+    if concept_id in ids:
+        return concept_id
+    normalized = concept_id.lower().replace(" ", "_").replace("-", "_")
+    if normalized.endswith("s") and normalized[:-1] in ids:
+        return normalized[:-1]
+    return None
+
+
+def _benchmark(extra: int) -> None:
+    import random
+    import time
+    import tracemalloc
+
+    ids = [concept_id for concept_id, _, _ in _BUILT_IN]
+    old_correct = sum(_old_get(text, ids) == expected for text, expected in _SPOKEN_NAMES)
+
+    rng = random.Random(3)
+    words = ["graph", "tree", "hash", "queue", "stack", "heap", "sort", "search", "string", "array", "matrix",
+             "network", "thread", "lock", "cache", "stream", "parser", "compiler", "memory", "pointer", "socket",
+             "regex", "recursion", "closure", "generator", "decorator", "iterator", "module", "package", "test"]
+    synthetic = [(f"topic_{i}", f"{rng.choice(words).title()} {rng.choice(words).title()} {i}", [])
+                 for i in range(extra)]
+
+    for label, concepts in (("built-in", _BUILT_IN), (f"built-in + {extra:,}", _BUILT_IN + synthetic)):
+        started = time.perf_counter()
+        resolver = ConceptResolver(concepts)
+        build_ms = (time.perf_counter() - started) * 1000
+        tracemalloc.start()
+        resolver = ConceptResolver(concepts)
+        index_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+
+        correct = 0
+        for text, expected in _SPOKEN_NAMES:
+            match = resolver.resolve(text)
+            if match and match.concept_id == expected:
+                correct += 1
+            elif label == "built-in":
+                print(f"  miss: {text!r} -> {match}")
+        rounds = 50
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for text, _ in _SPOKEN_NAMES:
+                resolver.resolve(text)
+        per_query_us = (time.perf_counter() - started) / (rounds * len(_SPOKEN_NAMES)) * 1e6
+        print(f"{label} concepts: built in {build_ms:.0f} ms ({index_mb:.1f} MB), accuracy {correct}/{len(_SPOKEN_NAMES)}, "
+              f"{per_query_us:.0f} us per resolution")
+    print(f"Previous get() normalization: {old_correct}/{len(_SPOKEN_NAMES)}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from concept_resolver import ConceptMatch, ConceptResolver
+
+logger = logging.getLogger("agent")
+
+MANIFEST_FILE = "manifest.json"
+# Concept bodies kept in memory per process; the manifest itself is always resident
+DEFAULT_CACHE_SIZE = 256
+
+
+@dataclass
+class TutorConcept:
+    """Structured representation of one concept."""
+
+    id: str
+    title: str
+    summary: str
+    sample_question: str
+    teach_back_prompt: str
+
+
+@dataclass(frozen=True)
+class ConceptEntry:
+    """Manifest row: what the library knows about a concept without loading its body."""
+
+    id: str
+    title: str
+    file: Optional[str] = None
+    # Other names learners use for the concept ("for loop", "classes")
+    aliases: Tuple[str, ...] = ()
+
+
+def _read_concept(path: str) -> TutorConcept:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return TutorConcept(**{k: data[k] for k in ("id", "title", "summary", "sample_question", "teach_back_prompt")})
+
+
+def build_manifest(directory: str) -> List[ConceptEntry]:
+    """Scans every `*.json` concept file once and writes `manifest.json` in curriculum order.
+
+    Files are ordered by their optional "order" field, then by file name.
+    Several worker processes may build at once on first start: each writes
+    its own temporary file, and a manifest another process put in place
+    first is accepted since it was built from the same files.
+    """
+    rows = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json") or name == MANIFEST_FILE:
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        rows.append((data.get("order", float("inf")), name, data["id"], data["title"], tuple(data.get("aliases", ()))))
+    rows.sort(key=lambda row: (row[0], row[1]))
+    entries = [ConceptEntry(concept_id, title, name, aliases) for _, name, concept_id, title, aliases in rows]
+
+    path = os.path.join(directory, MANIFEST_FILE)
+    fd, tmp_path = tempfile.mkstemp(prefix=MANIFEST_FILE + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"concepts": [
+                {"id": e.id, "title": e.title, "file": e.file, **({"aliases": list(e.aliases)} if e.aliases else {})}
+                for e in entries
+            ]}, f)
+        # mkstemp creates the file owner-only; the manifest is read like any other content file
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        # e.g. Windows refuses to replace a manifest another worker has open
+        if not os.path.exists(path):
+            raise
+        logger.info("Concept manifest for %s was built by another process.", directory)
+        return entries
+    logger.info("Built concept manifest for %s with %d concepts.", directory, len(entries))
+    return entries
+
+
+def load_manifest(directory: str) -> List[ConceptEntry]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            rows = json.load(f)["concepts"]
+    except FileNotFoundError:
+        return build_manifest(directory)
+    return [ConceptEntry(row["id"], row["title"], row.get("file"), tuple(row.get("aliases", ()))) for row in rows]
+
+
+class TutorContentLibrary:
+    """Serves concepts from a manifest, loading bodies on demand.
+
+    Only the manifest (id, title, file) and an id -> position map live in
+    memory for every concept; summaries and prompts are read through
+    `load_body` when first needed and kept in a bounded LRU cache. Lookups
+    and `next_concept_id` are O(1) however large the curriculum is. Names
+    that are not exact ids go through a `ConceptResolver` over the
+    manifest's ids, titles and aliases. The resolver is built the first
+    time such a name arrives, so a worker that only sees exact ids never
+    pays for it.
+    """
+
+    def __init__(
+        self,
+        entries: Iterable[ConceptEntry],
+        load_body: Callable[[ConceptEntry], TutorConcept],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self._entries: List[ConceptEntry] = list(entries)
+        if not self._entries:
+            raise ValueError("TutorContentLibrary requires at least one concept.")
+        self._position: Dict[str, int] = {e.id: i for i, e in enumerate(self._entries)}
+        self._resolver: Optional[ConceptResolver] = None
+        self._resolver_lock = threading.Lock()
+        self._load_body = load_body
+        self._cache: "OrderedDict[str, TutorConcept]" = OrderedDict()
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def from_data(cls, data: List[Dict]) -> "TutorContentLibrary":
+        """Loads content from an in-memory list of dictionaries."""
+        concepts = {item["id"]: TutorConcept(**{k: v for k, v in item.items() if k != "aliases"}) for item in data}
+        entries = [ConceptEntry(item["id"], item["title"], aliases=tuple(item.get("aliases", ()))) for item in data]
+        return cls(entries, lambda entry: concepts[entry.id], cache_size=len(concepts))
+
+    @classmethod
+    def from_directory(cls, directory: str, cache_size: int = DEFAULT_CACHE_SIZE) -> "TutorContentLibrary":
+        """Loads the manifest of a directory of concept files (built on first use if missing)."""
+        entries = load_manifest(directory)
+        logger.info("Loaded manifest with %d concepts from %s.", len(entries), directory)
+        return cls(entries, lambda entry: _read_concept(os.path.join(directory, entry.file)), cache_size)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def first_id(self) -> str:
+        return self._entries[0].id
+
+    def list_concepts(self, limit: Optional[int] = None) -> List[ConceptEntry]:
+        return self._entries[:limit] if limit is not None else list(self._entries)
+
+    @property
+    def resolver(self) -> ConceptResolver:
+        if self._resolver is None:
+            with self._resolver_lock:
+                if self._resolver is None:
+                    self._resolver = ConceptResolver((e.id, e.title, e.aliases) for e in self._entries)
+                    logger.info("Built concept resolver over %d concepts.", len(self._entries))
+        return self._resolver
+
+    def _body(self, concept_id: str) -> TutorConcept:
+        concept = self._cache.get(concept_id)
+        if concept is not None:
+            self._cache.move_to_end(concept_id)
+            self.cache_hits += 1
+            return concept
+        self.cache_misses += 1
+        concept = self._load_body(self._entries[self._position[concept_id]])
+        self._cache[concept_id] = concept
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return concept
+
+    def resolve(self, name: str) -> Optional[ConceptMatch]:
+        """Matches an id or a spoken concept name; None if nothing reaches MIN_CONFIDENCE."""
+        if name in self._position:
+            return ConceptMatch(name, 1.0, name)
+        return self.resolver.resolve(name)
+
+    def get(self, concept_id: Optional[str]) -> TutorConcept:
+        target_id = concept_id or self.first_id
+        match = self.resolve(target_id)
+        if match is None:
+            suggestions = self.resolver.suggest(target_id)
+            hint = f" Closest concepts: {', '.join(suggestions)}." if suggestions else ""
+            raise KeyError(f"Unknown concept id: {target_id}.{hint}")
+        if match.concept_id != target_id:
+            logger.info("Resolved concept %r to %s (confidence %.2f).", target_id, match.concept_id, match.confidence)
+        return self._body(match.concept_id)
+
+    def next_concept_id(self, current_id: Optional[str]) -> str:
+        if current_id is None:
+            return self.first_id
+        idx = self._position.get(current_id)
+        if idx is None:
+            return self.first_id
+        return self._entries[(idx + 1) % len(self._entries)].id
+
+
+# --- Benchmark: `python tutor_content.py [concepts]` ---
+
+def _benchmark(count: int) -> None:
+    import random
+    import tempfile
+    import time
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        for i in range(count):
+            with open(os.path.join(tmp, f"concept_{i:06d}.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "id": f"concept_{i}", "title": f"Concept {i}", "order": i,
+                    "summary": f"Concept {i} explained in a few sentences. " * 8,
+                    "sample_question": f"What is concept {i}?",
+                    "teach_back_prompt": f"Teach me concept {i} in your own words.",
+                }, f)
+        print(f"Wrote {count:,} concept files in {time.perf_counter() - started:.1f} s")
+
+        started = time.perf_counter()
+        build_manifest(tmp)
+        print(f"Built manifest in {time.perf_counter() - started:.2f} s (once per content change)")
+
+        started = time.perf_counter()
+        library = TutorContentLibrary.from_directory(tmp)
+        load_ms = (time.perf_counter() - started) * 1000
+        tracemalloc.start()
+        library = TutorContentLibrary.from_directory(tmp)
+        manifest_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        print(f"Process start: loaded manifest of {len(library):,} concepts in {load_ms:.0f} ms, {manifest_mb:.1f} MB resident")
+
+        started = time.perf_counter()
+        library.resolve("concept one")
+        resolver_ms = (time.perf_counter() - started) * 1000
+        library = TutorContentLibrary.from_directory(tmp)
+        tracemalloc.start()
+        library.resolve("concept one")
+        resolver_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        print(f"First spoken name: built the resolver in {resolver_ms:.0f} ms, +{resolver_mb:.1f} MB "
+              f"({manifest_mb + resolver_mb:.1f} MB combined)")
+
+        tracemalloc.start()
+        everything = [_read_concept(os.path.join(tmp, e.file)) for e in library.list_concepts()]
+        all_mb = tracemalloc.get_traced_memory()[0] / 1e6
+        tracemalloc.stop()
+        del everything
+        print(f"Loading every concept body instead: {all_mb:.1f} MB resident")
+
+        rng = random.Random(1)
+        # Sessions mostly revisit a small working set of concepts
+        hot = [f"concept_{rng.randrange(count)}" for _ in range(100)]
+        lookups = [rng.choice(hot) if rng.random() < 0.9 else f"concept_{rng.randrange(count)}" for _ in range(20_000)]
+        started = time.perf_counter()
+        for concept_id in lookups:
+            library.get(concept_id)
+        per_get_us = (time.perf_counter() - started) / len(lookups) * 1e6
+        print(f"get(): {per_get_us:.1f} us average, cache hits {library.cache_hits:,} / misses {library.cache_misses:,}")
+
+        ids = [e.id for e in library.list_concepts()]
+        probes = [rng.choice(ids) for _ in range(2_000)]
+        started = time.perf_counter()
+        for concept_id in probes:
+            library.next_concept_id(concept_id)
+        new_us = (time.perf_counter() - started) / len(probes) * 1e6
+        started = time.perf_counter()
+        for concept_id in probes:
+            ids[(ids.index(concept_id) + 1) % len(ids)]
+        old_us = (time.perf_counter() - started) / len(probes) * 1e6
+        print(f"next_concept_id(): {new_us:.2f} us with the position map vs {old_us:.0f} us with list.index")
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.WARNING)
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)